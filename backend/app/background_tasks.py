@@ -1,27 +1,156 @@
 """
 Background tasks for video worker
+
+VIDEO_WORKER_MODE=process runs the worker as a supervised child process
+(app/worker_process.py); "thread" keeps the legacy in-process thread.
+
+With leader election (app/leader.py) only the leader API process runs the
+worker; on the other processes the functions below forward to the leader.
 """
 import asyncio
+import functools
 import logging
 import threading
-from typing import Optional
+import time
+from typing import Callable, Dict, Optional
+from .config import VIDEO_WORKER_MODE, VIDEO_WORKER_LEADER_ELECTION, OVERLAY_POLL_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
-# Global video worker thread and instance
+# Global video worker thread and instance (thread mode)
 _video_worker_thread: Optional[threading.Thread] = None
 _video_worker_instance = None
 _video_worker_running = False
 
+# Child process manager (process mode)
+_worker_process = None
+
+# API event loop (set at startup): attendance writes and broadcasts go through it
+_api_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Leader election (None = disabled or not started yet)
+_leader = None
+_routed: Dict[str, Callable] = {}
+
+# Unreachable-leader warnings: at most one per function per interval (some are polled)
+LEADER_WARNING_INTERVAL = 30.0
+_leader_warned_at: Dict[str, float] = {}
+
+
+def _leader_routed(default=None, timeout: Optional[float] = None):
+    """
+    Run the function on the leader API process; followers forward the call
+    
+    Args:
+        default: Returned by followers when the leader is unreachable
+        timeout: Seconds a forwarded call may take (None = control client default)
+    """
+    def decorator(func):
+        _routed[func.__name__] = func
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _leader is None or _leader.is_leader:
+                return func(*args, **kwargs)
+            
+            from video_worker.control import WorkerControlError
+            try:
+                return _leader.forward(func.__name__, args, kwargs, timeout)
+            except WorkerControlError as e:
+                now = time.monotonic()
+                if now - _leader_warned_at.get(func.__name__, 0.0) >= LEADER_WARNING_INTERVAL:
+                    _leader_warned_at[func.__name__] = now
+                    logger.warning(f"Video worker leader unreachable ({func.__name__}): {e}")
+                return default
+        return wrapper
+    return decorator
+
+
+def start_leader_election(on_elected: Callable[[], None]):
+    """
+    Compete for the video worker with the other API processes
+    
+    Must be called from the API event loop. on_elected runs on that loop
+    once this process leads (right away, or on failover).
+    """
+    global _leader, _api_loop
+    
+    loop = asyncio.get_running_loop()
+    _api_loop = loop
+    
+    if not VIDEO_WORKER_LEADER_ELECTION:
+        on_elected()
+        return
+    
+    from .leader import LeaderElection
+    
+    # Forwarded calls run in the leader's control server thread, off the loop
+    handlers = dict(_routed)
+    handlers["start_video_worker"] = functools.partial(_routed["start_video_worker"], loop=loop)
+    _leader = LeaderElection(
+        handlers=handlers,
+        on_elected=lambda: loop.call_soon_threadsafe(on_elected)
+    )
+    _leader.start()
+
+
+def get_leader_info() -> Optional[dict]:
+    """Leadership of this API process (None when election is disabled)"""
+    return _leader.get_info() if _leader is not None else None
+
+
+def shutdown_video_worker():
+    """API shutdown: stop this process' worker (waiting for the drain) and hand over leadership"""
+    if _leader is None or _leader.is_leader:
+        if is_video_worker_running():
+            logger.info("Video worker to'xtatilmoqda...")
+            stop_video_worker(wait=True)
+    if _leader is not None:
+        _leader.release()
+
+
+def _call_worker_process(command: str, **args):
+    """Control command to the worker process, None if it is not reachable"""
+    from .worker_process import WorkerControlError
+    
+    if _worker_process is None or not _worker_process.is_alive():
+        return None
+    try:
+        return _worker_process.call(command, **args)
+    except WorkerControlError as e:
+        logger.warning(f"Video worker process '{command}' failed: {e}")
+        return None
+
 
-def start_video_worker():
-    """Start video worker in background thread"""
-    global _video_worker_thread, _video_worker_running
+@_leader_routed()
+def start_video_worker(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """
+    Start video worker (child process or background thread)
     
-    if _video_worker_running:
+    Args:
+        loop: API event loop; with it the worker writes attendance directly
+            and hands WebSocket broadcasts back to the loop (no loopback
+            HTTP). Defaults to the running loop, else the one set at startup.
+    """
+    global _video_worker_thread, _video_worker_running, _worker_process
+    
+    if is_video_worker_running():
         logger.warning("Video worker allaqachon ishlayapti")
         return
     
+    if loop is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = _api_loop
+    
+    if VIDEO_WORKER_MODE == "process":
+        from .worker_process import WorkerProcessManager
+        
+        _worker_process = WorkerProcessManager(loop)
+        _worker_process.start()
+        return
+    
     def run_worker():
         global _video_worker_running, _video_worker_instance
         try:
@@ -35,7 +164,12 @@ def start_video_worker():
             
             from video_worker.main import VideoWorker
             
-            worker = VideoWorker()
+            attendance_writer = None
+            if loop is not None:
+                from .services.attendance_writer import AttendanceWriter
+                attendance_writer = AttendanceWriter(loop)
+            
+            worker = VideoWorker(attendance_writer=attendance_writer)
             _video_worker_instance = worker
             worker.run()
         except Exception as e:
@@ -52,24 +186,115 @@ def start_video_worker():
     logger.info("Video worker background thread yaratildi")
 
 
-def stop_video_worker():
-    """Stop video worker"""
+@_leader_routed()
+def stop_video_worker(wait: bool = False):
+    """
+    Stop video worker
+    
+    Args:
+        wait: Process mode: block until the child has drained and exited
+    """
     global _video_worker_running, _video_worker_instance
     
+    if VIDEO_WORKER_MODE == "process":
+        if _worker_process is None or not _worker_process.is_running():
+            logger.warning("Video worker ishlamayapti")
+            return
+        _worker_process.stop(wait=wait)
+        logger.info("Video worker to'xtatish so'rovi yuborildi")
+        return
+    
     if not _video_worker_running:
         logger.warning("Video worker ishlamayapti")
         return
     
     # Video worker ni to'xtatish
     if _video_worker_instance:
-        _video_worker_instance.running = False
+        _video_worker_instance.request_stop()
         logger.info("Video worker to'xtatish so'rovi yuborildi")
     else:
         _video_worker_running = False
         logger.info("Video worker to'xtatish so'rovi yuborildi")
 
 
+@_leader_routed(default=False)
 def is_video_worker_running() -> bool:
-    """Check if video worker is running"""
+    """Check if video worker is running (in process mode also while restarting or draining)"""
+    if VIDEO_WORKER_MODE == "process":
+        return _worker_process is not None and _worker_process.is_running()
     return _video_worker_running and _video_worker_thread is not None and _video_worker_thread.is_alive()
 
+
+
+@_leader_routed()
+def get_video_worker_stats() -> Optional[dict]:
+    """Get pipeline stats (queue depth, per-stage latency) from the running worker"""
+    if VIDEO_WORKER_MODE == "process":
+        if _worker_process is None:
+            return None
+        # None while the child is loading models or being restarted
+        stats = _call_worker_process("stats") or {"running": False}
+        stats["process"] = _worker_process.get_info()
+        return stats
+    
+    if not is_video_worker_running() or _video_worker_instance is None:
+        return None
+    return _video_worker_instance.get_stats()
+
+
+@_leader_routed()
+def notify_cameras_changed():
+    """Tell the running worker to reconcile its cameras with the database now"""
+    if VIDEO_WORKER_MODE == "process":
+        # The child also polls the camera version, so a missed push only delays it
+        _call_worker_process("reload_cameras")
+        return
+    if _video_worker_instance is not None:
+        _video_worker_instance.request_camera_reload()
+
+
+@_leader_routed()
+def get_static_faces() -> Optional[dict]:
+    """Static face regions currently excluded from recognition, per camera"""
+    if VIDEO_WORKER_MODE == "process":
+        return _call_worker_process("static_faces")
+    if not is_video_worker_running() or _video_worker_instance is None:
+        return None
+    if _video_worker_instance.static_faces is None:
+        return {}
+    return _video_worker_instance.static_faces.get_static_regions()
+
+
+@_leader_routed(default=False)
+def clear_static_faces(camera_id: Optional[int] = None) -> bool:
+    """Re-enable recognition for static regions of one camera (or all)"""
+    if VIDEO_WORKER_MODE == "process":
+        return bool(_call_worker_process("clear_static_faces", camera_id=camera_id))
+    if not is_video_worker_running() or _video_worker_instance is None:
+        return False
+    if _video_worker_instance.static_faces is not None:
+        _video_worker_instance.static_faces.clear(camera_id)
+    return True
+
+
+@_leader_routed(timeout=OVERLAY_POLL_TIMEOUT)
+def get_tracking_results(camera_id: int, since_seq: int = 0) -> Optional[dict]:
+    """
+    Latest tracked faces of a camera (see video_worker.result_store), None if nothing newer
+    
+    Polled several times a second, so the worker call is kept short: the
+    leader serves forwarded calls one at a time.
+    """
+    if VIDEO_WORKER_MODE == "process":
+        if _worker_process is None or not _worker_process.is_alive():
+            return None
+        from .worker_process import WorkerControlError
+        try:
+            return _worker_process.call("results", timeout=OVERLAY_POLL_TIMEOUT, camera_id=camera_id, since_seq=since_seq)
+        except WorkerControlError:
+            return None  # Polled several times a second; the worker may be restarting
+    
+    if not is_video_worker_running():
+        return None
+    from video_worker.result_store import result_store
+    return result_store.get(camera_id, since_seq)
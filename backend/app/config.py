@@ -36,6 +36,14 @@ DETECTED_FACES_DIR.mkdir(exist_ok=True, parents=True)
 
 # Database
 DATABASE_URL = f"sqlite:///{DB_DIR / 'attendance.db'}"
+# SQLite tuning (WAL lets report reads run alongside attendance inserts)
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms a writer waits for the lock before "database is locked"
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()  # NORMAL is durable in WAL mode except on power loss
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # pages, or KiB when negative (64 MB)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
 
 # Face Recognition
 FACE_RECOGNITION_THRESHOLD = float(os.getenv("FACE_RECOGNITION_THRESHOLD", "0.4"))
@@ -53,6 +61,39 @@ API_URL = os.getenv("API_URL", f"http://localhost:{API_PORT}")
 # RTSP_CAMERAS = os.getenv("RTSP_CAMERAS", "").split(",") if os.getenv("RTSP_CAMERAS") else []
 # RTSP_CAMERAS = [url.strip() for url in RTSP_CAMERAS if url.strip()]
 
+# Video worker started by the API: "process" (supervised child process,
+# default) or "thread" (legacy, runs inside the API process)
+VIDEO_WORKER_MODE = os.getenv("VIDEO_WORKER_MODE", "process").lower()
+VIDEO_WORKER_CONTROL_SOCKET = os.getenv("VIDEO_WORKER_CONTROL_SOCKET", f"/tmp/facezz-video-worker-{API_PORT}.sock")
+# Authkey of the control sockets; unset = random keys generated at startup
+# (passed to the worker child, shared with follower API processes through a
+# 0600 key file next to VIDEO_WORKER_LOCK_FILE)
+VIDEO_WORKER_CONTROL_KEY = os.getenv("VIDEO_WORKER_CONTROL_KEY", "").encode() or None
+VIDEO_WORKER_DRAIN_TIMEOUT = float(os.getenv("VIDEO_WORKER_DRAIN_TIMEOUT", "20"))  # seconds before the child is terminated
+
+# Leader election: with several API processes (uvicorn --workers N) only the
+# lock holder runs the video worker, the others forward calls to it
+VIDEO_WORKER_LEADER_ELECTION = os.getenv("VIDEO_WORKER_LEADER_ELECTION", "true").lower() == "true"
+VIDEO_WORKER_LOCK_FILE = Path(os.getenv("VIDEO_WORKER_LOCK_FILE", DATA_DIR / "video-worker.lock"))
+VIDEO_WORKER_LEADER_SOCKET = os.getenv("VIDEO_WORKER_LEADER_SOCKET", f"/tmp/facezz-api-leader-{API_PORT}.sock")
+LEADER_HEARTBEAT_INTERVAL = float(os.getenv("LEADER_HEARTBEAT_INTERVAL", "2"))  # seconds, also the failover poll interval
+
+# Camera previews (MJPEG): each frame is encoded once per quality level and
+# shared by all viewers; slow viewers skip frames
+PREVIEW_MAX_FPS = float(os.getenv("PREVIEW_MAX_FPS", "15"))
+PREVIEW_IDLE_TIMEOUT = float(os.getenv("PREVIEW_IDLE_TIMEOUT", "30"))  # seconds without frames before a preview ends
+PREVIEW_QUALITY_LEVELS = {"low": 50, "medium": 70, "high": 85}
+OVERLAY_FPS = float(os.getenv("OVERLAY_FPS", "5"))  # recognition result polls per second for annotated previews
+OVERLAY_MAX_AGE = float(os.getenv("OVERLAY_MAX_AGE", "2"))  # seconds before results are too old to draw
+OVERLAY_POLL_TIMEOUT = float(os.getenv("OVERLAY_POLL_TIMEOUT", "0.5"))  # seconds a tracking results poll may take
+OVERLAY_WS_FPS = float(os.getenv("OVERLAY_WS_FPS", "10"))  # max overlay metadata messages per second per camera
+OVERLAY_WS_KEYFRAME_INTERVAL = float(os.getenv("OVERLAY_WS_KEYFRAME_INTERVAL", "5"))  # seconds between full overlay states
+OVERLAY_WS_BBOX_TOLERANCE = int(os.getenv("OVERLAY_WS_BBOX_TOLERANCE", "4"))  # pixels a box may move before it is resent
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "2"))  # seconds between cached snapshot re-encodes
+SNAPSHOT_IDLE_TIMEOUT = float(os.getenv("SNAPSHOT_IDLE_TIMEOUT", "60"))  # stop caching a camera nobody asked for
+SNAPSHOT_MAX_WIDTH = int(os.getenv("SNAPSHOT_MAX_WIDTH", "640"))
+SNAPSHOT_QUALITY = int(os.getenv("SNAPSHOT_QUALITY", "70"))
+
 # Laptop camera (optional, disabled by default)
 USE_LAPTOP_CAMERA = os.getenv("USE_LAPTOP_CAMERA", "false").lower() == "true"
 LAPTOP_CAMERA_INDEX = int(os.getenv("LAPTOP_CAMERA_INDEX", "0")) if USE_LAPTOP_CAMERA else None
@@ -60,6 +101,11 @@ LAPTOP_CAMERA_INDEX = int(os.getenv("LAPTOP_CAMERA_INDEX", "0")) if USE_LAPTOP_C
 # Duplicate prevention
 DUPLICATE_PREVENTION_WINDOW_SECONDS = int(os.getenv("DUPLICATE_PREVENTION_WINDOW_SECONDS", "60"))  # 1 minute
 
+# Student/camera lookup cache (attendance API and video worker)
+LOOKUP_CACHE_TTL_SECONDS = float(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "300"))
+# How often a lookup checks the student/camera versions for changes made by other processes
+LOOKUP_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("LOOKUP_CACHE_VERSION_CHECK_SECONDS", "2"))
+
 # DeepSORT
 DEEPSORT_ENABLED = os.getenv("DEEPSORT_ENABLED", "true").lower() == "true"
 
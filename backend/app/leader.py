@@ -0,0 +1,180 @@
+"""
+Leader election between API processes (uvicorn --workers N)
+
+Only one API process runs the video worker. Leadership is an exclusive
+flock() on a lock file: the kernel drops it when the leader exits or is
+killed, and a follower polling the lock takes over. The leader writes a
+heartbeat into the file and serves the video worker operations on a Unix
+socket, so followers can forward /api/video-worker/* calls to it. Unless
+VIDEO_WORKER_CONTROL_KEY is set, each new leader generates the socket's
+authkey and shares it through a 0600 key file next to the lock file.
+"""
+import fcntl
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from video_worker.control import ControlClient, ControlServer, WorkerControlError
+from .config import (
+    VIDEO_WORKER_LOCK_FILE,
+    VIDEO_WORKER_LEADER_SOCKET,
+    VIDEO_WORKER_CONTROL_KEY,
+    LEADER_HEARTBEAT_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY_FILE = Path(f"{VIDEO_WORKER_LOCK_FILE}.key")
+
+
+class LeaderControlServer(ControlServer):
+    """Runs forwarded video worker calls in the leader process"""
+    
+    def __init__(self, socket_path: str, authkey: bytes, handlers: Dict[str, Callable]):
+        self.handlers = handlers
+        super().__init__(socket_path, authkey)
+    
+    def handle(self, command: str, args: dict):
+        # Runs in the server thread: the handlers block on worker socket I/O
+        # and must not hold up the API event loop
+        func = self.handlers.get(command)
+        if func is None:
+            raise ValueError(f"Unknown command: {command}")
+        return func(*args.get("args", ()), **args.get("kwargs", {}))
+
+
+class LeaderElection:
+    """Competes for the video worker lock and keeps the lease alive"""
+    
+    def __init__(
+        self,
+        handlers: Dict[str, Callable],
+        on_elected: Callable[[], None]
+    ):
+        """
+        Args:
+            handlers: Functions followers may call on the leader, by name
+            on_elected: Called once this process becomes leader (from the
+                election thread)
+        """
+        self.handlers = handlers
+        self.on_elected = on_elected
+        self.is_leader = False
+        self.elected_at: Optional[float] = None
+        self.server: Optional[LeaderControlServer] = None
+        self._lock_file = open(VIDEO_WORKER_LOCK_FILE, "a+")
+        self._stop = threading.Event()
+        self._stale_warned = False
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.is_leader:
+                    self._write_heartbeat()
+                elif self._try_acquire():
+                    self._become_leader()
+                else:
+                    self._check_leader()
+            except Exception as e:
+                logger.error(f"Leader election error: {e}")
+            self._stop.wait(LEADER_HEARTBEAT_INTERVAL)
+    
+    def _try_acquire(self) -> bool:
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+    
+    def _become_leader(self):
+        self.is_leader = True
+        self.elected_at = time.time()
+        self._write_heartbeat()
+        authkey = VIDEO_WORKER_CONTROL_KEY or self._publish_key()
+        self.server = LeaderControlServer(VIDEO_WORKER_LEADER_SOCKET, authkey, self.handlers)
+        logger.info(f"API process {os.getpid()} is now the video worker leader")
+        self.on_elected()
+    
+    def _publish_key(self) -> bytes:
+        """Fresh authkey for this leadership, readable by this user only"""
+        key = secrets.token_bytes(32)
+        tmp_path = f"{LEADER_KEY_FILE}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            os.fchmod(f.fileno(), 0o600)  # In case a leftover file had other permissions
+            f.write(key.hex())
+        os.replace(tmp_path, LEADER_KEY_FILE)
+        return key
+    
+    def _read_key(self) -> bytes:
+        if VIDEO_WORKER_CONTROL_KEY:
+            return VIDEO_WORKER_CONTROL_KEY
+        try:
+            return bytes.fromhex(LEADER_KEY_FILE.read_text().strip())
+        except (OSError, ValueError) as e:
+            raise WorkerControlError(f"Video worker leader key not available: {e}") from e
+    
+    def _write_heartbeat(self):
+        self._lock_file.seek(0)
+        self._lock_file.truncate()
+        json.dump({"pid": os.getpid(), "elected_at": self.elected_at, "heartbeat_at": time.time()}, self._lock_file)
+        self._lock_file.flush()
+    
+    def read_lease(self) -> Optional[dict]:
+        """Lease record written by the current leader"""
+        try:
+            with open(VIDEO_WORKER_LOCK_FILE) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _check_leader(self):
+        """Warn when the lock is held but the leader stopped heartbeating (hung process)"""
+        lease = self.read_lease()
+        if lease is None:
+            return
+        stale = time.time() - lease["heartbeat_at"] > LEADER_HEARTBEAT_INTERVAL * 5
+        if stale and not self._stale_warned:
+            logger.warning(f"Video worker leader (pid {lease['pid']}) holds the lock but stopped heartbeating")
+        self._stale_warned = stale
+    
+    def forward(self, command: str, args=(), kwargs: Optional[dict] = None, timeout: Optional[float] = None):
+        """Call a handler on the leader; raises WorkerControlError"""
+        # Key read per call: it changes when another process takes over
+        client = ControlClient(VIDEO_WORKER_LEADER_SOCKET, self._read_key())
+        return client.call(command, timeout=timeout, args=list(args), kwargs=kwargs or {})
+    
+    def get_info(self) -> dict:
+        lease = self.read_lease()
+        return {
+            "is_leader": self.is_leader,
+            "pid": os.getpid(),
+            "leader_pid": lease["pid"] if lease else None,
+            "heartbeat_age": round(time.time() - lease["heartbeat_at"], 1) if lease else None
+        }
+    
+    def release(self):
+        """Give up leadership (API shutdown); a follower takes over"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=LEADER_HEARTBEAT_INTERVAL + 1)
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        if self.is_leader:
+            self.is_leader = False
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            logger.info("Video worker leadership released")
+        self._lock_file.close()
@@ -1,14 +1,17 @@
 """
 FastAPI application entry point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from .database import init_db, engine
 from .models import Base
 from .config import CORS_ORIGINS
 from .routers import students, attendance, upload, cameras, websocket, auth, verification, config
 from .static_files import setup_static_files
-from .background_tasks import start_video_worker, stop_video_worker, is_video_worker_running
+from .background_tasks import start_video_worker, stop_video_worker, is_video_worker_running, get_video_worker_stats
+from .background_tasks import get_static_faces, clear_static_faces
+from .background_tasks import start_leader_election, shutdown_video_worker, get_leader_info
+from .routers.auth import get_current_admin
 from .config import USE_LAPTOP_CAMERA, LAPTOP_CAMERA_INDEX
 import logging
 import os
@@ -61,9 +64,8 @@ async def health():
     return {"status": "healthy"}
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Start video worker on startup"""
+def auto_start_video_worker():
+    """Start the video worker if enabled and there is a camera to process"""
     # Check if video worker should start automatically
     auto_start = os.getenv("AUTO_START_VIDEO_WORKER", "true").lower() == "true"
     
@@ -89,16 +91,24 @@ async def startup_event():
         logger.info("AUTO_START_VIDEO_WORKER=false, video worker qo'lda ishga tushirilishi kerak")
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Start video worker on startup (in the leader process only)"""
+    start_leader_election(on_elected=auto_start_video_worker)
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop video worker on shutdown"""
-    if is_video_worker_running():
-        logger.info("Video worker to'xtatilmoqda...")
-        stop_video_worker()
+    # Lets the worker process drain queued attendance before the API exits
+    shutdown_video_worker()
+
 
+# The endpoints below are plain def: they block on the worker's control
+# socket (or on the leader), so FastAPI runs them in its thread pool
 
 @app.post("/api/video-worker/start")
-async def start_video_worker_endpoint():
+def start_video_worker_endpoint():
     """Manually start video worker"""
     if is_video_worker_running():
         return {"status": "already_running", "message": "Video worker allaqachon ishlayapti"}
@@ -108,7 +118,7 @@ async def start_video_worker_endpoint():
 
 
 @app.post("/api/video-worker/stop")
-async def stop_video_worker_endpoint():
+def stop_video_worker_endpoint():
     """Manually stop video worker"""
     if not is_video_worker_running():
         return {"status": "not_running", "message": "Video worker ishlamayapti"}
@@ -118,10 +128,40 @@ async def stop_video_worker_endpoint():
 
 
 @app.get("/api/video-worker/status")
-async def video_worker_status():
+def video_worker_status():
     """Get video worker status"""
     return {
         "running": is_video_worker_running(),
-        "auto_start": os.getenv("AUTO_START_VIDEO_WORKER", "true").lower() == "true"
+        "auto_start": os.getenv("AUTO_START_VIDEO_WORKER", "true").lower() == "true",
+        "leader": get_leader_info()
     }
 
+
+
+@app.get("/api/video-worker/stats")
+def video_worker_stats():
+    """Get video worker pipeline stats (per-stage queue depth and latency)"""
+    stats = get_video_worker_stats()
+    if stats is None:
+        return {"running": False}
+    return stats
+
+
+@app.get("/api/video-worker/static-faces")
+def video_worker_static_faces(current_admin = Depends(get_current_admin)):
+    """List face regions excluded from recognition as static (posters, photos, screens)"""
+    regions = get_static_faces()
+    if regions is None:
+        return {"running": False, "cameras": {}}
+    return {"running": True, "cameras": regions}
+
+
+@app.delete("/api/video-worker/static-faces")
+def clear_video_worker_static_faces(
+    camera_id: int | None = None,
+    current_admin = Depends(get_current_admin)
+):
+    """Forget static face regions (for one camera or all) so they are re-evaluated"""
+    if not clear_static_faces(camera_id):
+        return {"status": "not_running", "message": "Video worker ishlamayapti"}
+    return {"status": "cleared", "camera_id": camera_id}
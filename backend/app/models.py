@@ -1,7 +1,7 @@
 """
 SQLAlchemy models for the attendance system
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, BLOB, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, BLOB, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.sqlite import JSON
@@ -74,6 +74,14 @@ class Camera(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     rtsp_url = Column(String, nullable=True)  # RTSP URL for IP cameras
+    substream_url = Column(String, nullable=True)  # Optional low-res substream, used for detection
+    target_fps = Column(Float, nullable=True)  # Processing rate (frames/s), None = DEFAULT_TARGET_FPS
+    priority = Column(Integer, nullable=False, default=0)  # Higher = degraded last under load
+    roi = Column(JSON, nullable=True)  # Detection region: [[x, y], ...] polygon, normalized 0-1
+    tiled_detection = Column(Boolean, nullable=False, default=False)  # Tile high-res frames for small faces
+    det_size = Column(Integer, nullable=True)  # Detector input size, None = DET_SIZE
+    detection_threshold = Column(Float, nullable=True)  # None = FACE_DETECTION_THRESHOLD
+    recognition_threshold = Column(Float, nullable=True)  # None = FACE_RECOGNITION_THRESHOLD
     camera_type = Column(String, nullable=False)  # 'rtsp' or 'laptop'
     camera_index = Column(Integer, nullable=True)  # For laptop cameras (0, 1, etc.)
     is_active = Column(Boolean, default=True)
@@ -87,6 +95,11 @@ class Camera(Base):
 class AttendanceLog(Base):
     """Attendance records"""
     __tablename__ = "attendance_logs"
+    __table_args__ = (
+        # Per-student / per-camera history in a time range (attendance list, stats, dashboard)
+        Index("ix_attendance_logs_student_detected", "student_id", "detected_at"),
+        Index("ix_attendance_logs_camera_detected", "camera_id", "detected_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id", ondelete="SET NULL"), nullable=True)
@@ -136,6 +149,10 @@ class User(Base):
 class FaceVerification(Base):
     """Face verification requests"""
     __tablename__ = "face_verifications"
+    __table_args__ = (
+        # Pending review queue, oldest first
+        Index("ix_face_verifications_status_created", "verification_status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
@@ -6,12 +6,20 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Optional
 from datetime import datetime, timedelta
-from ..database import get_db
-from ..models import AttendanceLog, Student, Camera
+from ..database import get_db, get_read_db
+from ..models import AttendanceLog
+from ..services.attendance_service import create_attendance_logs, serialize_attendance_logs, to_broadcast
+from ..services.lookup_cache import lookup_cache
 from pydantic import BaseModel
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Upper bound for limit on the attendance listing endpoints
+MAX_PAGE_SIZE = 1000
+
 
 class AttendanceResponse(BaseModel):
     id: int
@@ -21,6 +29,7 @@ class AttendanceResponse(BaseModel):
     confidence: float | None
     track_id: int | None
     image_path: str | None
+    image_url: str | None = None  # /static/detected_faces/... URL for image_path
     student: dict | None = None
     camera: dict | None = None
     
@@ -28,6 +37,15 @@ class AttendanceResponse(BaseModel):
         from_attributes = True
 
 
+class AttendanceCreate(BaseModel):
+    student_id: int | None = None
+    camera_id: int | None = None
+    confidence: float | None = None
+    track_id: int | None = None
+    image_path: str | None = None
+    detected_at: datetime | None = None  # Capture time; defaults to insert time
+
+
 class AttendanceStatsResponse(BaseModel):
     student_id: int
     student_name: str
@@ -41,9 +59,9 @@ async def get_attendance(
     camera_id: Optional[int] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
     """Get attendance logs"""
     query = db.query(AttendanceLog)
@@ -68,44 +86,14 @@ async def get_attendance(
     logs = query.order_by(desc(AttendanceLog.detected_at)).offset(skip).limit(limit).all()
     
     # Include student and camera info
-    result = []
-    for log in logs:
-        log_dict = {
-            "id": log.id,
-            "student_id": log.student_id,
-            "camera_id": log.camera_id,
-            "detected_at": log.detected_at,
-            "confidence": log.confidence,
-            "track_id": log.track_id,
-            "image_path": log.image_path,
-            "student": None,
-            "camera": None
-        }
-        
-        if log.student:
-            log_dict["student"] = {
-                "id": log.student.id,
-                "student_id": log.student.student_id,
-                "full_name": log.student.full_name
-            }
-        
-        if log.camera:
-            log_dict["camera"] = {
-                "id": log.camera.id,
-                "name": log.camera.name,
-                "location": log.camera.location
-            }
-        
-        result.append(log_dict)
-    
-    return result
+    return serialize_attendance_logs(db, logs)
 
 
 @router.get("/stats", response_model=List[AttendanceStatsResponse])
 async def get_attendance_stats(
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get attendance statistics by student"""
     query = db.query(
@@ -128,13 +116,14 @@ async def get_attendance_stats(
             pass
     
     stats = query.group_by(AttendanceLog.student_id).all()
+    students = lookup_cache.get_students((stat.student_id for stat in stats), db)
     
     result = []
     for stat in stats:
-        student = db.query(Student).filter(Student.id == stat.student_id).first()
+        student = students.get(stat.student_id)
         result.append({
             "student_id": stat.student_id,
-            "student_name": student.full_name if student else "Unknown",
+            "student_name": student["full_name"] if student else "Unknown",
             "total_attendances": stat.total_attendances,
             "last_attendance": stat.last_attendance
         })
@@ -144,9 +133,9 @@ async def get_attendance_stats(
 
 @router.get("/latest", response_model=List[AttendanceResponse])
 async def get_latest_attendance(
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
     since: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get latest attendance logs"""
     query = db.query(AttendanceLog).order_by(desc(AttendanceLog.detected_at))
@@ -160,81 +149,23 @@ async def get_latest_attendance(
     
     logs = query.limit(limit).all()
     
-    result = []
-    for log in logs:
-        log_dict = {
-            "id": log.id,
-            "student_id": log.student_id,
-            "camera_id": log.camera_id,
-            "detected_at": log.detected_at,
-            "confidence": log.confidence,
-            "track_id": log.track_id,
-            "image_path": log.image_path,
-            "student": None,
-            "camera": None
-        }
-        
-        if log.student:
-            log_dict["student"] = {
-                "id": log.student.id,
-                "student_id": log.student.student_id,
-                "full_name": log.student.full_name
-            }
-        
-        if log.camera:
-            log_dict["camera"] = {
-                "id": log.camera.id,
-                "name": log.camera.name,
-                "location": log.camera.location
-            }
-        
-        result.append(log_dict)
-    
-    return result
+    return serialize_attendance_logs(db, logs)
 
 
 @router.get("/recent", response_model=List[AttendanceResponse])
 async def get_recent_attendance(
     minutes: int = 5,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
-    """Get attendance logs from the last N minutes"""
+    """Get attendance logs from the last N minutes (newest first, paginated with skip/limit)"""
     since = datetime.utcnow() - timedelta(minutes=minutes)
     logs = db.query(AttendanceLog).filter(
         AttendanceLog.detected_at >= since
-    ).order_by(desc(AttendanceLog.detected_at)).all()
+    ).order_by(desc(AttendanceLog.detected_at)).offset(skip).limit(limit).all()
     
-    result = []
-    for log in logs:
-        log_dict = {
-            "id": log.id,
-            "student_id": log.student_id,
-            "camera_id": log.camera_id,
-            "detected_at": log.detected_at,
-            "confidence": log.confidence,
-            "track_id": log.track_id,
-            "image_path": log.image_path,
-            "student": None,
-            "camera": None
-        }
-        
-        if log.student:
-            log_dict["student"] = {
-                "id": log.student.id,
-                "student_id": log.student.student_id,
-                "full_name": log.student.full_name
-            }
-        
-        if log.camera:
-            log_dict["camera"] = {
-                "id": log.camera.id,
-                "name": log.camera.name,
-                "location": log.camera.location
-            }
-        
-        result.append(log_dict)
-    
-    return result
+    return serialize_attendance_logs(db, logs)
 
 
 @router.post("/", response_model=AttendanceResponse)
@@ -247,53 +178,42 @@ async def create_attendance(
     db: Session = Depends(get_db)
 ):
     """Create attendance log (called by video worker)"""
-    attendance_log = AttendanceLog(
-        student_id=student_id,
-        camera_id=camera_id,
-        confidence=confidence,
-        track_id=track_id,
-        image_path=image_path
-    )
-    
-    db.add(attendance_log)
-    db.commit()
-    db.refresh(attendance_log)
-    
-    # Load student and camera info for broadcast
-    student = None
-    camera = None
-    if attendance_log.student_id:
-        student = db.query(Student).filter(Student.id == attendance_log.student_id).first()
-    if attendance_log.camera_id:
-        camera = db.query(Camera).filter(Camera.id == attendance_log.camera_id).first()
+    attendance_data, = create_attendance_logs(db, [{
+        "student_id": student_id,
+        "camera_id": camera_id,
+        "confidence": confidence,
+        "track_id": track_id,
+        "image_path": image_path
+    }])
     
     # Broadcast to WebSocket clients (import here to avoid circular import)
     try:
         from ..routers.websocket import broadcast_attendance
-        attendance_data = {
-            "id": attendance_log.id,
-            "student_id": attendance_log.student_id,
-            "camera_id": attendance_log.camera_id,
-            "detected_at": attendance_log.detected_at.isoformat(),
-            "confidence": attendance_log.confidence,
-            "track_id": attendance_log.track_id,
-            "image_path": attendance_log.image_path,
-            "student": {
-                "id": student.id,
-                "student_id": student.student_id,
-                "full_name": student.full_name
-            } if student else None,
-            "camera": {
-                "id": camera.id,
-                "name": camera.name,
-                "location": camera.location
-            } if camera else None
-        }
-        await broadcast_attendance(attendance_data)
+        await broadcast_attendance(to_broadcast(attendance_data))
     except Exception as e:
         # WebSocket broadcast is optional, log error but don't fail
-        import logging
-        logging.getLogger(__name__).warning(f"Failed to broadcast attendance: {e}")
+        logger.warning(f"Failed to broadcast attendance: {e}")
     
-    return attendance_log
+    return attendance_data
+
 
+@router.post("/batch", response_model=List[AttendanceResponse])
+async def create_attendance_batch(
+    records: List[AttendanceCreate],
+    db: Session = Depends(get_db)
+):
+    """Create many attendance logs in one transaction (called by video worker)"""
+    if not records:
+        return []
+    
+    created = create_attendance_logs(db, [record.dict() for record in records])
+    
+    # One coalesced WebSocket message for the whole batch
+    try:
+        from ..routers.websocket import broadcast_attendance_batch
+        await broadcast_attendance_batch([to_broadcast(item) for item in created])
+    except Exception as e:
+        # WebSocket broadcast is optional, log error but don't fail
+        logger.warning(f"Failed to broadcast attendance batch: {e}")
+    
+    return created
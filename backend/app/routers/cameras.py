@@ -1,51 +1,94 @@
 """
 Cameras router
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
+from ..services.lookup_cache import lookup_cache
+from ..services.camera_config import bump_camera_version
+from ..background_tasks import notify_cameras_changed
 from ..models import Camera
 from pydantic import BaseModel
 from datetime import datetime
-import cv2
-import threading
-import time
+import asyncio
 import logging
+import time
+from ..config import PREVIEW_QUALITY_LEVELS
+from ..services.mjpeg_broadcaster import mjpeg_broadcaster, frame_bus
+from ..services.annotated_preview import AnnotatedFeed
+from ..services.snapshot_cache import snapshot_cache
+from .websocket import get_overlay_stats
+from video_worker.config import MIN_DETECTION_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Store active camera streams
-_active_streams = {}
-_stream_locks = {}
-
 
 class CameraCreate(BaseModel):
     name: str
     rtsp_url: str | None = None
+    substream_url: str | None = None  # Low-res substream for detection (main stream is used for crops)
     camera_type: str  # 'rtsp' or 'laptop'
     camera_index: int | None = None
     location: str | None = None
     is_active: bool = True
+    target_fps: float | None = None  # Frames/s processed by the video worker (None = default)
+    priority: int = 0  # Higher-priority cameras keep their rate longest when the worker is overloaded
+    roi: List[List[float]] | None = None  # Detection region polygon [[x, y], ...], normalized 0-1
+    tiled_detection: bool = False  # Detect in overlapping full-resolution tiles (4K cameras, small faces)
+    det_size: int | None = None  # Detector input size (None = worker default)
+    detection_threshold: float | None = None  # Face detection score threshold (None = worker default)
+    recognition_threshold: float | None = None  # Recognition similarity threshold (None = worker default)
 
 
 class CameraResponse(BaseModel):
     id: int
     name: str
     rtsp_url: str | None
+    substream_url: str | None = None
     camera_type: str
     camera_index: int | None
     is_active: bool
     location: str | None
+    target_fps: float | None = None
+    priority: int | None = 0
+    roi: List[List[float]] | None = None
+    tiled_detection: bool | None = False
+    det_size: int | None = None
+    detection_threshold: float | None = None
+    recognition_threshold: float | None = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
 
+def validate_roi(roi: List[List[float]] | None):
+    """Check an ROI polygon: at least 3 [x, y] points inside the unit square"""
+    if roi is None:
+        return
+    if len(roi) < 3 or any(len(point) != 2 for point in roi):
+        raise HTTPException(status_code=400, detail="roi must be a list of at least 3 [x, y] points")
+    if any(not 0 <= value <= 1 for point in roi for value in point):
+        raise HTTPException(status_code=400, detail="roi coordinates must be normalized to 0-1")
+
+
+def validate_detection_settings(camera: CameraCreate):
+    """Check per-camera detector size and thresholds (None = worker default)"""
+    if camera.det_size is not None and (camera.det_size <= 0 or camera.det_size % 32):
+        raise HTTPException(status_code=400, detail="det_size must be a positive multiple of 32")
+    if camera.detection_threshold is not None and not MIN_DETECTION_THRESHOLD <= camera.detection_threshold <= 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"detection_threshold must be between {MIN_DETECTION_THRESHOLD} and 1"
+        )
+    if camera.recognition_threshold is not None and not 0 < camera.recognition_threshold <= 1:
+        raise HTTPException(status_code=400, detail="recognition_threshold must be between 0 and 1")
+
+
 @router.get("/", response_model=List[CameraResponse])
 async def get_cameras(
     is_active: bool | None = None,
@@ -82,9 +125,15 @@ async def create_camera(camera: CameraCreate, db: Session = Depends(get_db)):
     if camera.camera_type == 'laptop' and camera.camera_index is None:
         raise HTTPException(status_code=400, detail="camera_index is required for laptop cameras")
     
+    validate_roi(camera.roi)
+    validate_detection_settings(camera)
+    
     db_camera = Camera(**camera.dict())
     db.add(db_camera)
+    bump_camera_version(db)
     db.commit()
+    lookup_cache.invalidate_camera(db_camera.id)
+    await asyncio.to_thread(notify_cameras_changed)  # worker control socket I/O
     db.refresh(db_camera)
     return db_camera
 
@@ -103,10 +152,16 @@ async def update_camera(
     if camera.camera_type not in ['rtsp', 'laptop']:
         raise HTTPException(status_code=400, detail="camera_type must be 'rtsp' or 'laptop'")
     
+    validate_roi(camera.roi)
+    validate_detection_settings(camera)
+    
     for key, value in camera.dict().items():
         setattr(db_camera, key, value)
     
+    bump_camera_version(db)
     db.commit()
+    lookup_cache.invalidate_camera(camera_id)
+    await asyncio.to_thread(notify_cameras_changed)
     db.refresh(db_camera)
     return db_camera
 
@@ -118,125 +173,60 @@ async def delete_camera(camera_id: int, db: Session = Depends(get_db)):
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    # Stop stream if active
-    if camera_id in _active_streams:
-        _active_streams[camera_id].release()
-        del _active_streams[camera_id]
-        if camera_id in _stream_locks:
-            del _stream_locks[camera_id]
+    # End previews of this camera
+    frame_bus.close_channel(camera_id)
     
     db.delete(camera)
+    bump_camera_version(db)
     db.commit()
+    lookup_cache.invalidate_camera(camera_id)
+    await asyncio.to_thread(notify_cameras_changed)
     return {"message": "Camera deleted successfully"}
 
 
-def generate_mjpeg_stream(camera_id: int, camera: Camera):
-    """Generate MJPEG stream from camera"""
-    cap = None
-    consecutive_failures = 0
-    max_failures = 10
-    reconnect_delay = 1.0
-    
-    try:
-        while True:
-            # Open camera
-            if camera.camera_type == "rtsp" and camera.rtsp_url:
-                logger.info(f"Opening RTSP stream: {camera.rtsp_url}")
-                cap = cv2.VideoCapture(camera.rtsp_url, cv2.CAP_FFMPEG)
-                # Set buffer size to reduce latency
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            elif camera.camera_type == "laptop" and camera.camera_index is not None:
-                logger.info(f"Opening laptop camera: index {camera.camera_index}")
-                cap = cv2.VideoCapture(camera.camera_index)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            else:
-                logger.error(f"Invalid camera configuration: {camera.camera_type}")
-                return
-            
-            if not cap.isOpened():
-                logger.error(f"Failed to open camera {camera_id}")
-                consecutive_failures += 1
-                if consecutive_failures >= max_failures:
-                    logger.error(f"Too many failures for camera {camera_id}, giving up")
-                    return
-                time.sleep(reconnect_delay)
-                continue
-            
-            # Set frame size (optional, for performance)
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            
-            # Set FPS
-            cap.set(cv2.CAP_PROP_FPS, 30)
-            
-            logger.info(f"Stream started for camera {camera_id}")
-            consecutive_failures = 0  # Reset failure count on successful connection
-            
-            frame_count = 0
-            frame_read_failures = 0
-            max_frame_failures = 5
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    frame_read_failures += 1
-                    if frame_read_failures >= max_frame_failures:
-                        logger.warning(f"Too many frame read failures for camera {camera_id}, reconnecting...")
-                        break  # Break inner loop to reconnect
-                    
-                    logger.warning(f"Failed to read frame from camera {camera_id} (attempt {frame_read_failures}/{max_frame_failures})")
-                    time.sleep(0.1)
-                    continue
-                
-                # Reset frame read failures on success
-                frame_read_failures = 0
-                
-                # Skip frames to reduce latency (read but don't process old frames)
-                # Only skip if we have a good connection
-                try:
-                    for _ in range(2):
-                        cap.grab()
-                except:
-                    pass  # Ignore grab errors
-                
-                # Encode frame as JPEG
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                if not ret:
-                    continue
-                
-                # Yield MJPEG frame
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                
-                frame_count += 1
-                if frame_count % 30 == 0:
-                    logger.debug(f"Streaming frame {frame_count} for camera {camera_id}")
-                
-                # Small delay to control frame rate
-                time.sleep(0.033)  # ~30 FPS
-            
-            # If we get here, connection was lost - try to reconnect
-            if cap is not None:
-                cap.release()
-                cap = None
-            logger.warning(f"Connection lost for camera {camera_id}, attempting to reconnect...")
-            time.sleep(reconnect_delay)
-            
-    except Exception as e:
-        logger.error(f"Error in stream for camera {camera_id}: {e}", exc_info=True)
-    finally:
-        if cap is not None:
-            cap.release()
-            logger.info(f"Stream closed for camera {camera_id}")
-        if camera_id in _active_streams:
-            del _active_streams[camera_id]
-        if camera_id in _stream_locks:
-            del _stream_locks[camera_id]
+def preview_spec(camera_id: int, camera) -> dict:
+    """Camera spec for the frame bus (used when it has to capture the camera itself)"""
+    return {
+        "camera_id": camera_id,
+        "camera_type": camera.camera_type,
+        "rtsp_url": camera.rtsp_url,
+        "camera_index": camera.camera_index,
+        "substream_url": getattr(camera, "substream_url", None)
+    }
 
 
-@router.get("/{camera_id}/stream")
-async def get_camera_stream(camera_id: int, db: Session = Depends(get_db)):
-    """Get MJPEG stream from camera"""
+def resolve_quality(quality: str) -> int:
+    """Preview quality level name -> JPEG quality"""
+    if quality not in PREVIEW_QUALITY_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"quality must be one of: {', '.join(PREVIEW_QUALITY_LEVELS)}"
+        )
+    return PREVIEW_QUALITY_LEVELS[quality]
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Whether an If-None-Match header lists etag (weak comparison) or is '*'"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/stream/stats")
+async def get_stream_stats():
+    """Preview viewers, encode cost, dropped frames and overlay channels per camera"""
+    return {
+        "feeds": mjpeg_broadcaster.get_stats(),
+        "frame_bus": {str(key): stats for key, stats in frame_bus.get_stats().items()},
+        "overlays": get_overlay_stats(),
+        "snapshots": snapshot_cache.get_stats()
+    }
+
+
+def get_streamable_camera(camera_id: int, db: Session) -> Camera:
+    """Camera to preview; 404/400 if it is missing, inactive or has no source"""
     camera = db.query(Camera).filter(Camera.id == camera_id).first()
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
@@ -249,28 +239,69 @@ async def get_camera_stream(camera_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="RTSP URL not configured")
     if camera.camera_type == "laptop" and camera.camera_index is None:
         raise HTTPException(status_code=400, detail="Camera index not configured")
+    return camera
+
+
+@router.get("/{camera_id}/stream")
+async def get_camera_stream(camera_id: int, quality: str = "high", db: Session = Depends(get_db)):
+    """Get MJPEG stream from camera"""
+    jpeg_quality = resolve_quality(quality)
+    camera = get_streamable_camera(camera_id, db)
+    
+    return StreamingResponse(
+        mjpeg_broadcaster.stream(camera_id, preview_spec(camera_id, camera), jpeg_quality),
+        media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+@router.get("/{camera_id}/stream/annotated")
+async def get_annotated_camera_stream(camera_id: int, quality: str = "high", db: Session = Depends(get_db)):
+    """MJPEG stream with the video worker's tracked faces and recognized names drawn on it"""
+    jpeg_quality = resolve_quality(quality)
+    camera = get_streamable_camera(camera_id, db)
     
     return StreamingResponse(
-        generate_mjpeg_stream(camera_id, camera),
+        mjpeg_broadcaster.stream(camera_id, preview_spec(camera_id, camera), jpeg_quality, feed_class=AnnotatedFeed),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 
+@router.get("/{camera_id}/snapshot")
+async def get_camera_snapshot(camera_id: int, request: Request, db: Session = Depends(get_db)):
+    """Latest cached JPEG of a camera (refreshed every SNAPSHOT_REFRESH_INTERVAL); supports If-None-Match"""
+    camera = get_streamable_camera(camera_id, db)
+    snapshot = snapshot_cache.get(camera_id, preview_spec(camera_id, camera))
+    
+    # First request for this camera: wait for its first frame
+    deadline = time.monotonic() + 5.0
+    while snapshot.image is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if snapshot.image is None:
+        raise HTTPException(status_code=503, detail="No frame from camera yet")
+    
+    jpeg, etag, captured_at = snapshot.image
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Captured-At": f"{captured_at:.3f}"
+    }
+    if etag_matches(etag, request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+
 @router.get("/stream/rtsp")
-async def get_rtsp_stream(rtsp_url: str):
+async def get_rtsp_stream(rtsp_url: str, quality: str = "high"):
     """Get MJPEG stream from RTSP URL (for config cameras without DB ID)"""
+    jpeg_quality = resolve_quality(quality)
     if not rtsp_url:
         raise HTTPException(status_code=400, detail="RTSP URL is required")
     
-    # Create a temporary camera object for streaming
-    from types import SimpleNamespace
-    temp_camera = SimpleNamespace()
-    temp_camera.camera_type = "rtsp"
-    temp_camera.rtsp_url = rtsp_url
-    temp_camera.camera_index = None
+    # Not a database camera: viewers of the same URL share a channel keyed by it
+    spec = {"camera_id": 0, "camera_type": "rtsp", "rtsp_url": rtsp_url}
     
     return StreamingResponse(
-        generate_mjpeg_stream(0, temp_camera),  # Use 0 as temp ID
+        mjpeg_broadcaster.stream(f"url:{rtsp_url}", spec, jpeg_quality),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
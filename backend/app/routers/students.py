@@ -5,6 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
+from ..services.lookup_cache import lookup_cache
+from ..services.camera_config import bump_student_version
 from ..models import Student
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
@@ -118,7 +120,9 @@ async def create_student(student: StudentCreate, db: Session = Depends(get_db)):
     
     db_student = Student(**student.dict())
     db.add(db_student)
+    bump_student_version(db)
     db.commit()
+    lookup_cache.invalidate_student(db_student.id)
     db.refresh(db_student)
     
     # Add images count and embedding info
@@ -162,7 +166,9 @@ async def update_student(
     for key, value in student.dict().items():
         setattr(db_student, key, value)
     
+    bump_student_version(db)
     db.commit()
+    lookup_cache.invalidate_student(db_student.id)
     db.refresh(db_student)
     
     # Add images count and embedding info
@@ -192,6 +198,8 @@ async def delete_student(student_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Student not found")
     
     db.delete(student)
+    bump_student_version(db)
     db.commit()
+    lookup_cache.invalidate_student(student_id)
     return {"message": "Student deleted successfully"}
 
@@ -202,7 +202,7 @@ async def get_pending_verifications(
     
     verifications = db.query(FaceVerification).filter(
         FaceVerification.verification_status == "pending"
-    ).all()
+    ).order_by(FaceVerification.created_at).all()
     
     result = []
     for v in verifications:
@@ -1,10 +1,15 @@
 """
-WebSocket router for real-time attendance updates
+WebSocket router for real-time attendance updates and camera overlay metadata
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from typing import Dict, List, Optional
+import asyncio
 import json
 import logging
+import time
+from ..background_tasks import get_tracking_results
+from ..config import OVERLAY_WS_FPS, OVERLAY_WS_KEYFRAME_INTERVAL, OVERLAY_WS_BBOX_TOLERANCE, OVERLAY_MAX_AGE
+from ..services.lookup_cache import lookup_cache
 
 logger = logging.getLogger(__name__)
 
@@ -73,3 +78,194 @@ async def broadcast_attendance(attendance_data: dict):
     }
     await manager.broadcast(message)
 
+
+
+async def broadcast_attendance_batch(attendance_items: List[dict]):
+    """Broadcast several attendance events as a single message"""
+    message = {
+        "type": "attendance_batch",
+        "data": attendance_items
+    }
+    await manager.broadcast(message)
+
+
+class OverlayChannel:
+    """
+    Tracked faces of one camera for client-side overlays
+    
+    Polls the video worker's tracking results at OVERLAY_WS_FPS while anyone
+    is connected and broadcasts only what changed since the previous message:
+    
+        {"type": "overlay", "camera_id", "seq", "captured_at", "frame_size",
+         "faces": [...]}                      full state (on connect, on "sync"
+                                              and every keyframe interval)
+        {"type": "overlay_delta", "camera_id", "seq", "base", "captured_at",
+         "frame_size", "upsert": [...], "remove": [track_id, ...]}
+    
+    Faces are {"track_id", "bbox": [x, y, w, h], "confidence", "student_id",
+    "name", "similarity"} in frame_size coordinates. A face is resent only
+    when its identity or similarity changes or its box moves more than
+    OVERLAY_WS_BBOX_TOLERANCE pixels; detection confidence alone does not
+    count. A client whose last seq is not the delta's base missed a message
+    and should send "sync".
+    """
+    
+    def __init__(self, camera_id: int):
+        self.camera_id = camera_id
+        self.manager = ConnectionManager()
+        self.seq = 0
+        self.captured_at: Optional[float] = None
+        self.frame_size = None
+        self.faces: Dict[int, dict] = {}
+        self.messages_sent = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+    
+    def keyframe(self) -> dict:
+        return {
+            "type": "overlay",
+            "camera_id": self.camera_id,
+            "seq": self.seq,
+            "captured_at": self.captured_at,
+            "frame_size": self.frame_size,
+            "faces": list(self.faces.values())
+        }
+    
+    @staticmethod
+    def _changed(sent: Optional[dict], face: dict) -> bool:
+        """True if a face differs visibly from the version clients have"""
+        if sent is None:
+            return True
+        if (sent["student_id"], sent["name"], sent["similarity"]) != (face["student_id"], face["name"], face["similarity"]):
+            return True
+        return any(abs(a - b) > OVERLAY_WS_BBOX_TOLERANCE for a, b in zip(sent["bbox"], face["bbox"]))
+    
+    def _apply(self, captured_at: Optional[float], frame_size, faces: List[dict]) -> Optional[dict]:
+        """Take over new results; returns the delta message (None if nothing changed)"""
+        # Faces clients already have stay as sent, so small moves can't add up unseen
+        current = {}
+        upsert = []
+        for face in faces:
+            sent = self.faces.get(face["track_id"])
+            if self._changed(sent, face):
+                upsert.append(face)
+                current[face["track_id"]] = face
+            else:
+                current[face["track_id"]] = sent
+        remove = [track_id for track_id in self.faces if track_id not in current]
+        if not upsert and not remove and frame_size == self.frame_size:
+            return None
+        
+        base = self.seq
+        self.seq += 1
+        self.captured_at = captured_at
+        self.frame_size = frame_size
+        self.faces = current
+        return {
+            "type": "overlay_delta",
+            "camera_id": self.camera_id,
+            "seq": self.seq,
+            "base": base,
+            "captured_at": captured_at,
+            "frame_size": frame_size,
+            "upsert": upsert,
+            "remove": remove
+        }
+    
+    async def _run(self):
+        interval = 1.0 / OVERLAY_WS_FPS if OVERLAY_WS_FPS > 0 else 1.0
+        since_seq = 0
+        last_keyframe = time.monotonic()
+        
+        try:
+            while self.manager.active_connections:
+                await asyncio.sleep(interval)
+                try:
+                    # Blocking control socket call (worker process / leader)
+                    result = await asyncio.to_thread(get_tracking_results, self.camera_id, since_seq)
+                except Exception as e:
+                    logger.warning(f"Overlay results for camera {self.camera_id} failed: {e}")
+                    continue
+                
+                message = None
+                if result is not None:
+                    since_seq = result["seq"]
+                    faces = [
+                        dict(
+                            face,
+                            bbox=list(face["bbox"]),
+                            confidence=round(face["confidence"], 2) if face["confidence"] is not None else None,
+                            similarity=round(face["similarity"], 2) if face["similarity"] is not None else None
+                        )
+                        for face in result["faces"]
+                    ]
+                    message = self._apply(result["captured_at"], list(result["frame_size"]), faces)
+                elif self.faces and time.time() - (self.captured_at or 0) > OVERLAY_MAX_AGE:
+                    # No fresh results (worker stopped or restarted with a new sequence)
+                    since_seq = 0
+                    message = self._apply(time.time(), self.frame_size, [])
+                
+                now = time.monotonic()
+                if now - last_keyframe >= OVERLAY_WS_KEYFRAME_INTERVAL:
+                    # Lets clients that dropped a delta resynchronize
+                    message = self.keyframe()
+                    last_keyframe = now
+                if message is not None:
+                    await self.manager.broadcast(message)
+                    self.messages_sent += 1
+        except Exception as e:
+            logger.error(f"Overlay channel for camera {self.camera_id} failed: {e}")
+        finally:
+            if overlay_channels.get(self.camera_id) is self:
+                del overlay_channels[self.camera_id]
+    
+    def get_stats(self) -> dict:
+        return {
+            "connections": len(self.manager.active_connections),
+            "faces": len(self.faces),
+            "seq": self.seq,
+            "messages_sent": self.messages_sent
+        }
+
+
+# Camera id -> overlay channel (only while clients are connected)
+overlay_channels: Dict[int, OverlayChannel] = {}
+
+
+@router.websocket("/overlay/{camera_id}")
+async def websocket_overlay(websocket: WebSocket, camera_id: int):
+    """WebSocket endpoint streaming tracked-face metadata of one camera (see OverlayChannel)"""
+    if await asyncio.to_thread(lookup_cache.get_camera, camera_id) is None:
+        await websocket.close(code=1008, reason="Camera not found")
+        return
+    
+    channel = overlay_channels.get(camera_id)
+    if channel is None:
+        channel = OverlayChannel(camera_id)
+        overlay_channels[camera_id] = channel
+    await channel.manager.connect(websocket)
+    if channel._task is None or channel._task.done():
+        # New channel, or the previous one ended while this client was connecting
+        overlay_channels[camera_id] = channel
+        channel.start()
+    
+    try:
+        await websocket.send_json(channel.keyframe())
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_json({"type": "pong"})
+            elif data == "sync":
+                await websocket.send_json(channel.keyframe())
+    except WebSocketDisconnect:
+        channel.manager.disconnect(websocket)
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+        channel.manager.disconnect(websocket)
+
+
+def get_overlay_stats() -> dict:
+    """Overlay connections and messages per camera"""
+    return {str(camera_id): channel.get_stats() for camera_id, channel in list(overlay_channels.items())}
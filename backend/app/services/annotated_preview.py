@@ -0,0 +1,96 @@
+"""
+Camera preview with the video worker's recognition results drawn on it
+"""
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from video_worker.main_stream import map_bbox
+from .mjpeg_broadcaster import EncodedFeed
+from ..background_tasks import get_tracking_results
+from ..config import OVERLAY_FPS, OVERLAY_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+KNOWN_COLOR = (0, 200, 0)
+UNKNOWN_COLOR = (0, 165, 255)
+
+
+class AnnotatedFeed(EncodedFeed):
+    """
+    EncodedFeed that draws tracked faces, track ids and student names
+    
+    Boxes come from the worker's latest tracking results (no inference here).
+    A poller thread fetches them at OVERLAY_FPS, independent of the preview
+    frame rate; every encoded frame is drawn with the newest results.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshot: Optional[dict] = None
+        self.overlay_polls = 0
+        self._poller = threading.Thread(target=self._poll, name=f"overlay-{self.key}", daemon=True)
+    
+    def start(self):
+        super().start()
+        self._poller.start()
+    
+    def _poll(self):
+        interval = 1.0 / OVERLAY_FPS if OVERLAY_FPS > 0 else 1.0
+        since_seq = 0
+        while not self._stop.wait(interval):
+            try:
+                result = get_tracking_results(self.key, since_seq)
+            except Exception as e:
+                logger.warning(f"Overlay results for camera {self.key} failed: {e}")
+                continue
+            self.overlay_polls += 1
+            
+            if result is not None:
+                self.snapshot = result
+                since_seq = result["seq"]
+            elif self.snapshot is not None and time.time() - self.snapshot["captured_at"] > OVERLAY_MAX_AGE:
+                # Stale: the worker may have restarted with a fresh sequence
+                self.snapshot = None
+                since_seq = 0
+    
+    def render(self, frame, captured_at: float):
+        snapshot = self.snapshot
+        if snapshot is None or not snapshot["faces"]:
+            return frame
+        if abs(captured_at - snapshot["captured_at"]) > OVERLAY_MAX_AGE:
+            return frame
+        
+        width, height = snapshot["frame_size"]
+        annotated = frame.copy()
+        for face in snapshot["faces"]:
+            x, y, w, h = map_bbox(face["bbox"], (height, width), frame.shape)
+            if face["student_id"] is not None:
+                color = KNOWN_COLOR
+                label = face["name"] or f"ID {face['student_id']}"
+                label = f"{label} {face['similarity']:.2f}"
+            else:
+                color = UNKNOWN_COLOR
+                label = f"#{face['track_id']}"
+            
+            cv2.rectangle(annotated, (x, y), (x + w, y + h), color, 2)
+            (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            top = max(y - text_h - baseline - 4, 0)
+            cv2.rectangle(annotated, (x, top), (x + text_w + 4, top + text_h + baseline + 4), color, -1)
+            cv2.putText(annotated, label, (x + 2, top + text_h + 2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+        return annotated
+    
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        snapshot = self.snapshot
+        stats["overlay_polls"] = self.overlay_polls
+        stats["overlay_faces"] = len(snapshot["faces"]) if snapshot else 0
+        stats["overlay_age"] = round(time.time() - snapshot["captured_at"], 2) if snapshot else None
+        return stats
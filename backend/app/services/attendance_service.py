@@ -0,0 +1,90 @@
+"""
+Attendance ingestion service (shared by the API and the embedded video worker)
+"""
+from datetime import datetime
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from ..models import AttendanceLog
+from ..static_files import detected_face_url
+from .lookup_cache import lookup_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE_FIELDS = ("student_id", "camera_id", "confidence", "track_id", "image_path", "detected_at")
+
+
+def create_attendance_logs(db: Session, records: List[dict]) -> List[dict]:
+    """
+    Insert attendance records in a single transaction
+    
+    All rows go in with one multi-row INSERT ... RETURNING; the referenced
+    students and cameras come from the lookup cache (misses are resolved
+    with one IN query each).
+    
+    Args:
+        db: Database session
+        records: Dicts with student_id, camera_id, confidence, track_id,
+            image_path and optional detected_at (defaults to now, UTC)
+    
+    Returns:
+        Attendance dicts (with nested student/camera info) in input order
+    """
+    if not records:
+        return []
+    
+    now = datetime.utcnow()
+    rows = []
+    for record in records:
+        row = {field: record.get(field) for field in ATTENDANCE_FIELDS}
+        row["detected_at"] = row["detected_at"] or now
+        rows.append(row)
+    
+    try:
+        result = db.execute(
+            insert(AttendanceLog).returning(AttendanceLog.id, sort_by_parameter_order=True),
+            rows
+        )
+        ids = [row.id for row in result]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    return _with_references(db, [{"id": log_id, **row} for log_id, row in zip(ids, rows)])
+
+
+def serialize_attendance_logs(db: Session, logs: List[AttendanceLog]) -> List[dict]:
+    """
+    Attendance dicts for AttendanceLog rows, as returned by the attendance API
+    
+    Students and cameras come from the lookup cache instead of the lazy
+    log.student / log.camera relationships: at most one IN query each,
+    however many rows there are.
+    """
+    return _with_references(db, [
+        {"id": log.id, **{field: getattr(log, field) for field in ATTENDANCE_FIELDS}}
+        for log in logs
+    ])
+
+
+def _with_references(db: Session, rows: List[dict]) -> List[dict]:
+    """Add image_url and nested student/camera info to attendance rows"""
+    students = lookup_cache.get_students((row["student_id"] for row in rows), db)
+    cameras = lookup_cache.get_cameras((row["camera_id"] for row in rows), db)
+    
+    return [
+        {
+            **row,
+            "image_url": detected_face_url(row["image_path"]),
+            "student": students.get(row["student_id"]),
+            "camera": cameras.get(row["camera_id"])
+        }
+        for row in rows
+    ]
+
+
+def to_broadcast(attendance: dict) -> dict:
+    """JSON-safe copy of an attendance dict for WebSocket clients"""
+    return {**attendance, "detected_at": attendance["detected_at"].isoformat()}
@@ -0,0 +1,60 @@
+"""
+Direct attendance writer for the video worker embedded in the API process
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List
+from ..database import SessionLocal
+from .attendance_service import create_attendance_logs, to_broadcast
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceWriter:
+    """
+    Writes attendance rows without the loopback HTTP round trip
+    
+    Used by the attendance sink thread of an embedded VideoWorker: rows go
+    through a session owned by that thread, and the WebSocket broadcast is
+    handed to the API event loop with run_coroutine_threadsafe (fire and
+    forget, the sink never waits on WebSocket clients).
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.db = SessionLocal()
+    
+    def write_batch(self, records: List[dict]) -> bool:
+        """Insert records in one transaction and schedule the broadcast"""
+        rows = []
+        for record in records:
+            row = dict(record)
+            if isinstance(row.get("detected_at"), str):
+                row["detected_at"] = datetime.fromisoformat(row["detected_at"])
+            rows.append(row)
+        
+        created = create_attendance_logs(self.db, rows)
+        # Objects are not needed after serialization; keep the session small
+        self.db.expunge_all()
+        self._broadcast(created)
+        return True
+    
+    def _broadcast(self, created: List[dict]):
+        if not created or self.loop.is_closed():
+            return
+        
+        from ..routers.websocket import broadcast_attendance_batch
+        future = asyncio.run_coroutine_threadsafe(
+            broadcast_attendance_batch([to_broadcast(item) for item in created]),
+            self.loop
+        )
+        future.add_done_callback(self._log_broadcast_error)
+    
+    @staticmethod
+    def _log_broadcast_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Failed to broadcast attendance batch: {future.exception()}")
+    
+    def close(self):
+        self.db.close()
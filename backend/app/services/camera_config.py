@@ -0,0 +1,76 @@
+"""
+Configuration versions in system_configs
+
+The camera version lets video workers hot-reload cameras; the camera and
+student versions let every process drop stale lookup cache entries.
+"""
+import logging
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models import SystemConfig
+
+logger = logging.getLogger(__name__)
+
+CAMERA_VERSION_KEY = "camera_config_version"
+STUDENT_VERSION_KEY = "student_config_version"
+
+
+def bump_version(db: Session, key: str, description: str) -> int:
+    """
+    Increment a version counter in system_configs (committed together with the caller's changes)
+    
+    Args:
+        db: Session holding the change
+        key: SystemConfig key of the counter
+        description: Description stored when the counter is created
+    
+    Returns:
+        New version number
+    """
+    config = db.query(SystemConfig).filter(SystemConfig.key == key).first()
+    if config is None:
+        config = SystemConfig(key=key, value="0", description=description)
+        db.add(config)
+    
+    version = int(config.value or 0) + 1
+    config.value = str(version)
+    return version
+
+
+def bump_camera_version(db: Session) -> int:
+    """Increment the camera config version (see bump_version)"""
+    return bump_version(
+        db,
+        CAMERA_VERSION_KEY,
+        "Incremented on every camera change; video workers reload cameras when it changes"
+    )
+
+
+def bump_student_version(db: Session) -> int:
+    """Increment the student version (see bump_version)"""
+    return bump_version(
+        db,
+        STUDENT_VERSION_KEY,
+        "Incremented on every student change; other processes drop cached student info when it changes"
+    )
+
+
+def get_versions(keys: Iterable[str], db: Optional[Session] = None) -> Dict[str, int]:
+    """Current value of version counters (0 for counters never bumped)"""
+    keys = list(keys)
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        rows = db.query(SystemConfig.key, SystemConfig.value).filter(SystemConfig.key.in_(keys)).all()
+        values = {key: int(value or 0) for key, value in rows}
+        return {key: values.get(key, 0) for key in keys}
+    finally:
+        if own_session:
+            db.close()
+
+
+def get_camera_version(db: Optional[Session] = None) -> int:
+    """Current camera config version (0 if cameras were never changed through the API)"""
+    return get_versions([CAMERA_VERSION_KEY], db)[CAMERA_VERSION_KEY]
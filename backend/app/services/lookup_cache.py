@@ -0,0 +1,183 @@
+"""
+Read-through cache of student display info and camera metadata
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models import Student, Camera
+from ..config import LOOKUP_CACHE_TTL_SECONDS, LOOKUP_CACHE_VERSION_CHECK_SECONDS
+from .camera_config import CAMERA_VERSION_KEY, STUDENT_VERSION_KEY, get_versions
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def student_info(student: Student) -> dict:
+    """Compact student dict embedded in attendance responses/broadcasts"""
+    return {
+        "id": student.id,
+        "student_id": student.student_id,
+        "full_name": student.full_name
+    }
+
+
+def camera_info(camera: Camera) -> dict:
+    """Compact camera dict embedded in attendance responses/broadcasts"""
+    return {
+        "id": camera.id,
+        "name": camera.name,
+        "location": camera.location
+    }
+
+
+class LookupCache:
+    """
+    TTL cache shared by the attendance API and the video worker
+    
+    Entries are the compact dicts embedded in attendance responses. Misses
+    for a set of ids are resolved with one IN query; ids that don't exist
+    are cached as None so unknown ids don't hit the database either.
+    
+    Routers invalidate entries when a student or camera changes, and bump
+    the student/camera version in system_configs. Other processes (uvicorn
+    workers, the video worker) notice the new version on their next lookup,
+    at most LOOKUP_CACHE_VERSION_CHECK_SECONDS later, and drop that store.
+    """
+    
+    def __init__(self, ttl: float = LOOKUP_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._students: Dict[int, Tuple[float, Optional[dict]]] = {}
+        self._cameras: Dict[int, Tuple[float, Optional[dict]]] = {}
+        self._versions: Optional[Dict[str, int]] = None
+        self._versions_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+    
+    def _check_versions(self, db: Optional[Session]):
+        """Drop stores whose version another process bumped (throttled)"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._versions_checked < LOOKUP_CACHE_VERSION_CHECK_SECONDS:
+                return
+            self._versions_checked = now
+        
+        try:
+            versions = get_versions((STUDENT_VERSION_KEY, CAMERA_VERSION_KEY), db)
+        except Exception as e:
+            logger.warning(f"Lookup cache version check failed: {e}")
+            return
+        
+        with self._lock:
+            previous, self._versions = self._versions, versions
+            if previous is None:
+                return
+            if previous[STUDENT_VERSION_KEY] != versions[STUDENT_VERSION_KEY]:
+                self._students.clear()
+            if previous[CAMERA_VERSION_KEY] != versions[CAMERA_VERSION_KEY]:
+                self._cameras.clear()
+    
+    def _lookup(self, store: dict, model, to_entry, db: Optional[Session], ids: Iterable[int]) -> Dict[int, Optional[dict]]:
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return {}
+        self._check_versions(db)
+        now = time.monotonic()
+        result: Dict[int, Optional[dict]] = {}
+        missing = []
+        
+        with self._lock:
+            for i in ids:
+                cached = store.get(i)
+                if cached is not None and cached[0] > now:
+                    result[i] = cached[1]
+                else:
+                    missing.append(i)
+            self.hits += len(result)
+            self.misses += len(missing)
+        
+        if not missing:
+            return result
+        
+        own_session = db is None
+        session = SessionLocal() if own_session else db
+        try:
+            rows = session.query(model).filter(model.id.in_(missing)).all()
+            fetched = {row.id: to_entry(row) for row in rows}
+        finally:
+            if own_session:
+                session.close()
+        
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for i in missing:
+                entry = fetched.get(i)
+                store[i] = (expires, entry)
+                result[i] = entry
+        return result
+    
+    def get_students(self, ids: Iterable[int], db: Optional[Session] = None) -> Dict[int, Optional[dict]]:
+        """Student info by primary key (None for unknown ids)"""
+        return self._lookup(self._students, Student, student_info, db, ids)
+    
+    def get_cameras(self, ids: Iterable[int], db: Optional[Session] = None) -> Dict[int, Optional[dict]]:
+        """Camera info by primary key (None for unknown ids)"""
+        return self._lookup(self._cameras, Camera, camera_info, db, ids)
+    
+    def get_student(self, student_id: Optional[int], db: Optional[Session] = None) -> Optional[dict]:
+        if student_id is None:
+            return None
+        return self.get_students([student_id], db).get(student_id)
+    
+    def get_camera(self, camera_id: Optional[int], db: Optional[Session] = None) -> Optional[dict]:
+        if camera_id is None:
+            return None
+        return self.get_cameras([camera_id], db).get(camera_id)
+    
+    def warm(self, db: Optional[Session] = None):
+        """Load all students and cameras (one query each)"""
+        own_session = db is None
+        session = SessionLocal() if own_session else db
+        try:
+            students = session.query(Student).all()
+            cameras = session.query(Camera).all()
+        finally:
+            if own_session:
+                session.close()
+        
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._students.update({s.id: (expires, student_info(s)) for s in students})
+            self._cameras.update({c.id: (expires, camera_info(c)) for c in cameras})
+        logger.info(f"Lookup cache warmed: {len(students)} students, {len(cameras)} cameras")
+    
+    def invalidate_student(self, student_id: Optional[int] = None):
+        """Drop one student (or all when student_id is None)"""
+        with self._lock:
+            if student_id is None:
+                self._students.clear()
+            else:
+                self._students.pop(student_id, None)
+    
+    def invalidate_camera(self, camera_id: Optional[int] = None):
+        """Drop one camera (or all when camera_id is None)"""
+        with self._lock:
+            if camera_id is None:
+                self._cameras.clear()
+            else:
+                self._cameras.pop(camera_id, None)
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "students": len(self._students),
+                "cameras": len(self._cameras),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# Global cache instance
+lookup_cache = LookupCache()
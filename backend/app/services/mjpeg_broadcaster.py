@@ -0,0 +1,203 @@
+"""
+Encode-once MJPEG fan-out for camera previews
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Hashable, Optional, Set, Tuple
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from video_worker.frame_bus import frame_bus
+from ..config import PREVIEW_MAX_FPS, PREVIEW_IDLE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+class PreviewClient:
+    """One viewer: holds at most the newest encoded frame"""
+    
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.sent = 0
+        self.dropped = 0
+    
+    def offer(self, data: Optional[bytes]):
+        """Runs on the event loop; replaces a frame the client has not picked up yet"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(data)
+
+
+class EncodedFeed:
+    """
+    Frames of one camera encoded once at one JPEG quality
+    
+    A thread reads the camera's frame bus channel, encodes each new frame
+    (cv2.imencode releases the GIL) and hands the bytes to every client on
+    the event loop. Slow clients skip frames instead of queueing them.
+    """
+    
+    def __init__(self, key: Hashable, spec: Optional[dict], quality: int, loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.spec = spec
+        self.quality = quality
+        self.loop = loop
+        self.clients: Set[PreviewClient] = set()
+        self.frames_encoded = 0
+        self.bytes_encoded = 0
+        self.avg_encode_ms = 0.0
+        self.dropped_total = 0
+        self.started_at = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"mjpeg-{key}-q{quality}", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def is_active(self) -> bool:
+        """False once stopped or ended (camera deleted / no frames)"""
+        return not self._stop.is_set() and self._thread.is_alive()
+    
+    def render(self, frame, captured_at: float):
+        """Frame to encode (hook for overlays); must not modify the shared frame"""
+        return frame
+    
+    def _run(self):
+        subscription = frame_bus.subscribe(self.key, self.spec)
+        min_interval = 1.0 / PREVIEW_MAX_FPS if PREVIEW_MAX_FPS > 0 else 0.0
+        last_sent = 0.0
+        idle_since = time.monotonic()
+        
+        try:
+            while not self._stop.is_set() and not subscription.closed:
+                result = subscription.next_frame(timeout=1.0)
+                now = time.monotonic()
+                if result is None:
+                    if now - idle_since > PREVIEW_IDLE_TIMEOUT:
+                        logger.warning(f"No frames from camera {self.key} in {PREVIEW_IDLE_TIMEOUT:.0f}s, closing preview")
+                        break
+                    continue
+                idle_since = now
+                
+                # Frames newer than the cap arrive later anyway; skip the encode
+                if now - last_sent < min_interval:
+                    continue
+                last_sent = now
+                
+                _, captured_at, frame = result
+                started = time.perf_counter()
+                ok, buffer = cv2.imencode('.jpg', self.render(frame, captured_at), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    continue
+                data = buffer.tobytes()
+                encode_ms = (time.perf_counter() - started) * 1000
+                self.avg_encode_ms += 0.1 * (encode_ms - self.avg_encode_ms)
+                self.frames_encoded += 1
+                self.bytes_encoded += len(data)
+                self._broadcast(data)
+        except Exception as e:
+            logger.error(f"Error in preview feed for camera {self.key}: {e}", exc_info=True)
+        finally:
+            subscription.close()
+            # Ends the client streams
+            self._broadcast(None)
+    
+    def _broadcast(self, data: Optional[bytes]):
+        if self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._offer_all, data)
+        except RuntimeError:
+            pass  # Loop closed meanwhile (shutdown)
+    
+    def _offer_all(self, data: Optional[bytes]):
+        for client in list(self.clients):
+            client.offer(data)
+    
+    def get_stats(self) -> dict:
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        return {
+            "quality": self.quality,
+            "viewers": len(self.clients),
+            "frames_encoded": self.frames_encoded,
+            "encode_fps": round(self.frames_encoded / elapsed, 2),
+            "avg_encode_ms": round(self.avg_encode_ms, 2),
+            "avg_frame_kb": round(self.bytes_encoded / self.frames_encoded / 1024, 1) if self.frames_encoded else None,
+            "dropped": self.dropped_total + sum(client.dropped for client in self.clients)
+        }
+
+
+class MJPEGBroadcaster:
+    """Registry of encoded feeds, one per (camera, variant, quality) with viewers"""
+    
+    feed_class = EncodedFeed
+    
+    def __init__(self):
+        self.feeds: Dict[Tuple, EncodedFeed] = {}
+    
+    async def stream(
+        self,
+        key: Hashable,
+        spec: Optional[dict],
+        quality: int,
+        feed_class=None
+    ) -> AsyncIterator[bytes]:
+        """
+        multipart/x-mixed-replace body for one viewer
+        
+        Args:
+            key: Frame bus key (camera id)
+            spec: Camera spec, for cameras the worker does not capture
+            quality: JPEG quality of the shared feed
+            feed_class: EncodedFeed subclass (e.g. an annotated variant)
+        """
+        feed_class = feed_class or self.feed_class
+        feed_key = (key, feed_class.__name__, quality)
+        client = PreviewClient()
+        
+        # Runs on the event loop only, so no lock is needed around feeds
+        feed = self.feeds.get(feed_key)
+        if feed is None or not feed.is_active():
+            feed = feed_class(key, spec, quality, asyncio.get_running_loop())
+            self.feeds[feed_key] = feed
+            feed.start()
+        feed.clients.add(client)
+        
+        try:
+            while True:
+                data = await client.queue.get()
+                if data is None:
+                    return
+                client.sent += 1
+                yield PART_HEADER + data + b'\r\n'
+        finally:
+            feed.clients.discard(client)
+            feed.dropped_total += client.dropped
+            if not feed.clients:
+                feed.stop()
+                if self.feeds.get(feed_key) is feed:
+                    del self.feeds[feed_key]
+    
+    def get_stats(self) -> dict:
+        """Per camera: viewers, encode cost and dropped frames of each feed"""
+        stats: Dict[str, list] = {}
+        for (key, variant, _), feed in list(self.feeds.items()):
+            entry = feed.get_stats()
+            entry["variant"] = variant
+            stats.setdefault(str(key), []).append(entry)
+        return stats
+
+
+mjpeg_broadcaster = MJPEGBroadcaster()
@@ -0,0 +1,177 @@
+"""
+Latest JPEG snapshot per camera, for dashboard thumbnails
+"""
+import hashlib
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from video_worker.config import FRAME_BUS_STALE_AFTER
+from video_worker.frame_bus import Frame, FrameSubscription, attach_export_ring, frame_bus
+from video_worker.frame_ring import SharedFrameRing
+from ..config import SNAPSHOT_REFRESH_INTERVAL, SNAPSHOT_IDLE_TIMEOUT, SNAPSHOT_MAX_WIDTH, SNAPSHOT_QUALITY
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """Cached snapshot of one camera, kept while it is being requested"""
+    
+    def __init__(self, camera_id: Hashable, spec: Optional[dict]):
+        self.camera_id = camera_id
+        self.spec = spec
+        # Frame source: the worker process' export ring, else a frame bus subscription
+        self.ring: Optional[SharedFrameRing] = None
+        self.ring_seq = 0
+        self.ring_progress = 0.0  # monotonic time of the last ring frame (or attach)
+        self.ring_retry_at = 0.0
+        self.subscription: Optional[FrameSubscription] = None
+        # (jpeg, etag, captured_at), replaced as a whole so readers see a consistent set
+        self.image: Optional[Tuple[bytes, str, float]] = None
+        self.refreshed_at = 0.0
+        self.requested_at = time.monotonic()
+    
+    @property
+    def closed(self) -> bool:
+        """The frame bus ended the subscription (camera deleted or capture failed)"""
+        return self.subscription is not None and self.subscription.closed
+
+
+class SnapshotCache:
+    """
+    Per-camera snapshot cache (module singleton: snapshot_cache)
+    
+    Snapshots come from the capture that already runs. When a worker
+    process exports the camera, its ring is read directly as a low-rate
+    reader, so the worker only exports FRAME_BUS_SLOW_EXPORT_FPS for it;
+    otherwise the camera's frame bus channel is subscribed to. One thread
+    re-encodes every SNAPSHOT_REFRESH_INTERVAL seconds a downscaled JPEG of
+    the newest frame; requests only read the cached bytes. A camera nobody
+    asked for in SNAPSHOT_IDLE_TIMEOUT is released.
+    """
+    
+    def __init__(self):
+        self.snapshots: Dict[Hashable, Snapshot] = {}
+        self.encoded = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def get(self, camera_id: Hashable, spec: Optional[dict] = None) -> Snapshot:
+        """Snapshot entry of a camera (starts caching it on first use)"""
+        with self._lock:
+            snapshot = self.snapshots.get(camera_id)
+            if snapshot is None or snapshot.closed:
+                snapshot = Snapshot(camera_id, spec)
+                self.snapshots[camera_id] = snapshot
+            elif spec is not None:
+                snapshot.spec = spec
+            snapshot.requested_at = time.monotonic()
+            
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="snapshot-cache", daemon=True)
+                self._thread.start()
+        return snapshot
+    
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self.snapshots:
+                    self._thread = None
+                    return
+                items = list(self.snapshots.items())
+            
+            now = time.monotonic()
+            for camera_id, snapshot in items:
+                if snapshot.closed or now - snapshot.requested_at > SNAPSHOT_IDLE_TIMEOUT:
+                    self._release(camera_id, snapshot)
+                    continue
+                if snapshot.ring is not None:
+                    snapshot.ring.touch(full_rate=False)
+                if now - snapshot.refreshed_at >= SNAPSHOT_REFRESH_INTERVAL:
+                    try:
+                        self._refresh(snapshot)
+                    except Exception as e:
+                        logger.warning(f"Snapshot of camera {camera_id} failed: {e}")
+            
+            # Short tick: new cameras get their first snapshot as soon as a frame arrives
+            time.sleep(0.2)
+    
+    def _next_frame(self, snapshot: Snapshot) -> Optional[Frame]:
+        """Newest unseen frame (None if there is none yet)"""
+        now = time.monotonic()
+        if snapshot.ring is None and isinstance(snapshot.camera_id, int) and now >= snapshot.ring_retry_at:
+            snapshot.ring = attach_export_ring(snapshot.camera_id)
+            snapshot.ring_retry_at = now + FRAME_BUS_STALE_AFTER
+            if snapshot.ring is not None:
+                snapshot.ring.touch(full_rate=False)
+                snapshot.ring_seq = snapshot.ring.write_seq
+                snapshot.ring_progress = now
+        
+        if snapshot.ring is not None:
+            result = snapshot.ring.read_latest(snapshot.ring_seq)
+            if result is not None:
+                snapshot.ring_seq = result[0]
+                snapshot.ring_progress = now
+                if snapshot.subscription is not None:
+                    snapshot.subscription.close()
+                    snapshot.subscription = None
+                return result
+            if now - snapshot.ring_progress <= FRAME_BUS_STALE_AFTER:
+                return None
+            # Worker stopped exporting this camera
+            snapshot.ring.close()
+            snapshot.ring = None
+        
+        if snapshot.subscription is None:
+            snapshot.subscription = frame_bus.subscribe(snapshot.camera_id, snapshot.spec)
+        return snapshot.subscription.next_frame(timeout=0)
+    
+    def _refresh(self, snapshot: Snapshot):
+        result = self._next_frame(snapshot)
+        if result is None:
+            return
+        _, captured_at, frame = result
+        
+        height, width = frame.shape[:2]
+        if width > SNAPSHOT_MAX_WIDTH:
+            scale = SNAPSHOT_MAX_WIDTH / width
+            frame = cv2.resize(frame, (SNAPSHOT_MAX_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, SNAPSHOT_QUALITY])
+        if not ok:
+            return
+        
+        jpeg = buffer.tobytes()
+        snapshot.image = (jpeg, f'"{hashlib.blake2b(jpeg, digest_size=8).hexdigest()}"', captured_at)
+        snapshot.refreshed_at = time.monotonic()
+        self.encoded += 1
+    
+    def _release(self, camera_id: Hashable, snapshot: Snapshot):
+        with self._lock:
+            if self.snapshots.get(camera_id) is snapshot:
+                del self.snapshots[camera_id]
+        if snapshot.ring is not None:
+            snapshot.ring.close()
+            snapshot.ring = None
+        if snapshot.subscription is not None:
+            snapshot.subscription.close()
+            snapshot.subscription = None
+    
+    def get_stats(self) -> dict:
+        now = time.time()
+        return {
+            "cameras": {
+                str(camera_id): round(now - snapshot.image[2], 2) if snapshot.image else None
+                for camera_id, snapshot in list(self.snapshots.items())
+            },
+            "encoded": self.encoded
+        }
+
+
+snapshot_cache = SnapshotCache()
@@ -3,13 +3,34 @@ Static file serving for images
 """
 from fastapi.staticfiles import StaticFiles
 from fastapi import FastAPI
+from typing import Optional
 from .config import IMAGES_DIR, DETECTED_FACES_DIR
 
+DETECTED_FACES_URL = "/static/detected_faces"
+
 def setup_static_files(app: FastAPI):
     """Setup static file serving for images"""
     # Student images
     app.mount("/static/student_images", StaticFiles(directory=str(IMAGES_DIR)), name="student_images")
     
     # Detected faces
-    app.mount("/static/detected_faces", StaticFiles(directory=str(DETECTED_FACES_DIR)), name="detected_faces")
+    app.mount(DETECTED_FACES_URL, StaticFiles(directory=str(DETECTED_FACES_DIR)), name="detected_faces")
+
 
+def detected_face_url(image_path: Optional[str]) -> Optional[str]:
+    """
+    Map a stored detected-face path to its static URL
+    
+    Works for flat legacy files and for the date/camera-sharded layout
+    (YYYY/MM/DD/cam_<id>/...), whichever base directory the worker used.
+    """
+    if not image_path:
+        return None
+    
+    normalized = image_path.replace("\\", "/")
+    marker = f"/{DETECTED_FACES_DIR.name}/"
+    if marker in normalized:
+        relative = normalized.rsplit(marker, 1)[1]
+    else:
+        relative = normalized.rsplit("/", 1)[-1]
+    return f"{DETECTED_FACES_URL}/{relative}"
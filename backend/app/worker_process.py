@@ -0,0 +1,134 @@
+"""
+Video worker as a supervised child process of the API
+
+Keeps the numpy/cv2/ONNX work out of the API process (no GIL contention
+with request handling). The child is restarted with backoff if it dies,
+commands go over the control socket (video_worker/control.py) and attendance
+batches come back over a pipe and are written here by an AttendanceWriter.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import sys
+import threading
+from multiprocessing import Pipe
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from video_worker.supervisor import ManagedProcess
+from video_worker.control import ControlClient, WorkerControlError, run_worker_process
+from .config import VIDEO_WORKER_CONTROL_SOCKET, VIDEO_WORKER_CONTROL_KEY, VIDEO_WORKER_DRAIN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerProcessManager:
+    """Starts, monitors and stops the video worker child process"""
+    
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        Args:
+            loop: API event loop for attendance broadcasts. Without it the
+                child posts attendance over HTTP.
+        """
+        self.loop = loop
+        # Random per start unless configured; the child gets it as an argument
+        authkey = VIDEO_WORKER_CONTROL_KEY or secrets.token_bytes(32)
+        self.client = ControlClient(VIDEO_WORKER_CONTROL_SOCKET, authkey)
+        self.stopping = False
+        self._stopped = threading.Event()
+        self._stop_thread: Optional[threading.Thread] = None
+        
+        # One pipe for the manager's lifetime, shared by restarted children
+        self._attendance_conn = None
+        child_conn = None
+        if loop is not None:
+            self._attendance_conn, child_conn = Pipe()
+        
+        self.process = ManagedProcess(
+            "video-worker",
+            run_worker_process,
+            (VIDEO_WORKER_CONTROL_SOCKET, authkey, child_conn, os.getpid())
+        )
+    
+    def start(self):
+        self.process.start()
+        threading.Thread(target=self._monitor, name="video-worker-monitor", daemon=True).start()
+        if self._attendance_conn is not None:
+            threading.Thread(target=self._relay_attendance, name="video-worker-attendance", daemon=True).start()
+    
+    def _monitor(self):
+        """Restart the child with backoff when it dies"""
+        while not self._stopped.wait(1):
+            self.process.check(stopping=self.stopping)
+    
+    def _relay_attendance(self):
+        """Write attendance batches from the child and report the result back"""
+        from .services.attendance_writer import AttendanceWriter
+        
+        writer = AttendanceWriter(self.loop)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    if not self._attendance_conn.poll(1):
+                        continue
+                    request_id, records = self._attendance_conn.recv()
+                except (EOFError, OSError):
+                    break
+                
+                try:
+                    reply = (request_id, writer.write_batch(records), None)
+                except Exception as e:
+                    reply = (request_id, None, str(e))
+                self._attendance_conn.send(reply)
+        finally:
+            writer.close()
+    
+    def is_alive(self) -> bool:
+        """Child process is up right now"""
+        return self.process.is_alive()
+    
+    def is_running(self) -> bool:
+        """Supervised until stopped (also while the child is being restarted or drained)"""
+        return not self._stopped.is_set()
+    
+    def call(self, command: str, **args):
+        """Control command (see video_worker.control.COMMANDS); raises WorkerControlError"""
+        return self.client.call(command, **args)
+    
+    def stop(self, wait: bool = False):
+        """
+        Ask the child to stop gracefully (it drains queued work and attendance)
+        
+        Args:
+            wait: Block until the child has exited (API shutdown)
+        """
+        if self._stop_thread is None:
+            self.stopping = True
+            try:
+                self.call("stop")
+            except WorkerControlError:
+                # Control socket not up yet (still starting): SIGTERM is handled the same way
+                if self.process.process is not None:
+                    self.process.process.terminate()
+            
+            self._stop_thread = threading.Thread(target=self._wait_stopped, name="video-worker-stop", daemon=True)
+            self._stop_thread.start()
+        
+        if wait:
+            self._stop_thread.join()
+    
+    def _wait_stopped(self):
+        self.process.stop(VIDEO_WORKER_DRAIN_TIMEOUT)
+        self._stopped.set()
+        if self._attendance_conn is not None:
+            self._attendance_conn.close()
+        logger.info("Video worker process stopped")
+    
+    def get_info(self) -> dict:
+        info = self.process.get_info()
+        info["stopping"] = self.stopping
+        return info
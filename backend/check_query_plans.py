@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Check that the attendance and verification endpoints use indexes
+
+Seeds a throwaway database with a large attendance table, calls the report
+endpoints and runs EXPLAIN QUERY PLAN on every statement they execute.
+Exits with status 1 if any of them scans attendance_logs or
+face_verifications without an index.
+
+Usage: python check_query_plans.py [--rows 1000000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Throwaway database (must be set before the app is imported)
+_tmp_dir = tempfile.mkdtemp(prefix="facezz-query-plans-")
+os.environ["DB_DIR"] = _tmp_dir
+os.environ["DATA_DIR"] = _tmp_dir
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import event
+from app.database import engine, SessionLocal, init_db
+from app.models import Student, Camera
+from app.routers.attendance import (
+    get_attendance,
+    get_attendance_stats,
+    get_latest_attendance,
+    get_recent_attendance,
+)
+from app.routers.verification import get_pending_verifications
+
+# Tables that must never be scanned without an index
+CHECKED_TABLES = ("attendance_logs", "face_verifications")
+
+STUDENTS = 2000
+CAMERAS = 20
+DAYS = 365
+
+
+def _timestamp(dt: datetime) -> str:
+    """SQLAlchemy's SQLite DateTime storage format"""
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def seed(rows: int):
+    """Fill the database with students, cameras, attendance and verifications"""
+    print(f"Seeding {rows:,} attendance rows...")
+    started = time.time()
+    now = datetime.utcnow()
+    random.seed(42)
+    
+    db = SessionLocal()
+    try:
+        db.add_all(Student(id=i, student_id=f"S{i:05d}", full_name=f"Student {i}") for i in range(1, STUDENTS + 1))
+        db.add_all(
+            Camera(id=i, name=f"Camera {i}", camera_type="rtsp", rtsp_url=f"rtsp://camera-{i}")
+            for i in range(1, CAMERAS + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+    
+    # Bulk rows straight through the driver (ORM inserts would take minutes)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.executemany(
+            "INSERT INTO attendance_logs (student_id, camera_id, detected_at, confidence) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    random.randint(1, STUDENTS),
+                    random.randint(1, CAMERAS),
+                    _timestamp(now - timedelta(seconds=random.randint(0, DAYS * 86400))),
+                    round(random.uniform(0.4, 0.9), 3)
+                )
+                for _ in range(rows)
+            )
+        )
+        # Mostly reviewed verifications, a short pending queue
+        cursor.executemany(
+            "INSERT INTO face_verifications (student_id, camera_id, image_path, verification_status, created_at) "
+            "VALUES (?, ?, 'verification.jpg', ?, ?)",
+            (
+                (
+                    random.randint(1, STUDENTS),
+                    random.randint(1, CAMERAS),
+                    "pending" if i % 1000 == 0 else random.choice(("approved", "rejected")),
+                    _timestamp(now - timedelta(seconds=random.randint(0, DAYS * 86400)))
+                )
+                for i in range(max(rows // 10, 1000))
+            )
+        )
+        cursor.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+    print(f"Seeded in {time.time() - started:.1f}s")
+
+
+def endpoint_calls(db):
+    """(label, coroutine) for each report query pattern"""
+    now = datetime.utcnow()
+    week_ago = (now - timedelta(days=7)).isoformat()
+    month_ago = (now - timedelta(days=30)).isoformat()
+    today = now.isoformat()
+    
+    return [
+        ("GET /api/attendance?student_id&date range", get_attendance(
+            student_id=7, camera_id=None, date_from=month_ago, date_to=today, skip=0, limit=100, db=db)),
+        ("GET /api/attendance?camera_id&date range", get_attendance(
+            student_id=None, camera_id=3, date_from=week_ago, date_to=today, skip=0, limit=100, db=db)),
+        ("GET /api/attendance?date range", get_attendance(
+            student_id=None, camera_id=None, date_from=week_ago, date_to=today, skip=0, limit=100, db=db)),
+        ("GET /api/attendance/stats", get_attendance_stats(date_from=week_ago, date_to=today, db=db)),
+        ("GET /api/attendance/latest", get_latest_attendance(limit=10, since=None, db=db)),
+        ("GET /api/attendance/recent", get_recent_attendance(minutes=60, skip=0, limit=1000, db=db)),
+        ("GET /api/verification/pending", get_pending_verifications(db=db, current_admin=None)),
+    ]
+
+
+def explain(statement: str, parameters) -> list:
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+
+def full_scans(plan: list) -> list:
+    """Plan steps that read a checked table without an index"""
+    return [
+        step for step in plan
+        if step.startswith("SCAN ")
+        and step.split()[1] in CHECKED_TABLES
+        and "INDEX" not in step
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Attendance rows to seed (default: 1000000)")
+    args = parser.parse_args()
+    
+    init_db()
+    seed(args.rows)
+    
+    # Record the statements each endpoint executes
+    statements = []
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    failures = 0
+    db = SessionLocal()
+    try:
+        for label, call in endpoint_calls(db):
+            statements.clear()
+            started = time.perf_counter()
+            rows = asyncio.run(call)
+            elapsed = (time.perf_counter() - started) * 1000
+            executed = list(statements)
+            
+            print(f"\n{label}: {len(rows)} rows, {len(executed)} queries, {elapsed:.1f} ms")
+            seen = set()
+            for statement, parameters in executed:
+                if not any(table in statement for table in CHECKED_TABLES) or statement in seen:
+                    continue
+                seen.add(statement)
+                plan = explain(statement, parameters)
+                scans = full_scans(plan)
+                for step in plan:
+                    print(f"    {'❌' if step in scans else '  '} {step}")
+                if scans:
+                    failures += 1
+    finally:
+        db.close()
+    
+    if failures:
+        print(f"\n❌ {failures} statement(s) scan a table without an index")
+        sys.exit(1)
+    print("\n✅ All checked queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes for attendance and verification queries
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import engine, SessionLocal
+from sqlalchemy import text
+
+# (index name, table, columns) - keep in sync with __table_args__ in app/models.py
+INDEXES = [
+    ("ix_attendance_logs_student_detected", "attendance_logs", "student_id, detected_at"),
+    ("ix_attendance_logs_camera_detected", "attendance_logs", "camera_id, detected_at"),
+    ("ix_face_verifications_status_created", "face_verifications", "verification_status, created_at"),
+]
+
+def migrate():
+    """Create missing indexes and refresh the query planner statistics"""
+    db = SessionLocal()
+    try:
+        existing = {
+            row[0] for row in db.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+        }
+        
+        added = 0
+        for name, table, columns in INDEXES:
+            if name in existing:
+                print(f"✅ {name} index already exists on {table} table")
+                continue
+            
+            print(f"Creating {name} index on {table} ({columns})...")
+            db.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+            added += 1
+        
+        if added:
+            # Lets SQLite choose between the new and the existing indexes
+            db.execute(text("ANALYZE"))
+        db.commit()
+        if added:
+            print(f"✅ Successfully created {added} index(es)")
+    
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error migrating database: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate()
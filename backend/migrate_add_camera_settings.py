@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Migration script to add per-camera settings columns to the cameras table
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import engine, SessionLocal
+from sqlalchemy import text
+
+# (column name, SQLite column definition)
+CAMERA_COLUMNS = [
+    ("substream_url", "VARCHAR"),
+    ("target_fps", "FLOAT"),
+    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+    ("roi", "JSON"),
+    ("tiled_detection", "BOOLEAN NOT NULL DEFAULT 0"),
+    ("det_size", "INTEGER"),
+    ("detection_threshold", "FLOAT"),
+    ("recognition_threshold", "FLOAT"),
+]
+
+def migrate():
+    """Add missing camera settings columns to cameras table"""
+    db = SessionLocal()
+    try:
+        existing = {
+            row[0] for row in db.execute(text("SELECT name FROM pragma_table_info('cameras')"))
+        }
+        
+        added = 0
+        for name, definition in CAMERA_COLUMNS:
+            if name in existing:
+                print(f"✅ {name} column already exists in cameras table")
+                continue
+            
+            print(f"Adding {name} column to cameras table...")
+            db.execute(text(f"ALTER TABLE cameras ADD COLUMN {name} {definition}"))
+            added += 1
+        
+        db.commit()
+        if added:
+            print(f"✅ Successfully added {added} column(s) to cameras table")
+    
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error migrating database: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -2,28 +2,86 @@
 Attendance manager with duplicate prevention
 """
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-from typing import Dict, Optional
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from .config import ATTENDANCE_ENDPOINT, DUPLICATE_PREVENTION_WINDOW_SECONDS, DETECTED_FACES_DIR
-import cv2
-import uuid
-from pathlib import Path
+from .config import (
+    ATTENDANCE_BATCH_ENDPOINT,
+    DUPLICATE_PREVENTION_WINDOW_SECONDS,
+    ATTENDANCE_QUEUE_SIZE,
+    ATTENDANCE_BATCH_SIZE,
+    ATTENDANCE_FLUSH_INTERVAL,
+    ATTENDANCE_MAX_RETRIES,
+    ATTENDANCE_HTTP_TIMEOUT,
+    ATTENDANCE_HTTP_POOL_SIZE,
+    ATTENDANCE_SINK_MODE,
+)
+from .crop_store import CropStore
 import sys
+from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from app.database import SessionLocal
-from app.models import Student
+from app.services.lookup_cache import lookup_cache
 
 logger = logging.getLogger(__name__)
 
 
 class AttendanceManager:
-    """Manages attendance logging with duplicate prevention"""
+    """
+    Manages attendance logging with duplicate prevention
     
-    def __init__(self):
+    log_attendance() only queues the event; a background thread flushes the
+    queue in batches, so the frame pipeline never waits on the API. Batches
+    are delivered either over a pooled keep-alive HTTP session ("http"), or,
+    when the worker is embedded in the API process, straight to the database
+    through an AttendanceWriter ("direct").
+    """
+    
+    def __init__(self, writer=None):
+        """
+        Args:
+            writer: Optional in-process writer (app.services.attendance_writer).
+                Used instead of HTTP unless ATTENDANCE_SINK_MODE=http.
+        """
         # Track last attendance per (student_id, camera_id)
         self.last_attendance: Dict[tuple, datetime] = {}
         self.window_seconds = DUPLICATE_PREVENTION_WINDOW_SECONDS
+        self._lock = threading.Lock()
+        
+        self.crop_store = CropStore()
+        self.queue: queue.Queue = queue.Queue(maxsize=ATTENDANCE_QUEUE_SIZE)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=ATTENDANCE_HTTP_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self.writer = writer if ATTENDANCE_SINK_MODE != "http" else None
+        if ATTENDANCE_SINK_MODE == "direct" and self.writer is None:
+            logger.warning("ATTENDANCE_SINK_MODE=direct, but worker is not embedded in the API; using HTTP")
+        self.mode = "direct" if self.writer is not None else "http"
+        self._transport = self.writer.write_batch if self.writer is not None else self._post_batch
+        if hasattr(self.writer, "on_late_reply"):
+            self.writer.on_late_reply = self._late_reply
+        logger.info(f"Attendance sink mode: {self.mode}")
+        
+        # Sink metrics
+        self.queued_count = 0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.unconfirmed_count = 0
+        self.dropped_count = 0
+        self.retry_count = 0
+        self.batch_count = 0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_error: Optional[str] = None
+        
+        self._stop = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="attendance-sink", daemon=True)
+        self._flush_thread.start()
     
     def can_log_attendance(self, student_id: int, camera_id: int) -> bool:
         """
@@ -32,7 +90,7 @@ class AttendanceManager:
         Args:
             student_id: Student ID
             camera_id: Camera ID
-            
+        
         Returns:
             True if attendance can be logged, False if duplicate
         """
@@ -58,7 +116,7 @@ class AttendanceManager:
         face_image: Optional[any] = None
     ) -> bool:
         """
-        Log attendance via API
+        Queue attendance for delivery to the API
         
         Args:
             student_id: Student ID
@@ -66,76 +124,216 @@ class AttendanceManager:
             confidence: Recognition confidence
             track_id: DeepSORT track ID
             face_image: Optional face image to save
-            
+        
         Returns:
-            True if logged successfully, False otherwise
+            True if the event was queued, False if duplicate or queue is full
         """
-        # Check duplicate prevention
-        if not self.can_log_attendance(student_id, camera_id):
-            return False
+        key = (student_id, camera_id)
+        
+        # Check duplicate prevention and claim the slot right away, so
+        # further sightings are suppressed while the event is in flight
+        with self._lock:
+            if not self.can_log_attendance(student_id, camera_id):
+                return False
+            self.last_attendance[key] = datetime.utcnow()
+        
+        detected_at = datetime.utcnow()
         
-        # Save face image if provided
-        image_path = None
+        # Save face image if provided (encoded and written by the crop store's pool)
+        image_write = None
         if face_image is not None:
-            try:
-                image_filename = f"{student_id}_{camera_id}_{uuid.uuid4()}.jpg"
-                image_path = str(DETECTED_FACES_DIR / image_filename)
-                cv2.imwrite(image_path, face_image)
-            except Exception as e:
-                logger.error(f"Error saving face image: {e}")
+            image_write = self.crop_store.save(face_image, student_id, camera_id, detected_at)
+        
+        event = {
+            "student_id": student_id,
+            "camera_id": camera_id,
+            "confidence": float(confidence),
+            "track_id": track_id,
+            "image_write": image_write,  # resolved to image_path before the batch is sent
+            "detected_at": detected_at,
+            "queued_at": time.monotonic()
+        }
         
-        # Call API
         try:
-            payload = {
-                "student_id": student_id,
-                "camera_id": camera_id,
-                "confidence": float(confidence),
-                "track_id": track_id,
-                "image_path": image_path
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped_count += 1
+            self._release(key)
+            logger.error(f"Attendance queue full, dropping event for student {student_id} (camera {camera_id})")
+            return False
+        
+        self.queued_count += 1
+        return True
+    
+    def _release(self, key: tuple):
+        """Forget a dedup claim so the next sighting can be logged again"""
+        with self._lock:
+            self.last_attendance.pop(key, None)
+    
+    def _flush_loop(self):
+        """Background thread: drain the queue in batches"""
+        while not self._stop.is_set() or not self.queue.empty():
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+    
+    def _next_batch(self) -> List[dict]:
+        """Wait for the first event, then collect more until batch size or flush interval"""
+        try:
+            batch = [self.queue.get(timeout=ATTENDANCE_FLUSH_INTERVAL)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.monotonic() + ATTENDANCE_FLUSH_INTERVAL
+        while len(batch) < ATTENDANCE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _post_batch(self, batch: List[dict]) -> bool:
+        """
+        HTTP transport: POST a batch to the API
+        
+        Returns False on a permanent (4xx) failure; raises on transient ones.
+        """
+        payload = [
+            {
+                "student_id": event["student_id"],
+                "camera_id": event["camera_id"],
+                "confidence": event["confidence"],
+                "track_id": event["track_id"],
+                "image_path": event["image_path"],
+                "detected_at": event["detected_at"].isoformat()
             }
-            
-            response = requests.post(ATTENDANCE_ENDPOINT, json=payload, timeout=5)
-            
-            if response.status_code == 200:
-                # Update last attendance time
-                key = (student_id, camera_id)
-                self.last_attendance[key] = datetime.utcnow()
-                
-                # Get student name from database
-                student_name = None
-                try:
-                    db = SessionLocal()
-                    student = db.query(Student).filter(Student.id == student_id).first()
-                    if student:
-                        student_name = student.full_name
-                    db.close()
-                except Exception as e:
-                    logger.debug(f"Could not fetch student name: {e}")
-                
-                # Console log for successful attendance logging
-                student_info = f"{student_name} (ID: {student_id})" if student_name else f"Student ID {student_id}"
-                log_message = f"✅ BU TALABA DAVOMOTI SAQLANDI: {student_info} (camera: {camera_id}, confidence: {confidence:.3f})"
-                logger.info(log_message)
-                print(log_message)
-                return True
-            else:
-                logger.error(f"Failed to log attendance: {response.status_code} - {response.text}")
+            for event in batch
+        ]
+        
+        response = self.session.post(ATTENDANCE_BATCH_ENDPOINT, json=payload, timeout=ATTENDANCE_HTTP_TIMEOUT)
+        if response.status_code == 200:
+            return True
+        
+        error = f"{response.status_code} - {response.text[:200]}"
+        if response.status_code >= 500:
+            raise RuntimeError(error)
+        self.last_error = error  # Client error, retrying won't help
+        return False
+    
+    def _deliver(self, batch: List[dict]) -> Optional[bool]:
+        """
+        Deliver a batch through the transport, retrying transient failures with backoff
+        
+        Returns:
+            True if delivered, False if the transport rejected the batch,
+            None if transient failures outlasted the retries
+        """
+        for attempt in range(ATTENDANCE_MAX_RETRIES + 1):
+            if attempt:
+                self.retry_count += 1
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 5))
+            try:
+                if self._transport(batch):
+                    return True
+                logger.error(f"Attendance batch of {len(batch)} rejected: {self.last_error}")
                 return False
-                
-        except Exception as e:
-            logger.error(f"Error calling attendance API: {e}")
-            return False
+            except Exception as e:
+                self.last_error = str(e)
+        
+        logger.error(f"Failed to log {len(batch)} attendance records: {self.last_error}")
+        return None
+    
+    def _send_batch(self, batch: List[dict]):
+        """Deliver a batch of events and update metrics"""
+        self.batch_count += 1
+        # Only link crops that made it to disk
+        paths = self.crop_store.written_paths([event.pop("image_write", None) for event in batch])
+        for event, path in zip(batch, paths):
+            event["image_path"] = path
+        self._send_records(batch)
+    
+    def _send_records(self, batch: List[dict]):
+        delivered = self._deliver(batch)
+        if delivered:
+            self._settle(batch, True)
+        elif delivered is False and len(batch) > 1:
+            # One bad record rejects the whole batch: send them one by one so
+            # only the bad ones fail
+            for event in batch:
+                self._send_records([event])
+        elif self.writer is not None and getattr(self.writer, "is_unconfirmed", None) and self.writer.is_unconfirmed(batch):
+            # The API may still write it: keep the dedup keys claimed until it answers
+            self.unconfirmed_count += len(batch)
+            logger.warning(f"{len(batch)} attendance records unconfirmed; waiting for a late reply")
+        else:
+            self._settle(batch, False)
+    
+    def _late_reply(self, batch: List[dict], written: bool):
+        """Settle a batch whose confirmation arrived after it was given up on"""
+        self.unconfirmed_count -= len(batch)
+        self._settle(batch, written)
+    
+    def _settle(self, batch: List[dict], written: bool):
+        """Count a delivered batch as sent, or as failed with its dedup keys released"""
+        if written:
+            for event in batch:
+                self._record_latency(event)
+                student = lookup_cache.get_student(event["student_id"])
+                student_info = f"{student['full_name']} (ID: {event['student_id']})" if student else f"Student ID {event['student_id']}"
+                logger.info(f"✅ BU TALABA DAVOMOTI SAQLANDI: {student_info} (camera: {event['camera_id']}, confidence: {event['confidence']:.3f})")
+            self.sent_count += len(batch)
+        else:
+            self.failed_count += len(batch)
+            for event in batch:
+                self._release((event["student_id"], event["camera_id"]))
+    
+    def _record_latency(self, event: dict):
+        latency_ms = (time.monotonic() - event["queued_at"]) * 1000
+        self.avg_latency_ms += 0.1 * (latency_ms - self.avg_latency_ms)
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+    
+    def get_stats(self) -> dict:
+        """Sink metrics: queue depth, delivery counts, retries and latency"""
+        return {
+            "mode": self.mode,
+            "queue_depth": self.queue.qsize(),
+            "queued": self.queued_count,
+            "sent": self.sent_count,
+            "failed": self.failed_count,
+            "unconfirmed": self.unconfirmed_count,
+            "dropped": self.dropped_count,
+            "retries": self.retry_count,
+            "batches": self.batch_count,
+            "avg_latency_ms": round(self.avg_latency_ms, 2),
+            "max_latency_ms": round(self.max_latency_ms, 2),
+            "last_error": self.last_error,
+            "crop_store": self.crop_store.get_stats()
+        }
+    
+    def close(self, timeout: float = 10.0):
+        """Flush queued events and stop the background thread"""
+        self._stop.set()
+        self._flush_thread.join(timeout)
+        if self._flush_thread.is_alive():
+            logger.warning(f"Attendance sink did not drain in {timeout:.0f}s ({self.queue.qsize()} events left)")
+        self.session.close()
+        self.crop_store.close()
+        if self.writer is not None:
+            self.writer.close()
     
     def cleanup_old_records(self):
         """Clean up old attendance records from memory"""
         now = datetime.utcnow()
         keys_to_remove = []
         
-        for key, last_time in self.last_attendance.items():
-            time_diff = (now - last_time).total_seconds()
-            if time_diff > self.window_seconds * 2:  # Keep records for 2x window
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.last_attendance[key]
-
+        with self._lock:
+            for key, last_time in self.last_attendance.items():
+                time_diff = (now - last_time).total_seconds()
+                if time_diff > self.window_seconds * 2:  # Keep records for 2x window
+                    keys_to_remove.append(key)
+            
+            for key in keys_to_remove:
+                del self.last_attendance[key]
@@ -4,7 +4,22 @@ Camera manager for RTSP and laptop cameras
 import cv2
 import logging
 from typing import Optional, Tuple
-from .config import RTSP_CAMERAS, LAPTOP_CAMERA_INDEX, USE_LAPTOP_CAMERA, RECONNECT_DELAY, MAX_RECONNECT_ATTEMPTS
+from .config import (
+    RTSP_CAMERAS,
+    LAPTOP_CAMERA_INDEX,
+    USE_LAPTOP_CAMERA,
+    RECONNECT_DELAY,
+    MAX_RECONNECT_ATTEMPTS,
+    CAPTURE_BACKEND,
+    CAPTURE_FPS,
+    CAPTURE_WIDTH,
+    CAPTURE_HEIGHT,
+    CAPTURE_SKIP_FRAMES,
+    CAPTURE_DECODER_THREADS,
+    CAPTURE_READ_TIMEOUT,
+)
+from .ffmpeg_capture import FFmpegCapture, open_gstreamer_capture
+from .main_stream import MainStreamGrabber
 import time
 
 logger = logging.getLogger(__name__)
@@ -13,32 +28,61 @@ logger = logging.getLogger(__name__)
 class CameraManager:
     """Manages camera connections (RTSP and laptop)"""
     
-    def __init__(self, camera_id: int, camera_type: str, rtsp_url: Optional[str] = None, camera_index: Optional[int] = None):
+    def __init__(
+        self,
+        camera_id: int,
+        camera_type: str,
+        rtsp_url: Optional[str] = None,
+        camera_index: Optional[int] = None,
+        substream_url: Optional[str] = None,
+        capture_backend: Optional[str] = None
+    ):
         self.camera_id = camera_id
         self.camera_type = camera_type
         self.rtsp_url = rtsp_url
         self.camera_index = camera_index
-        self.cap: Optional[cv2.VideoCapture] = None
+        self.substream_url = substream_url
+        # Frames are read from the substream when there is one; the main
+        # stream is only opened on demand for high-resolution face crops
+        self.detect_url = substream_url or rtsp_url
+        self.main_stream: Optional[MainStreamGrabber] = None
+        if substream_url and rtsp_url:
+            self.main_stream = MainStreamGrabber(camera_id, rtsp_url)
+        self.capture_backend = (capture_backend or CAPTURE_BACKEND).lower()
+        self.active_backend: Optional[str] = None
+        self.cap = None  # cv2.VideoCapture or FFmpegCapture
         self.reconnect_attempts = 0
         self.is_connected = False
     
+    @classmethod
+    def from_spec(cls, spec: dict) -> "CameraManager":
+        """Create a manager from a camera spec (ignores processing-only keys)"""
+        return cls(
+            camera_id=spec["camera_id"],
+            camera_type=spec["camera_type"],
+            rtsp_url=spec.get("rtsp_url"),
+            camera_index=spec.get("camera_index"),
+            substream_url=spec.get("substream_url"),
+            capture_backend=spec.get("capture_backend")
+        )
+    
     def connect(self) -> bool:
         """Connect to camera"""
         try:
             if self.camera_type == "rtsp":
-                if not self.rtsp_url:
+                if not self.detect_url:
                     logger.error(f"Camera {self.camera_id}: RTSP URL not provided")
                     return False
                 
-                logger.info(f"Camera {self.camera_id}: Connecting to RTSP stream: {self.rtsp_url}")
-                self.cap = cv2.VideoCapture(self.rtsp_url)
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce latency
-                
+                logger.info(f"Camera {self.camera_id}: Connecting to RTSP stream: {self.detect_url} ({self.capture_backend})")
+                self.cap = self._open_rtsp()
+            
             elif self.camera_type == "laptop":
                 index = self.camera_index if self.camera_index is not None else LAPTOP_CAMERA_INDEX
                 logger.info(f"Camera {self.camera_id}: Connecting to laptop camera index {index}")
                 self.cap = cv2.VideoCapture(index)
                 self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                self.active_backend = "opencv"
             
             else:
                 logger.error(f"Camera {self.camera_id}: Unknown camera type: {self.camera_type}")
@@ -61,17 +105,63 @@ class CameraManager:
             self.reconnect_attempts = 0
             logger.info(f"Camera {self.camera_id}: Connected successfully")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Camera {self.camera_id}: Connection error: {e}")
             self.disconnect()
             return False
     
+    def _open_rtsp(self):
+        """
+        Open the RTSP stream with the configured capture backend
+        
+        ffmpeg/gstreamer drop frames and scale down inside the decoder, so
+        Python only ever sees frames at CAPTURE_FPS and CAPTURE_WIDTH/HEIGHT.
+        Falls back to plain OpenCV if the backend is unavailable.
+        """
+        options = {
+            "target_fps": CAPTURE_FPS or None,
+            "width": CAPTURE_WIDTH or None,
+            "height": CAPTURE_HEIGHT or None
+        }
+        
+        if self.capture_backend == "ffmpeg":
+            cap = FFmpegCapture(
+                self.detect_url,
+                skip_frames=CAPTURE_SKIP_FRAMES,
+                decoder_threads=CAPTURE_DECODER_THREADS,
+                read_timeout=CAPTURE_READ_TIMEOUT,
+                **options
+            )
+            if cap.isOpened():
+                self.active_backend = "ffmpeg"
+                return cap
+            cap.release()
+            logger.warning(f"Camera {self.camera_id}: ffmpeg capture failed, falling back to OpenCV")
+        
+        elif self.capture_backend == "gstreamer":
+            cap = open_gstreamer_capture(self.detect_url, **options)
+            if cap.isOpened():
+                self.active_backend = "gstreamer"
+                return cap
+            cap.release()
+            logger.warning(f"Camera {self.camera_id}: GStreamer capture failed, falling back to OpenCV")
+        
+        elif self.capture_backend != "opencv":
+            logger.warning(f"Camera {self.camera_id}: Unknown capture backend '{self.capture_backend}', using OpenCV")
+        
+        cap = cv2.VideoCapture(self.detect_url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce latency
+        self.active_backend = "opencv"
+        return cap
+    
     def disconnect(self):
         """Disconnect from camera"""
         if self.cap is not None:
             self.cap.release()
             self.cap = None
+        if self.main_stream is not None:
+            self.main_stream.close()
         self.is_connected = False
     
     def read_frame(self) -> Optional[Tuple[bool, any]]:
@@ -94,7 +184,7 @@ class CameraManager:
                 return None
             
             return (ret, frame)
-            
+        
         except Exception as e:
             logger.error(f"Camera {self.camera_id}: Error reading frame: {e}")
             self.is_connected = False
@@ -121,6 +211,9 @@ class CameraManager:
             "camera_type": self.camera_type,
             "rtsp_url": self.rtsp_url,
             "camera_index": self.camera_index,
+            "substream_url": self.substream_url,
+            "main_stream": self.main_stream.get_stats() if self.main_stream else None,
+            "capture_backend": self.active_backend,
             "is_connected": self.is_connected,
             "reconnect_attempts": self.reconnect_attempts
         }
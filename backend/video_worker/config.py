@@ -18,7 +18,8 @@ except Exception:
 
 # API endpoint
 API_URL = os.getenv("API_URL", "http://localhost:8000")
-ATTENDANCE_ENDPOINT = f"{API_URL}/api/attendance"
+ATTENDANCE_ENDPOINT = f"{API_URL}/api/attendance/"  # trailing slash avoids a 307 redirect per request
+ATTENDANCE_BATCH_ENDPOINT = f"{API_URL}/api/attendance/batch"
 
 # Camera configuration
 RTSP_CAMERAS = os.getenv("RTSP_CAMERAS", "").split(",") if os.getenv("RTSP_CAMERAS") else []
@@ -29,7 +30,20 @@ USE_LAPTOP_CAMERA = os.getenv("USE_LAPTOP_CAMERA", "false").lower() == "true"
 
 # Face detection/recognition
 FACE_DETECTION_THRESHOLD = float(os.getenv("FACE_DETECTION_THRESHOLD", "0.5"))
+# Lowest score SCRFD returns; per-camera detection_threshold may not go below it
+MIN_DETECTION_THRESHOLD = float(os.getenv("MIN_DETECTION_THRESHOLD", "0.2"))
 FACE_RECOGNITION_THRESHOLD = float(os.getenv("FACE_RECOGNITION_THRESHOLD", "0.4"))
+DET_SIZE = int(os.getenv("DET_SIZE", "640"))  # SCRFD input size (square)
+
+# Tiled detection (cameras with tiled_detection=True): the frame is split into
+# overlapping TILE_SIZE tiles detected at native resolution, plus one downscaled
+# full-frame pass for faces larger than TILE_OVERLAP
+TILE_SIZE = int(os.getenv("TILE_SIZE", "640"))
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "160"))  # pixels
+TILE_NMS_IOU = float(os.getenv("TILE_NMS_IOU", "0.4"))
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", "2"))  # tiles detected concurrently
+TILE_MOTION_THRESHOLD = int(os.getenv("TILE_MOTION_THRESHOLD", "15"))  # gray level change
+TILE_FULL_SCAN_INTERVAL = int(os.getenv("TILE_FULL_SCAN_INTERVAL", "10"))  # frames; 1 = no tile skipping
 MODEL_NAME = os.getenv("MODEL_NAME", "buffalo_l")
 USE_GPU = os.getenv("USE_GPU", "false").lower() == "true"
 MODEL_DIR = Path(os.getenv("MODEL_DIR", "./models"))
@@ -38,14 +52,107 @@ MODEL_DIR = Path(os.getenv("MODEL_DIR", "./models"))
 DEEPSORT_ENABLED = os.getenv("DEEPSORT_ENABLED", "false").lower() == "true"
 
 # Processing settings
-FRAME_SKIP = int(os.getenv("FRAME_SKIP", "2"))  # Process every Nth frame
+FRAME_SKIP = int(os.getenv("FRAME_SKIP", "2"))  # Process every Nth frame (only when target fps is 0)
+# Processing rate per camera (frames/s) unless the camera sets target_fps; 0 = use FRAME_SKIP
+DEFAULT_TARGET_FPS = float(os.getenv("DEFAULT_TARGET_FPS", "5"))
 DETECTED_FACES_DIR = Path(os.getenv("DETECTED_FACES_DIR", "./data/detected_faces"))
 DETECTED_FACES_DIR.mkdir(exist_ok=True, parents=True)
 
+# Main/sub-stream split: cameras with a substream_url detect on the substream
+# and crop faces from the main stream, which is only decoded while crops are requested
+MAIN_STREAM_IDLE_TIMEOUT = float(os.getenv("MAIN_STREAM_IDLE_TIMEOUT", "10"))  # seconds
+MAIN_STREAM_MAX_SKEW = float(os.getenv("MAIN_STREAM_MAX_SKEW", "0.5"))  # max sub/main frame time difference, seconds
+
+# Static face suppression: faces whose box and appearance do not change for
+# STATIC_FACE_SECONDS (posters, photos, screens) are excluded from recognition
+STATIC_FACE_FILTER = os.getenv("STATIC_FACE_FILTER", "true").lower() == "true"
+STATIC_FACE_SECONDS = float(os.getenv("STATIC_FACE_SECONDS", "60"))
+STATIC_FACE_IOU = float(os.getenv("STATIC_FACE_IOU", "0.9"))  # min box overlap to count as not moved
+STATIC_FACE_MAX_DIFF = float(os.getenv("STATIC_FACE_MAX_DIFF", "3.0"))  # mean gray level difference
+STATIC_FACE_RECHECK_SECONDS = float(os.getenv("STATIC_FACE_RECHECK_SECONDS", "300"))
+
 # Duplicate prevention
 DUPLICATE_PREVENTION_WINDOW_SECONDS = int(os.getenv("DUPLICATE_PREVENTION_WINDOW_SECONDS", "60"))
 
+# Hot reload: how often the worker checks the camera config version in the DB
+# (the API also pushes changes directly to an embedded worker)
+CAMERA_RELOAD_INTERVAL = float(os.getenv("CAMERA_RELOAD_INTERVAL", "5"))  # seconds
+
 # Camera reconnection
 RECONNECT_DELAY = int(os.getenv("RECONNECT_DELAY", "5"))  # seconds
 MAX_RECONNECT_ATTEMPTS = int(os.getenv("MAX_RECONNECT_ATTEMPTS", "10"))
 
+
+# Multi-process worker (supervisor)
+# 0 = one detection process per CPU core (capped by camera count)
+VIDEO_WORKER_PROCESSES = int(os.getenv("VIDEO_WORKER_PROCESSES", "0"))
+FRAME_RING_SLOTS = int(os.getenv("FRAME_RING_SLOTS", "4"))
+FRAME_RING_MAX_WIDTH = int(os.getenv("FRAME_RING_MAX_WIDTH", "1920"))
+FRAME_RING_MAX_HEIGHT = int(os.getenv("FRAME_RING_MAX_HEIGHT", "1080"))
+PROCESS_RESTART_DELAY = float(os.getenv("PROCESS_RESTART_DELAY", "2"))  # seconds, doubles on repeated crashes
+PROCESS_RESTART_MAX_DELAY = float(os.getenv("PROCESS_RESTART_MAX_DELAY", "60"))
+
+# Frame bus: one capture per camera shared by the worker and MJPEG previews.
+# A worker process exports frames to shared memory only while a preview reads them.
+FRAME_BUS_RING_PREFIX = os.getenv("FRAME_BUS_RING_PREFIX", "facezz_bus")
+FRAME_BUS_EXPORT_FPS = float(os.getenv("FRAME_BUS_EXPORT_FPS", "15"))
+FRAME_BUS_SLOW_EXPORT_FPS = float(os.getenv("FRAME_BUS_SLOW_EXPORT_FPS", "1"))  # while only snapshots read
+FRAME_BUS_MAX_WIDTH = int(os.getenv("FRAME_BUS_MAX_WIDTH", "1280"))  # exported frames are downscaled to fit
+FRAME_BUS_MAX_HEIGHT = int(os.getenv("FRAME_BUS_MAX_HEIGHT", "720"))
+FRAME_BUS_STALE_AFTER = float(os.getenv("FRAME_BUS_STALE_AFTER", "5"))  # seconds without frames before capturing directly
+
+# Preview overlays: how long a recognized name stays attached to a track that is no longer seen
+TRACK_IDENTITY_TTL = float(os.getenv("TRACK_IDENTITY_TTL", "30"))  # seconds
+
+# Pipeline stages (bounded queues drop the oldest item when full)
+DETECT_QUEUE_SIZE = int(os.getenv("DETECT_QUEUE_SIZE", "4"))
+RECOGNIZE_QUEUE_SIZE = int(os.getenv("RECOGNIZE_QUEUE_SIZE", "32"))
+SINK_QUEUE_SIZE = int(os.getenv("SINK_QUEUE_SIZE", "256"))
+DETECT_WORKERS = int(os.getenv("DETECT_WORKERS", "1"))
+RECOGNIZE_WORKERS = int(os.getenv("RECOGNIZE_WORKERS", "1"))
+
+# Adaptive load shedding: camera rates are lowered (lowest priority first) while the
+# capture-to-recognition latency is over budget and restored once it drops below half of it
+LATENCY_BUDGET_MS = float(os.getenv("LATENCY_BUDGET_MS", "1000"))
+RATE_MIN_SCALE = float(os.getenv("RATE_MIN_SCALE", "0.2"))  # never go below 20% of target fps
+RATE_STEP_DOWN = float(os.getenv("RATE_STEP_DOWN", "0.8"))
+RATE_STEP_UP = float(os.getenv("RATE_STEP_UP", "1.1"))
+RATE_CONTROL_INTERVAL = float(os.getenv("RATE_CONTROL_INTERVAL", "2"))  # seconds
+# Cameras slowed to this fraction of their target (or less) also detect at a smaller input size
+DET_SIZE_DEGRADE_SCALE = float(os.getenv("DET_SIZE_DEGRADE_SCALE", "0.5"))
+DEGRADED_DET_SIZE = int(os.getenv("DEGRADED_DET_SIZE", "320"))
+
+# Attendance sink (background batched delivery to the API)
+ATTENDANCE_QUEUE_SIZE = int(os.getenv("ATTENDANCE_QUEUE_SIZE", "1000"))
+ATTENDANCE_BATCH_SIZE = int(os.getenv("ATTENDANCE_BATCH_SIZE", "50"))
+ATTENDANCE_FLUSH_INTERVAL = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL", "0.5"))  # seconds
+ATTENDANCE_MAX_RETRIES = int(os.getenv("ATTENDANCE_MAX_RETRIES", "3"))
+ATTENDANCE_HTTP_TIMEOUT = float(os.getenv("ATTENDANCE_HTTP_TIMEOUT", "5"))
+ATTENDANCE_HTTP_POOL_SIZE = int(os.getenv("ATTENDANCE_HTTP_POOL_SIZE", "4"))
+# auto: write directly to the DB when embedded in the API process, HTTP otherwise
+# http: always POST to ATTENDANCE_BATCH_ENDPOINT; direct: in-process writer when available
+ATTENDANCE_SINK_MODE = os.getenv("ATTENDANCE_SINK_MODE", "auto").lower()
+
+# Face crop storage (written off the hot path, sharded by date and camera)
+CROP_WRITER_WORKERS = int(os.getenv("CROP_WRITER_WORKERS", "2"))
+CROP_FORMAT = os.getenv("CROP_FORMAT", "jpeg").lower()  # jpeg or webp
+CROP_QUALITY = int(os.getenv("CROP_QUALITY", "85"))
+CROP_MAX_SIZE = int(os.getenv("CROP_MAX_SIZE", "256"))  # longest side, pixels
+CROP_MAX_PENDING = int(os.getenv("CROP_MAX_PENDING", "200"))
+CROP_WRITE_TIMEOUT = float(os.getenv("CROP_WRITE_TIMEOUT", "5"))  # seconds a batch waits for its crops
+
+# Capture backend for RTSP cameras
+# opencv: cv2.VideoCapture (decodes every frame at full resolution)
+# ffmpeg: ffmpeg subprocess piping raw BGR frames (needs ffmpeg/ffprobe in PATH)
+# gstreamer: GStreamer appsink pipeline (needs OpenCV built with GStreamer)
+CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "opencv").lower()
+# ffmpeg/gstreamer only: output rate and size (0 = source); keep CAPTURE_FPS >= the cameras' target fps
+CAPTURE_FPS = float(os.getenv("CAPTURE_FPS", "0"))
+CAPTURE_WIDTH = int(os.getenv("CAPTURE_WIDTH", "0"))  # one side only keeps aspect ratio
+CAPTURE_HEIGHT = int(os.getenv("CAPTURE_HEIGHT", "0"))
+# ffmpeg only: -skip_frame (default, nonref, bidir, nokey = keyframes only)
+CAPTURE_SKIP_FRAMES = os.getenv("CAPTURE_SKIP_FRAMES", "default").lower()
+CAPTURE_DECODER_THREADS = int(os.getenv("CAPTURE_DECODER_THREADS", "1"))
+# ffmpeg only: seconds without a complete frame before the ffmpeg process is killed
+# and the camera reconnects (keep above the keyframe interval with CAPTURE_SKIP_FRAMES=nokey)
+CAPTURE_READ_TIMEOUT = float(os.getenv("CAPTURE_READ_TIMEOUT", "15"))
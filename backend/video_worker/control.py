@@ -0,0 +1,279 @@
+"""
+Local control channel for a video worker running in its own process
+
+The API process launches the worker as a child (see app/worker_process.py)
+and talks to it over an authenticated Unix socket: one short connection per
+command, a (command, args) request and a {"ok", "result" | "error"} reply.
+Attendance batches go back to the parent over a pipe, so rows are still
+written by the API process without a loopback HTTP round trip.
+"""
+import logging
+import os
+import signal
+from abc import ABC, abstractmethod
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, List, Optional
+
+from .result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+# Commands understood by WorkerControlServer
+COMMANDS = ("ping", "stats", "static_faces", "clear_static_faces", "reload_cameras", "results", "stop")
+
+
+class WorkerControlError(Exception):
+    """Worker process not reachable or command failed"""
+
+
+class ControlServer(ABC):
+    """
+    Serves control commands on a Unix socket (daemon thread)
+    
+    Subclasses implement handle(); each connection carries one command.
+    """
+    
+    def __init__(self, socket_path: str, authkey: bytes):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.started_at = time.time()
+        
+        # A socket left behind by a crashed process would make bind() fail
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+        os.chmod(socket_path, 0o600)
+        # A successor may bind the same path before we close; only remove our own socket
+        self._inode = os.stat(socket_path).st_ino
+        self._thread = threading.Thread(target=self._serve, name="control-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Control socket: {socket_path}")
+    
+    def _serve(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break  # Listener closed
+            except Exception as e:
+                logger.warning(f"Rejected control connection: {e}")
+                continue
+            
+            try:
+                if not conn.poll(5):
+                    continue
+                command, args = conn.recv()
+                try:
+                    conn.send({"ok": True, "result": self.handle(command, args)})
+                except Exception as e:
+                    conn.send({"ok": False, "error": str(e)})
+            except (EOFError, OSError, ValueError):
+                pass
+            finally:
+                conn.close()
+    
+    @abstractmethod
+    def handle(self, command: str, args: dict):
+        """Run one command and return its (picklable) result"""
+    
+    def close(self):
+        try:
+            self.listener.close()
+        except OSError:
+            pass
+        try:
+            if os.stat(self.socket_path).st_ino == self._inode:
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+class WorkerControlServer(ControlServer):
+    """Control commands for the VideoWorker of this process"""
+    
+    def __init__(self, socket_path: str, authkey: bytes):
+        self.worker = None  # Set once models are loaded
+        self.stop_requested = threading.Event()
+        super().__init__(socket_path, authkey)
+    
+    def handle(self, command: str, args: dict):
+        worker = self.worker
+        if command == "ping":
+            return {
+                "pid": os.getpid(),
+                "ready": worker is not None and worker.running,
+                "uptime": round(time.time() - self.started_at, 1)
+            }
+        if command == "stop":
+            self.request_stop()
+            return True
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+        if worker is None:
+            return None  # Still loading models
+        
+        if command == "stats":
+            return worker.get_stats()
+        if command == "static_faces":
+            return worker.static_faces.get_static_regions() if worker.static_faces is not None else {}
+        if command == "clear_static_faces":
+            if worker.static_faces is not None:
+                worker.static_faces.clear(args.get("camera_id"))
+            return True
+        if command == "reload_cameras":
+            worker.request_camera_reload()
+            return True
+        if command == "results":
+            return result_store.get(args["camera_id"], args.get("since_seq", 0))
+    
+    def request_stop(self):
+        """Stop the worker; VideoWorker.shutdown() drains the pipeline and attendance sink"""
+        self.stop_requested.set()
+        if self.worker is not None:
+            self.worker.request_stop()
+
+
+class ControlClient:
+    """Sends commands to a ControlServer (worker process or API leader)"""
+    
+    def __init__(self, socket_path: str, authkey: bytes, timeout: float = 5.0):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.timeout = timeout
+    
+    def call(self, command: str, timeout: Optional[float] = None, **args):
+        """
+        Run a command in the worker process
+        
+        Raises:
+            WorkerControlError: Socket unreachable, timeout or command error
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            conn = Client(self.socket_path, family="AF_UNIX", authkey=self.authkey)
+        except Exception as e:
+            raise WorkerControlError(f"Video worker control socket unreachable: {e}") from e
+        
+        try:
+            conn.send((command, args))
+            if not conn.poll(timeout):
+                raise WorkerControlError(f"Video worker did not answer '{command}' in {timeout:g}s")
+            reply = conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerControlError(f"Video worker control connection lost: {e}") from e
+        finally:
+            conn.close()
+        
+        if not reply["ok"]:
+            raise WorkerControlError(reply["error"])
+        return reply["result"]
+
+
+class ChannelAttendanceWriter:
+    """
+    Attendance writer that hands batches to the parent API process over a pipe
+    
+    Same interface as app.services.attendance_writer.AttendanceWriter; the
+    parent relays each batch to a real AttendanceWriter and answers with the
+    result. Raising on timeout lets AttendanceManager retry the batch.
+    
+    The parent never abandons a batch it received, so a slow write still
+    commits after we timed out. A retry of that batch is therefore not sent
+    again: it keeps waiting for the reply to the original request. Replies
+    to batches the caller gave up on are passed to on_late_reply.
+    """
+    
+    def __init__(self, conn, timeout: float = 10.0):
+        self.conn = conn
+        self.timeout = timeout
+        self._seq = 0
+        self._lock = threading.Lock()
+        # request_id -> records of batches whose reply is still outstanding
+        self._unconfirmed: Dict[tuple, List[dict]] = {}
+        # Called as on_late_reply(records, written) when a given-up batch is answered
+        self.on_late_reply: Optional[Callable[[List[dict], bool], None]] = None
+    
+    def is_unconfirmed(self, records: List[dict]) -> bool:
+        """Whether records were sent but the parent has not answered yet"""
+        with self._lock:
+            return any(pending is records for pending in self._unconfirmed.values())
+    
+    def write_batch(self, records: List[dict]) -> bool:
+        with self._lock:
+            request_id = next((rid for rid, pending in self._unconfirmed.items() if pending is records), None)
+            if request_id is None:
+                # pid in the id: a reply meant for a crashed predecessor is skipped
+                self._seq += 1
+                request_id = (os.getpid(), self._seq)
+                self.conn.send((request_id, records))
+                self._unconfirmed[request_id] = records
+            
+            deadline = time.monotonic() + self.timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.conn.poll(remaining):
+                    raise RuntimeError(f"API process did not confirm attendance batch in {self.timeout:.0f}s")
+                reply_id, ok, error = self.conn.recv()
+                answered = self._unconfirmed.pop(reply_id, None)
+                if answered is None:
+                    continue
+                if reply_id != request_id:
+                    # Late reply to a batch that was given up on
+                    if self.on_late_reply is not None:
+                        self.on_late_reply(answered, bool(ok) and not error)
+                    continue
+                if error:
+                    raise RuntimeError(error)  # Not written (rolled back); a retry sends it again
+                return ok
+    
+    def close(self):
+        # The pipe belongs to the parent; it outlives worker restarts
+        pass
+
+
+def run_worker_process(socket_path: str, authkey: bytes, attendance_conn=None, parent_pid: Optional[int] = None):
+    """
+    Child process entry point: run a VideoWorker with a control socket
+    
+    Args:
+        socket_path: Unix socket for WorkerControlServer
+        authkey: Shared secret for the control socket
+        attendance_conn: Pipe end to the parent's attendance relay (None = HTTP)
+        parent_pid: Stop when this process goes away (no orphaned workers)
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    # Ctrl+C reaches the whole process group; the parent decides when we stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    server = WorkerControlServer(socket_path, authkey)
+    signal.signal(signal.SIGTERM, lambda *_: server.request_stop())
+    
+    def watch_parent():
+        while not server.stop_requested.is_set():
+            if parent_pid is not None and os.getppid() != parent_pid:
+                logger.warning("API process exited, stopping video worker")
+                server.request_stop()
+                break
+            time.sleep(2)
+    
+    threading.Thread(target=watch_parent, name="parent-watch", daemon=True).start()
+    
+    try:
+        from .main import VideoWorker
+        from .frame_bus import frame_bus
+        
+        # MJPEG previews in the API read frames from this process
+        frame_bus.enable_export()
+        writer = ChannelAttendanceWriter(attendance_conn) if attendance_conn is not None else None
+        worker = VideoWorker(attendance_writer=writer)
+        if server.stop_requested.is_set():
+            return
+        server.worker = worker
+        worker.run()
+    finally:
+        server.close()
@@ -0,0 +1,159 @@
+"""
+Face crop persistence off the frame-processing hot path
+"""
+import cv2
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from .config import (
+    DETECTED_FACES_DIR,
+    CROP_WRITER_WORKERS,
+    CROP_FORMAT,
+    CROP_QUALITY,
+    CROP_MAX_SIZE,
+    CROP_MAX_PENDING,
+    CROP_WRITE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class CropStore:
+    """
+    Encodes and writes face crops on a small thread pool
+    
+    Files are sharded as <base>/YYYY/MM/DD/cam_<camera_id>/<student>_<uuid>.<ext>
+    so no single directory grows without bound; the layout mirrors the
+    /static/detected_faces mount, so every path stays servable.
+    """
+    
+    def __init__(
+        self,
+        base_dir: Path = DETECTED_FACES_DIR,
+        workers: int = CROP_WRITER_WORKERS,
+        image_format: str = CROP_FORMAT,
+        quality: int = CROP_QUALITY,
+        max_size: int = CROP_MAX_SIZE
+    ):
+        if image_format not in _FORMATS:
+            logger.warning(f"Unknown crop format '{image_format}', using jpeg")
+            image_format = "jpeg"
+        
+        self.base_dir = Path(base_dir)
+        self.extension, quality_flag = _FORMATS[image_format]
+        self.encode_params = [quality_flag, quality]
+        self.max_size = max_size
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="crop-writer")
+        self._created_dirs = set()
+        self._lock = threading.Lock()
+        
+        self.pending = 0
+        self.written_count = 0
+        self.failed_count = 0
+        self.skipped_count = 0
+        self.avg_write_ms = 0.0
+    
+    def build_path(self, student_id: int, camera_id: int, captured_at: datetime) -> Path:
+        """Date/camera-sharded path for a new crop"""
+        directory = self.base_dir / captured_at.strftime("%Y/%m/%d") / f"cam_{camera_id}"
+        return directory / f"{student_id}_{uuid.uuid4()}{self.extension}"
+    
+    def save(
+        self,
+        face_image: np.ndarray,
+        student_id: int,
+        camera_id: int,
+        captured_at: Optional[datetime] = None
+    ) -> Optional[Future]:
+        """
+        Schedule a crop for writing
+        
+        Returns:
+            Future resolving to the file path once written (None if the write
+            failed), or None if the writer is backlogged and the crop was skipped
+        """
+        with self._lock:
+            if self.pending >= CROP_MAX_PENDING:
+                self.skipped_count += 1
+                return None
+            self.pending += 1
+        
+        path = self.build_path(student_id, camera_id, captured_at or datetime.utcnow())
+        return self.executor.submit(self._write, path, face_image)
+    
+    def written_paths(self, writes: List[Optional[Future]], timeout: float = CROP_WRITE_TIMEOUT) -> List[Optional[str]]:
+        """
+        Wait for scheduled writes, sharing one timeout across all of them
+        
+        Returns:
+            File path per write: None if it was skipped, failed or is still
+            not written after the timeout
+        """
+        pending = [write for write in writes if write is not None]
+        not_done = wait(pending, timeout).not_done if pending else ()
+        if not_done:
+            logger.warning(f"{len(not_done)} face images not written within {timeout:.0f}s, saving attendance without them")
+        return [
+            write.result() if write is not None and write not in not_done else None
+            for write in writes
+        ]
+    
+    def _write(self, path: Path, face_image: np.ndarray) -> Optional[str]:
+        started = time.monotonic()
+        try:
+            height, width = face_image.shape[:2]
+            if max(height, width) > self.max_size:
+                scale = self.max_size / max(height, width)
+                face_image = cv2.resize(
+                    face_image,
+                    (max(1, int(width * scale)), max(1, int(height * scale))),
+                    interpolation=cv2.INTER_AREA
+                )
+            
+            ok, buffer = cv2.imencode(self.extension, face_image, self.encode_params)
+            if not ok:
+                raise ValueError("image encoding failed")
+            
+            if path.parent not in self._created_dirs:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._created_dirs.add(path.parent)
+            path.write_bytes(buffer.tobytes())
+            
+            with self._lock:
+                self.written_count += 1
+                elapsed_ms = (time.monotonic() - started) * 1000
+                self.avg_write_ms += 0.1 * (elapsed_ms - self.avg_write_ms)
+            return str(path)
+        except Exception as e:
+            with self._lock:
+                self.failed_count += 1
+            logger.error(f"Error saving face image {path}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self.pending -= 1
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "written": self.written_count,
+                "failed": self.failed_count,
+                "skipped": self.skipped_count,
+                "avg_write_ms": round(self.avg_write_ms, 2)
+            }
+    
+    def close(self):
+        """Wait for pending writes"""
+        self.executor.shutdown(wait=True)
@@ -5,7 +5,9 @@ import cv2
 import numpy as np
 import logging
 from typing import List, Tuple, Optional
-from .config import FACE_DETECTION_THRESHOLD, USE_GPU
+from concurrent.futures import ThreadPoolExecutor
+from .config import FACE_DETECTION_THRESHOLD, MIN_DETECTION_THRESHOLD, USE_GPU, DET_SIZE, TILE_SIZE, TILE_WORKERS
+from .tiling import merge_detections, touches_inner_edge
 import os
 
 logger = logging.getLogger(__name__)
@@ -16,6 +18,8 @@ class FaceDetector:
     
     def __init__(self):
         self.detector = None
+        # Threads are only started on the first tiled detection
+        self._tile_pool = ThreadPoolExecutor(max_workers=TILE_WORKERS, thread_name_prefix="tile-detect")
         self._init_detector()
     
     def _init_detector(self):
@@ -39,10 +43,16 @@ class FaceDetector:
                 name="buffalo_l",  # Includes SCRFD detector
                 providers=providers
             )
-            self.detector.prepare(ctx_id=0, det_size=(640, 640))
+            # SCRFD drops boxes below det_thresh itself; keep it at the lowest allowed
+            # score so per-camera thresholds are applied in _to_results
+            self.detector.prepare(
+                ctx_id=0,
+                det_thresh=min(MIN_DETECTION_THRESHOLD, FACE_DETECTION_THRESHOLD),
+                det_size=(DET_SIZE, DET_SIZE)
+            )
             
             logger.info("Face detector initialized (SCRFD via InsightFace)")
-            
+        
         except ImportError:
             logger.error("InsightFace not installed. Please install: pip install insightface")
             raise
@@ -50,13 +60,49 @@ class FaceDetector:
             logger.error(f"Error initializing face detector: {e}")
             raise
     
-    def detect_faces(self, image: np.ndarray) -> List[Tuple[int, int, int, int, float]]:
+    def _detect_boxes(self, image: np.ndarray, det_size: Optional[int] = None) -> np.ndarray:
+        """
+        Run the SCRFD detection model
+        
+        Returns:
+            (N, 5) array of [x1, y1, x2, y2, score]
+        """
+        # Detection model only: FaceAnalysis.get() would also run the
+        # landmark/attribute/recognition models on every face
+        input_size = (det_size, det_size) if det_size else None
+        bboxes, _ = self.detector.det_model.detect(image, input_size=input_size, max_num=0, metric='default')
+        if bboxes is None:
+            return np.zeros((0, 5), dtype=np.float32)
+        return bboxes
+    
+    @staticmethod
+    def _to_results(boxes, threshold: Optional[float] = None) -> List[Tuple[int, int, int, int, float]]:
+        """[x1, y1, x2, y2, score] rows above threshold -> (x, y, w, h, confidence)"""
+        threshold = FACE_DETECTION_THRESHOLD if threshold is None else threshold
+        results = []
+        for det in boxes:
+            x1, y1, x2, y2 = (int(v) for v in det[:4])
+            confidence = float(det[4])
+            
+            if confidence >= threshold:
+                results.append((x1, y1, x2 - x1, y2 - y1, confidence))
+        return results
+    
+    def detect_faces(
+        self,
+        image: np.ndarray,
+        det_size: Optional[int] = None,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[int, int, int, int, float]]:
         """
         Detect faces in image
         
         Args:
             image: BGR image (numpy array)
-            
+            det_size: Detector input size (None = DET_SIZE); smaller is faster
+                but misses small faces
+            threshold: Minimum detection score (None = FACE_DETECTION_THRESHOLD)
+        
         Returns:
             List of (x, y, w, h, confidence) tuples
         """
@@ -64,26 +110,64 @@ class FaceDetector:
             return []
         
         try:
-            faces = self.detector.get(image)
-            
-            if not faces:
-                return []
-            
-            results = []
-            for face in faces:
-                bbox = face.bbox.astype(int)  # [x1, y1, x2, y2]
-                confidence = face.det_score
-                
-                if confidence >= FACE_DETECTION_THRESHOLD:
-                    x, y, w, h = bbox[0], bbox[1], bbox[2] - bbox[0], bbox[3] - bbox[1]
-                    results.append((x, y, w, h, float(confidence)))
-            
-            return results
-            
+            return self._to_results(self._detect_boxes(image, det_size), threshold)
+        
         except Exception as e:
             logger.error(f"Error detecting faces: {e}")
             return []
     
+    def detect_faces_tiled(
+        self,
+        image: np.ndarray,
+        tiles: List[Tuple[int, int, int, int]],
+        det_size: Optional[int] = None,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[int, int, int, int, float]]:
+        """
+        Detect small faces in a high-resolution image tile by tile
+        
+        Each tile is detected at native resolution (TILE_SIZE input), tiles
+        run concurrently on a small thread pool (onnxruntime releases the
+        GIL), and a downscaled full-frame pass catches faces larger than
+        the tile overlap. Boxes cut by an inner tile border are dropped and
+        the rest merged with cross-tile NMS.
+        
+        Args:
+            image: BGR image
+            tiles: (x0, y0, x1, y1) tiles to scan (see TileScheduler)
+            det_size: Input size of the full-frame pass (None = DET_SIZE)
+            threshold: Minimum detection score (None = FACE_DETECTION_THRESHOLD)
+        
+        Returns:
+            List of (x, y, w, h, confidence) tuples
+        """
+        if self.detector is None:
+            return []
+        
+        def detect_tile(tile):
+            x0, y0, x1, y1 = tile
+            boxes = self._detect_boxes(image[y0:y1, x0:x1], TILE_SIZE)
+            kept = []
+            for x1b, y1b, x2b, y2b, score in boxes[:, :5]:
+                box = (x1b + x0, y1b + y0, x2b + x0, y2b + y0)
+                if not touches_inner_edge(box, tile, image.shape):
+                    kept.append((*box, score))
+            return kept
+        
+        try:
+            futures = [self._tile_pool.submit(detect_tile, tile) for tile in tiles]
+            candidates = [tuple(det[:5]) for det in self._detect_boxes(image, det_size)]
+            for future in futures:
+                candidates.extend(future.result())
+            
+            threshold = FACE_DETECTION_THRESHOLD if threshold is None else threshold
+            candidates = [box for box in candidates if box[4] >= threshold]
+            return self._to_results(merge_detections(candidates), threshold)
+        
+        except Exception as e:
+            logger.error(f"Error in tiled face detection: {e}")
+            return []
+    
     def extract_face(self, image: np.ndarray, bbox: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
         """
         Extract face region from image
@@ -91,7 +175,7 @@ class FaceDetector:
         Args:
             image: BGR image
             bbox: (x, y, w, h) bounding box
-            
+        
         Returns:
             Extracted face image or None
         """
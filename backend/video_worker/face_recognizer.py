@@ -45,12 +45,13 @@ class FaceRecognizer:
                 if student:
                     print(f"   - {student.full_name} (ID: {student_id})")
     
-    def recognize_face(self, face_image: np.ndarray) -> Optional[Tuple[int, float]]:
+    def recognize_face(self, face_image: np.ndarray, threshold: Optional[float] = None) -> Optional[Tuple[int, float]]:
         """
         Recognize face in image
         
         Args:
             face_image: BGR face image (numpy array)
+            threshold: Similarity threshold (None = FACE_RECOGNITION_THRESHOLD)
             
         Returns:
             (student_id, confidence) tuple or None
@@ -64,7 +65,7 @@ class FaceRecognizer:
                 return None
             
             # Find matching student
-            match = self.embedding_service.find_matching_student(self.db, embedding)
+            match = self.embedding_service.find_matching_student(self.db, embedding, threshold)
             
             if match:
                 logger.debug(f"Match topildi: Student ID {match[0]}, confidence: {match[1]:.3f}")
@@ -0,0 +1,277 @@
+"""
+Reduced-rate / low-resolution capture backends (ffmpeg subprocess, GStreamer appsink)
+
+Both expose the subset of the cv2.VideoCapture interface CameraManager uses
+(isOpened, read, grab, retrieve, set, get, release), so they can be swapped in
+per camera.
+"""
+import json
+import logging
+import shutil
+import subprocess
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def probe_stream_size(url: str, timeout: float = 10.0) -> Optional[Tuple[int, int]]:
+    """Get (width, height) of the first video stream using ffprobe"""
+    if shutil.which("ffprobe") is None:
+        return None
+    
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-rtsp_transport", "tcp",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height",
+        "-of", "json",
+        url
+    ]
+    if not url.startswith("rtsp://"):
+        cmd.remove("-rtsp_transport")
+        cmd.remove("tcp")
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=timeout, text=True)
+        stream = json.loads(result.stdout)["streams"][0]
+        return int(stream["width"]), int(stream["height"])
+    except Exception as e:
+        logger.warning(f"ffprobe failed for {url}: {e}")
+        return None
+
+
+def scaled_size(
+    source: Tuple[int, int],
+    width: Optional[int],
+    height: Optional[int]
+) -> Tuple[int, int]:
+    """Output size keeping aspect ratio when only one dimension is given (even numbers)"""
+    src_w, src_h = source
+    if width and height:
+        out_w, out_h = width, height
+    elif width:
+        out_w, out_h = width, round(src_h * width / src_w)
+    elif height:
+        out_w, out_h = round(src_w * height / src_h), height
+    else:
+        out_w, out_h = src_w, src_h
+    return out_w - out_w % 2, out_h - out_h % 2
+
+
+class FFmpegCapture:
+    """
+    Decode a stream with an ffmpeg subprocess and read raw BGR frames from its stdout
+    
+    Compared to cv2.VideoCapture this lets ffmpeg drop frames (fps filter),
+    skip decoding non-reference or non-key frames (-skip_frame) and scale
+    down before the frame ever reaches Python.
+    
+    A stalled stream is caught twice: ffmpeg's own socket timeout, and a
+    watchdog thread that kills the process when a read has not completed a
+    frame within read_timeout, so grab() fails and the camera reconnects.
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        target_fps: Optional[float] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        skip_frames: str = "default",
+        decoder_threads: int = 1,
+        read_timeout: float = 15.0
+    ):
+        """
+        Args:
+            url: Stream URL (rtsp://, http://, file path)
+            target_fps: Output frame rate (None = source rate)
+            width/height: Output size (one of them keeps aspect ratio)
+            skip_frames: ffmpeg -skip_frame value: default, nonref, bidir or nokey
+            decoder_threads: Decoder threads per camera
+            read_timeout: Seconds a frame read may block before ffmpeg is killed (0 = no limit)
+        """
+        self.url = url
+        self.target_fps = target_fps
+        self.width = width
+        self.height = height
+        self.skip_frames = skip_frames
+        self.decoder_threads = decoder_threads
+        self.read_timeout = read_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.source_size: Optional[Tuple[int, int]] = None
+        self.frame_size: Optional[Tuple[int, int]] = None
+        self._buffer: Optional[bytearray] = None
+        self._pending: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._read_started: Optional[float] = None  # monotonic start of the read in progress
+        self.open()
+    
+    def build_command(self, out_w: int, out_h: int) -> list:
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-threads", str(self.decoder_threads)]
+        timeout_us = str(int(self.read_timeout * 1_000_000))
+        if self.url.startswith("rtsp://"):
+            cmd += ["-rtsp_transport", "tcp"]
+            if self.read_timeout > 0:
+                cmd += ["-timeout", timeout_us]  # socket I/O timeout (ffmpeg 5+)
+        elif "://" in self.url and self.read_timeout > 0:
+            cmd += ["-rw_timeout", timeout_us]
+        cmd += ["-fflags", "nobuffer", "-flags", "low_delay"]
+        if self.skip_frames and self.skip_frames != "default":
+            cmd += ["-skip_frame", self.skip_frames]
+        cmd += ["-i", self.url, "-an", "-sn", "-dn"]
+        
+        filters = []
+        if self.target_fps and self.skip_frames != "nokey":
+            filters.append(f"fps={self.target_fps}")
+        if (out_w, out_h) != self.source_size:
+            filters.append(f"scale={out_w}:{out_h}:flags=fast_bilinear")
+        if filters:
+            cmd += ["-vf", ",".join(filters)]
+        
+        cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        return cmd
+    
+    def open(self) -> bool:
+        if shutil.which("ffmpeg") is None:
+            logger.error("ffmpeg not found in PATH")
+            return False
+        
+        self.source_size = probe_stream_size(self.url)
+        if self.source_size is None:
+            if not (self.width and self.height):
+                logger.error(f"Could not determine stream size for {self.url}; set CAPTURE_WIDTH and CAPTURE_HEIGHT")
+                return False
+            self.source_size = (self.width, self.height)
+        
+        out_w, out_h = scaled_size(self.source_size, self.width, self.height)
+        self.frame_size = (out_w, out_h)
+        self._buffer = bytearray(out_w * out_h * 3)
+        
+        cmd = self.build_command(out_w, out_h)
+        logger.info(f"Starting ffmpeg capture: {' '.join(cmd)}")
+        self.process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        if self.read_timeout > 0:
+            threading.Thread(
+                target=self._watchdog,
+                args=(self.process,),
+                name=f"ffmpeg-watchdog-{self.process.pid}",
+                daemon=True
+            ).start()
+        return True
+    
+    def _watchdog(self, process: subprocess.Popen):
+        """Kill ffmpeg when a read blocks longer than read_timeout (stalled stream)"""
+        while process.poll() is None:
+            time.sleep(min(self.read_timeout / 4, 1.0))
+            started = self._read_started
+            if started is not None and process is self.process and time.monotonic() - started > self.read_timeout:
+                logger.warning(f"ffmpeg capture stalled for {self.read_timeout:.0f}s, killing it: {self.url}")
+                process.kill()
+                return
+    
+    def isOpened(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+    
+    def grab(self) -> bool:
+        """Read the next frame from the pipe (kept for retrieve())"""
+        with self._lock:
+            if not self.isOpened():
+                return False
+            
+            view = memoryview(self._buffer)
+            total = len(self._buffer)
+            read = 0
+            self._read_started = time.monotonic()
+            try:
+                while read < total:
+                    n = self.process.stdout.readinto(view[read:])
+                    if not n:
+                        return False  # ffmpeg exited (stream ended, failed or killed by the watchdog)
+                    read += n
+            finally:
+                self._read_started = None
+            
+            out_w, out_h = self.frame_size
+            self._pending = np.frombuffer(self._buffer, dtype=np.uint8).reshape(out_h, out_w, 3).copy()
+            return True
+    
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        frame, self._pending = self._pending, None
+        return (frame is not None, frame)
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return (False, None)
+        return self.retrieve()
+    
+    def set(self, prop_id: int, value) -> bool:
+        # Output geometry is fixed at spawn time
+        return False
+    
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH and self.frame_size:
+            return float(self.frame_size[0])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT and self.frame_size:
+            return float(self.frame_size[1])
+        if prop_id == cv2.CAP_PROP_FPS and self.target_fps:
+            return float(self.target_fps)
+        return 0.0
+    
+    def release(self):
+        if self.process is None:
+            return
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+        finally:
+            if self.process.stdout:
+                self.process.stdout.close()
+            self.process = None
+
+
+def build_gstreamer_pipeline(
+    url: str,
+    target_fps: Optional[float] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None
+) -> str:
+    """GStreamer pipeline string ending in an appsink that only keeps the latest frame"""
+    caps = []
+    if width:
+        caps.append(f"width={width}")
+    if height:
+        caps.append(f"height={height}")
+    
+    parts = [f"rtspsrc location={url} latency=0 protocols=tcp" if url.startswith("rtsp://") else f"uridecodebin uri={url}"]
+    if url.startswith("rtsp://"):
+        parts.append("decodebin")
+    if target_fps:
+        parts += ["videorate drop-only=true", f"video/x-raw,framerate={int(round(target_fps * 1000))}/1000"]
+    if caps:
+        parts += ["videoscale", "video/x-raw," + ",".join(caps)]
+    parts += ["videoconvert", "video/x-raw,format=BGR", "appsink drop=true max-buffers=1 sync=false"]
+    return " ! ".join(parts)
+
+
+def open_gstreamer_capture(
+    url: str,
+    target_fps: Optional[float] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None
+) -> cv2.VideoCapture:
+    """cv2.VideoCapture over a GStreamer pipeline (needs OpenCV built with GStreamer)"""
+    pipeline = build_gstreamer_pipeline(url, target_fps, width, height)
+    logger.info(f"Opening GStreamer pipeline: {pipeline}")
+    return cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
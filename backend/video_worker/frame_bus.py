@@ -0,0 +1,304 @@
+"""
+Per-camera frame bus shared by the recognition worker and MJPEG previews
+
+There is one capture per camera. The worker's capture loop publishes each
+decoded frame to the bus and preview subscribers read the newest one. When
+the worker runs in another process, it exports frames to a shared-memory
+ring (only while somebody reads it) and the API side reads them from there.
+Cameras the worker does not run are captured by the bus itself: the capture
+starts with the first subscriber and stops when the last one leaves.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .camera_manager import CameraManager
+from .config import (
+    FRAME_BUS_RING_PREFIX,
+    FRAME_BUS_EXPORT_FPS,
+    FRAME_BUS_SLOW_EXPORT_FPS,
+    FRAME_BUS_MAX_WIDTH,
+    FRAME_BUS_MAX_HEIGHT,
+    FRAME_BUS_STALE_AFTER,
+    RECONNECT_DELAY,
+)
+from .frame_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+# Frames as published: (seq, captured_at, frame). Frames are shared between
+# subscribers and must not be modified in place.
+Frame = Tuple[int, float, np.ndarray]
+
+
+def export_ring_name(camera_id: int) -> str:
+    return f"{FRAME_BUS_RING_PREFIX}_cam{camera_id}"
+
+
+def attach_export_ring(camera_id: int) -> Optional[SharedFrameRing]:
+    """Attach to the ring a worker process exports a camera to (None if there is none)"""
+    try:
+        return SharedFrameRing.attach(export_ring_name(camera_id))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class FrameChannel:
+    """Latest frame of one camera and the capture thread that feeds it (if needed)"""
+    
+    def __init__(self, key: Hashable, spec: Optional[dict], bus: "FrameBus"):
+        self.key = key
+        self.spec = spec
+        self.bus = bus
+        self.subscribers = 0
+        self.seq = 0
+        self.frame: Optional[np.ndarray] = None
+        self.captured_at: Optional[float] = None
+        self.source: Optional[str] = None  # worker, worker-process or capture
+        self.closed = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def publish(self, frame: np.ndarray, captured_at: float, source: str):
+        with self._cond:
+            self.seq += 1
+            self.frame = frame
+            self.captured_at = captured_at
+            self.source = source
+            self._cond.notify_all()
+    
+    def wait_frame(self, last_seq: int = 0, timeout: float = 1.0) -> Optional[Frame]:
+        """Wait for a frame newer than last_seq; None on timeout or when the channel closed"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != last_seq or self.closed, timeout)
+            if self.closed or self.seq == last_seq:
+                return None
+            return self.seq, self.captured_at, self.frame
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"frame-bus-{self.key}", daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+    
+    def _run(self):
+        """Feed the channel unless the worker of this process already does"""
+        ring: Optional[SharedFrameRing] = None
+        manager: Optional[CameraManager] = None
+        ring_seq = 0
+        last_progress = time.monotonic()
+        ring_retry_at = 0.0
+        exportable = isinstance(self.key, int)
+        
+        try:
+            while not self._stop.is_set():
+                if self.bus.is_published_locally(self.key):
+                    # Worker in this process publishes straight into the channel
+                    if manager is not None:
+                        manager.disconnect()
+                        manager = None
+                    self._stop.wait(0.5)
+                    continue
+                
+                # Prefer frames exported by a worker process over a second capture
+                now = time.monotonic()
+                if ring is None and exportable and now >= ring_retry_at:
+                    ring = attach_export_ring(self.key)
+                    ring_retry_at = now + FRAME_BUS_STALE_AFTER
+                    if ring is not None:
+                        ring.touch()
+                        ring_seq = ring.write_seq
+                        last_progress = now
+                
+                if ring is not None:
+                    ring.touch()
+                    result = ring.read_latest(ring_seq)
+                    if result is not None:
+                        ring_seq, captured_at, frame = result
+                        last_progress = time.monotonic()
+                        if manager is not None:
+                            logger.info(f"Frame bus {self.key}: using frames from the video worker")
+                            manager.disconnect()
+                            manager = None
+                        self.publish(frame, captured_at, "worker-process")
+                        continue
+                    idle = time.monotonic() - last_progress
+                    if idle > FRAME_BUS_STALE_AFTER:
+                        # Worker is not exporting this camera (not running it, stopped or disconnected)
+                        ring.close()
+                        ring = None
+                        ring_retry_at = time.monotonic() + FRAME_BUS_STALE_AFTER
+                    elif manager is None:
+                        # The worker runs this camera; wait for its frames instead
+                        # of opening a second capture until the ring goes stale
+                        self._stop.wait(0.5 / FRAME_BUS_EXPORT_FPS)
+                        continue
+                
+                if self.spec is None:
+                    self._stop.wait(0.5)
+                    continue
+                
+                if manager is None:
+                    manager = CameraManager.from_spec(self.spec)
+                if not manager.is_connected and not manager.connect():
+                    self._stop.wait(RECONNECT_DELAY)
+                    continue
+                
+                result = manager.read_frame()
+                if result is not None and result[1] is not None:
+                    self.publish(result[1], time.time(), "capture")
+        
+        except Exception as e:
+            logger.error(f"Frame bus {self.key}: capture error: {e}")
+        finally:
+            if manager is not None:
+                manager.disconnect()
+            if ring is not None:
+                ring.close()
+            # End the subscriptions instead of leaving them waiting forever
+            if not self._stop.is_set():
+                self.bus.close_channel(self.key)
+    
+    def get_stats(self) -> dict:
+        return {
+            "subscribers": self.subscribers,
+            "source": self.source,
+            "frames": self.seq,
+            "last_frame_age": round(time.time() - self.captured_at, 2) if self.captured_at else None
+        }
+
+
+class FrameSubscription:
+    """A subscriber's handle on a channel; close() releases it"""
+    
+    def __init__(self, bus: "FrameBus", channel: FrameChannel):
+        self.bus = bus
+        self.channel = channel
+        self.last_seq = 0
+        self._closed = False
+    
+    def next_frame(self, timeout: float = 1.0) -> Optional[Frame]:
+        """Next unseen frame, or None on timeout / closed channel"""
+        result = self.channel.wait_frame(self.last_seq, timeout)
+        if result is not None:
+            self.last_seq = result[0]
+        return result
+    
+    @property
+    def closed(self) -> bool:
+        return self._closed or self.channel.closed
+    
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.bus.unsubscribe(self.channel)
+
+
+class FrameBus:
+    """Registry of per-camera channels (module singleton: frame_bus)"""
+    
+    def __init__(self):
+        self.channels: Dict[Hashable, FrameChannel] = {}
+        self._lock = threading.Lock()
+        self._local_publish: Dict[Hashable, float] = {}  # camera -> monotonic time of last publish()
+        self._export_rings: Optional[Dict[int, SharedFrameRing]] = None
+        self._last_export: Dict[int, float] = {}
+    
+    def enable_export(self):
+        """Worker process: also export published frames to shared memory for the API"""
+        if self._export_rings is None:
+            self._export_rings = {}
+    
+    def publish(self, camera_id: int, frame: np.ndarray, captured_at: float):
+        """Called by the worker's capture loop for every decoded frame"""
+        self._local_publish[camera_id] = time.monotonic()
+        channel = self.channels.get(camera_id)
+        if channel is not None and channel.subscribers:
+            channel.publish(frame, captured_at, "worker")
+        if self._export_rings is not None:
+            self._export(camera_id, frame, captured_at)
+    
+    def is_published_locally(self, key: Hashable) -> bool:
+        last = self._local_publish.get(key)
+        return last is not None and time.monotonic() - last < FRAME_BUS_STALE_AFTER
+    
+    def _export(self, camera_id: int, frame: np.ndarray, captured_at: float):
+        ring = self._export_rings.get(camera_id)
+        if ring is None:
+            # Created up front so readers can find it; written only while read
+            ring = SharedFrameRing.create(export_ring_name(camera_id), 2, FRAME_BUS_MAX_WIDTH, FRAME_BUS_MAX_HEIGHT)
+            self._export_rings[camera_id] = ring
+        
+        if ring.has_reader(FRAME_BUS_STALE_AFTER, full_rate=True):
+            interval = 1.0 / FRAME_BUS_EXPORT_FPS
+        elif ring.has_reader(FRAME_BUS_STALE_AFTER):
+            interval = 1.0 / FRAME_BUS_SLOW_EXPORT_FPS  # snapshots only
+        else:
+            return
+        now = time.monotonic()
+        if now - self._last_export.get(camera_id, 0.0) < interval:
+            return
+        self._last_export[camera_id] = now
+        ring.write(frame, captured_at)
+    
+    def close_export(self, camera_id: int):
+        """Worker stopped a camera: remove its export ring"""
+        self._local_publish.pop(camera_id, None)
+        if self._export_rings is not None:
+            ring = self._export_rings.pop(camera_id, None)
+            if ring is not None:
+                ring.close()
+    
+    def close_exports(self):
+        for camera_id in list(self._export_rings or {}):
+            self.close_export(camera_id)
+    
+    def subscribe(self, key: Hashable, spec: Optional[dict] = None) -> FrameSubscription:
+        """
+        Subscribe to a camera's frames
+        
+        Args:
+            key: Camera id (or another key for ad-hoc streams)
+            spec: Camera spec (see load_camera_specs) used when the bus has to
+                capture the camera itself
+        """
+        with self._lock:
+            channel = self.channels.get(key)
+            if channel is None:
+                channel = FrameChannel(key, spec, self)
+                self.channels[key] = channel
+                channel.start()
+            elif spec is not None:
+                channel.spec = spec
+            channel.subscribers += 1
+        return FrameSubscription(self, channel)
+    
+    def unsubscribe(self, channel: FrameChannel):
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers > 0:
+                return
+            if self.channels.get(channel.key) is channel:
+                del self.channels[channel.key]
+        channel.close()
+    
+    def close_channel(self, key: Hashable):
+        """Camera deleted (or capture failed): stop its channel and end all subscriptions"""
+        with self._lock:
+            channel = self.channels.pop(key, None)
+        if channel is not None:
+            channel.close()
+    
+    def get_stats(self) -> dict:
+        return {key: channel.get_stats() for key, channel in list(self.channels.items())}
+
+
+frame_bus = FrameBus()
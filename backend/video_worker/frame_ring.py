@@ -0,0 +1,255 @@
+"""
+Shared-memory ring buffers for passing decoded frames between processes
+"""
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .main_stream import MainStreamGrabber
+
+logger = logging.getLogger(__name__)
+
+# Control block: [write_seq, slots, max_height, max_width, reader_heartbeat_ns, full_rate_heartbeat_ns]
+_CONTROL_FIELDS = 6
+# Per-slot metadata: [seq, timestamp_ns, height, width]
+_SLOT_FIELDS = 4
+_CHANNELS = 3
+
+
+class SharedFrameRing:
+    """
+    Single-writer / multi-reader ring of BGR frames in shared memory.
+    
+    The capture process writes decoded frames into the next slot and bumps
+    the sequence number; readers copy the newest slot out. Each slot carries
+    its own sequence number so a reader can detect a slot being overwritten
+    while it was copying (seqlock) and retry.
+    """
+    
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        
+        control = np.ndarray((_CONTROL_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self.slots = int(control[1])
+        self.max_height = int(control[2])
+        self.max_width = int(control[3])
+        self.slot_size = self.max_height * self.max_width * _CHANNELS
+        
+        self._control = control
+        self._meta = np.ndarray(
+            (self.slots, _SLOT_FIELDS),
+            dtype=np.int64,
+            buffer=shm.buf,
+            offset=_CONTROL_FIELDS * 8
+        )
+        self._data = np.ndarray(
+            (self.slots, self.slot_size),
+            dtype=np.uint8,
+            buffer=shm.buf,
+            offset=(_CONTROL_FIELDS + self.slots * _SLOT_FIELDS) * 8
+        )
+    
+    @staticmethod
+    def required_size(slots: int, max_width: int, max_height: int) -> int:
+        """Bytes needed for a ring with the given geometry"""
+        header = (_CONTROL_FIELDS + slots * _SLOT_FIELDS) * 8
+        return header + slots * max_width * max_height * _CHANNELS
+    
+    @classmethod
+    def create(cls, name: str, slots: int, max_width: int, max_height: int) -> "SharedFrameRing":
+        """Create (or recreate) a ring; the creator owns and unlinks it"""
+        size = cls.required_size(slots, max_width, max_height)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a previous run that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        
+        control = np.ndarray((_CONTROL_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        control[:] = (0, slots, max_height, max_width, 0, 0)
+        meta = np.ndarray((slots, _SLOT_FIELDS), dtype=np.int64, buffer=shm.buf, offset=_CONTROL_FIELDS * 8)
+        meta[:] = 0
+        del control, meta
+        return cls(shm, owner=True)
+    
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrameRing":
+        """
+        Attach to an existing ring created by another process
+        
+        Readers don't track the segment: their resource tracker would unlink
+        it when they exit (a process outside the creator's process tree) and
+        only the creator may do that.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm)
+    
+    @property
+    def write_seq(self) -> int:
+        return int(self._control[0])
+    
+    def touch(self, full_rate: bool = True):
+        """
+        Reader heartbeat: tells an on-demand writer someone is reading
+        
+        Args:
+            full_rate: False for readers that only need an occasional frame
+                (snapshots), so the writer can export at a low rate
+        """
+        now = time.time_ns()
+        self._control[4] = now
+        if full_rate:
+            self._control[5] = now
+    
+    def has_reader(self, within: float, full_rate: bool = False) -> bool:
+        """True if a reader (a full-rate reader) called touch() in the last `within` seconds"""
+        return time.time_ns() - int(self._control[5 if full_rate else 4]) < within * 1e9
+    
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None):
+        """Copy a BGR frame into the next slot (downscaled if it does not fit)"""
+        height, width = frame.shape[:2]
+        if height > self.max_height or width > self.max_width:
+            scale = min(self.max_height / height, self.max_width / width)
+            width, height = max(1, int(width * scale)), max(1, int(height * scale))
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        
+        seq = self.write_seq + 1
+        slot = seq % self.slots
+        meta = self._meta[slot]
+        
+        meta[0] = 0  # mark slot as being written
+        nbytes = height * width * _CHANNELS
+        self._data[slot, :nbytes] = np.ascontiguousarray(frame).reshape(-1)
+        meta[1] = int((timestamp if timestamp is not None else time.time()) * 1e9)
+        meta[2] = height
+        meta[3] = width
+        meta[0] = seq
+        self._control[0] = seq
+    
+    def read_latest(self, last_seq: int = 0) -> Optional[Tuple[int, float, np.ndarray]]:
+        """
+        Copy out the newest frame
+        
+        Args:
+            last_seq: Sequence number of the frame the caller already has
+        
+        Returns:
+            (seq, timestamp, frame) tuple or None if there is no newer frame
+        """
+        for _ in range(3):
+            seq = self.write_seq
+            if seq == 0 or seq == last_seq:
+                return None
+            
+            meta = self._meta[seq % self.slots]
+            if int(meta[0]) != seq:
+                continue  # writer is mid-update on this slot
+            
+            timestamp = int(meta[1]) / 1e9
+            height, width = int(meta[2]), int(meta[3])
+            nbytes = height * width * _CHANNELS
+            frame = self._data[seq % self.slots, :nbytes].copy().reshape(height, width, _CHANNELS)
+            
+            if int(meta[0]) == seq:
+                return seq, timestamp, frame
+        
+        return None
+    
+    def close(self):
+        """Detach from the ring (and unlink it if this process owns it)"""
+        # Drop numpy views first, otherwise SharedMemory.close() raises BufferError
+        self._control = self._meta = self._data = None
+        try:
+            self.shm.close()
+            if self.owner:
+                # A reader sharing our resource tracker untracked the segment
+                # in attach(); track it again so unlink() unregisters cleanly
+                resource_tracker.register(self.shm._name, "shared_memory")
+                self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error closing frame ring {self.name}: {e}")
+
+
+class SharedFrameSource:
+    """
+    Frame source backed by a SharedFrameRing.
+    
+    Exposes the same interface as CameraManager so a VideoWorker can process
+    frames decoded by a separate capture process.
+    """
+    
+    def __init__(
+        self,
+        camera_id: int,
+        ring_name: str,
+        camera_type: str = "shared",
+        main_stream_url: Optional[str] = None
+    ):
+        self.camera_id = camera_id
+        self.camera_type = camera_type
+        self.ring_name = ring_name
+        # Rings carry the substream; high-res crops come from the main stream
+        self.main_stream = MainStreamGrabber(camera_id, main_stream_url) if main_stream_url else None
+        self.ring: Optional[SharedFrameRing] = None
+        self.last_seq = 0
+        self.last_timestamp: Optional[float] = None
+        self.is_connected = False
+    
+    def connect(self) -> bool:
+        try:
+            self.ring = SharedFrameRing.attach(self.ring_name)
+            self.is_connected = True
+            return True
+        except FileNotFoundError:
+            logger.warning(f"Camera {self.camera_id}: frame ring {self.ring_name} not available yet")
+            self.is_connected = False
+            return False
+    
+    def reconnect(self) -> bool:
+        self.disconnect()
+        return self.connect()
+    
+    def disconnect(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.main_stream is not None:
+            self.main_stream.close()
+        self.is_connected = False
+    
+    def read_frame(self) -> Optional[Tuple[bool, np.ndarray]]:
+        """Return the newest unseen frame, or None if nothing new was written"""
+        if self.ring is None:
+            return None
+        
+        result = self.ring.read_latest(self.last_seq)
+        if result is None:
+            return None
+        
+        self.last_seq, self.last_timestamp, frame = result
+        return (True, frame)
+    
+    def get_info(self) -> dict:
+        return {
+            "camera_id": self.camera_id,
+            "camera_type": self.camera_type,
+            "ring_name": self.ring_name,
+            "main_stream": self.main_stream.get_stats() if self.main_stream else None,
+            "is_connected": self.is_connected,
+            "last_seq": self.last_seq
+        }
@@ -5,8 +5,9 @@ import cv2
 import logging
 import time
 import sys
+import threading
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -16,9 +17,30 @@ from .face_detector import FaceDetector
 from .face_recognizer import FaceRecognizer
 from .tracker import Tracker
 from .attendance_manager import AttendanceManager
-from .config import FRAME_SKIP
+from .pipeline import DropOldestQueue, Stage, Pipeline
+from .rate_control import FrameRateLimiter, AdaptiveRateController
+from .roi import RegionOfInterest
+from .tiling import TileScheduler
+from .static_faces import StaticFaceFilter
+from .frame_bus import frame_bus
+from .result_store import result_store
+from .config import (
+    RATE_CONTROL_INTERVAL,
+    STATIC_FACE_FILTER,
+    CAMERA_RELOAD_INTERVAL,
+    DETECT_QUEUE_SIZE,
+    RECOGNIZE_QUEUE_SIZE,
+    SINK_QUEUE_SIZE,
+    DETECT_WORKERS,
+    RECOGNIZE_WORKERS,
+)
 from app.database import SessionLocal
 from app.models import Camera
+from app.services.lookup_cache import lookup_cache
+from app.services.camera_config import get_camera_version
+
+# Changing any of these needs a new frame source; other spec keys apply live
+SOURCE_KEYS = ("camera_type", "rtsp_url", "camera_index", "substream_url")
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,11 +49,126 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def load_camera_specs() -> List[dict]:
+    """
+    Load active camera definitions from database
+    
+    Returns:
+        List of dicts with CameraManager keyword arguments
+        (camera_id, camera_type, rtsp_url, camera_index, substream_url)
+        plus processing settings (target_fps, priority, roi, tiled_detection,
+        det_size, detection_threshold, recognition_threshold)
+    """
+    from app.config import USE_LAPTOP_CAMERA, LAPTOP_CAMERA_INDEX
+    
+    specs = []
+    db = SessionLocal()
+    try:
+        # Get active RTSP cameras from database
+        cameras = db.query(Camera).filter(
+            Camera.is_active == True,
+            Camera.camera_type == "rtsp"
+        ).all()
+        
+        for camera in cameras:
+            if not camera.rtsp_url:
+                logger.warning(f"Camera {camera.id}: RTSP URL not set, skipping")
+                continue
+            
+            specs.append({
+                "camera_id": camera.id,
+                "camera_type": camera.camera_type,
+                "rtsp_url": camera.rtsp_url,
+                "camera_index": camera.camera_index,
+                "substream_url": camera.substream_url,
+                "target_fps": camera.target_fps,
+                "priority": camera.priority,
+                "roi": camera.roi,
+                "tiled_detection": camera.tiled_detection,
+                "det_size": camera.det_size,
+                "detection_threshold": camera.detection_threshold,
+                "recognition_threshold": camera.recognition_threshold
+            })
+        
+        # Add laptop camera only if enabled in env
+        if USE_LAPTOP_CAMERA and LAPTOP_CAMERA_INDEX is not None:
+            # Check if laptop camera already exists in database
+            laptop_camera = db.query(Camera).filter(
+                Camera.camera_type == "laptop",
+                Camera.is_active == True
+            ).first()
+            
+            if laptop_camera:
+                logger.info(f"Added laptop camera from database: {laptop_camera.id}")
+            else:
+                # Create laptop camera in database if it doesn't exist
+                logger.info(f"Laptop camera database'da topilmadi, yaratilmoqda...")
+                laptop_camera = Camera(
+                    name="Laptop Camera",
+                    camera_type="laptop",
+                    camera_index=LAPTOP_CAMERA_INDEX,
+                    is_active=True,
+                    location="Local"
+                )
+                db.add(laptop_camera)
+                db.commit()
+                db.refresh(laptop_camera)
+                logger.info(f"Laptop camera database'ga qo'shildi: ID {laptop_camera.id}")
+            
+            specs.append({
+                "camera_id": laptop_camera.id,
+                "camera_type": laptop_camera.camera_type,
+                "rtsp_url": laptop_camera.rtsp_url,
+                "camera_index": laptop_camera.camera_index or LAPTOP_CAMERA_INDEX,
+                "substream_url": None,
+                "target_fps": laptop_camera.target_fps,
+                "priority": laptop_camera.priority,
+                "roi": laptop_camera.roi,
+                "tiled_detection": laptop_camera.tiled_detection,
+                "det_size": laptop_camera.det_size,
+                "detection_threshold": laptop_camera.detection_threshold,
+                "recognition_threshold": laptop_camera.recognition_threshold
+            })
+        
+        laptop_count = sum(1 for spec in specs if spec["camera_type"] == "laptop")
+        logger.info(f"Loaded {len(specs)} cameras ({len(specs) - laptop_count} RTSP, {laptop_count} laptop)")
+        return specs
+    
+    finally:
+        db.close()
+
+
 class VideoWorker:
-    """Main video processing worker"""
+    """
+    Main video processing worker
+    
+    Frames flow through explicit stages connected by bounded drop-oldest
+    queues:
+    
+        capture (thread per camera) -> detect/track -> recognize -> attendance sink
+    
+    A slow stage only loses its own stale work; it never blocks the stages
+    in front of it.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        camera_specs: Optional[List[dict]] = None,
+        attendance_writer=None,
+        watch_cameras: Optional[bool] = None
+    ):
+        """
+        Args:
+            camera_specs: Cameras to process (see load_camera_specs).
+                Loaded from database when not given.
+            attendance_writer: In-process attendance writer, passed when the
+                worker runs inside the API process (see AttendanceManager).
+            watch_cameras: Reconcile cameras with the database while running
+                (default: only when camera_specs is not given)
+        """
+        self.camera_specs = camera_specs
         self.camera_managers: list[CameraManager] = []
+        self.camera_sources: Dict[int, CameraManager] = {}  # camera_id -> frame source
         self.face_detector = FaceDetector()
         logger.info("Face detector initialized")
         
@@ -39,88 +176,191 @@ class VideoWorker:
         # FaceRecognizer already loads embeddings in __init__
         
         self.trackers: Dict[int, Tracker] = {}  # Per-camera trackers
-        self.attendance_manager = AttendanceManager()
+        self.tracker_locks: Dict[int, threading.Lock] = {}
+        self.last_tracked_at: Dict[int, float] = {}  # Capture time of the newest frame tracked per camera
+        self.attendance_manager = AttendanceManager(writer=attendance_writer)
         self.frame_counters: Dict[int, int] = {}  # Per-camera frame counters
+        self.rate_limiters: Dict[int, FrameRateLimiter] = {}
+        self.rate_controller = AdaptiveRateController()
+        self.rois: Dict[int, RegionOfInterest] = {}  # Cameras with a detection ROI
+        self.tile_schedulers: Dict[int, TileScheduler] = {}  # Cameras using tiled detection
+        self.static_faces = StaticFaceFilter() if STATIC_FACE_FILTER else None
+        self.camera_settings: Dict[int, dict] = {}  # Per-camera thresholds
+        self.camera_specs_by_id: Dict[int, dict] = {}  # Specs the running cameras were built from
+        self.capture_threads: Dict[int, threading.Thread] = {}
+        self.capture_stop_events: Dict[int, threading.Event] = {}
         self.running = False
+        self._stop_requested = threading.Event()  # survives run() setting running = True
+        
+        # Hot reload: API push (request_camera_reload) or DB camera version change
+        self.watch_cameras = camera_specs is None if watch_cameras is None else watch_cameras
+        self.camera_version = get_camera_version() if self.watch_cameras else 0
+        self._reload_requested = threading.Event()
+        self._next_version_check = 0.0
+        
+        # Higher-priority cameras are served first and dropped last when saturated
+        by_priority = lambda item: item["priority"]
+        self.detect_queue = DropOldestQueue("detect", DETECT_QUEUE_SIZE, by_priority)
+        self.recognize_queue = DropOldestQueue("recognize", RECOGNIZE_QUEUE_SIZE, by_priority)
+        self.sink_queue = DropOldestQueue("sink", SINK_QUEUE_SIZE)
+        self.pipeline = Pipeline([
+            Stage("detect", self.detect_stage, self.detect_queue, self.recognize_queue, DETECT_WORKERS),
+            Stage("recognize", self.recognize_stage, self.recognize_queue, self.sink_queue, RECOGNIZE_WORKERS),
+            Stage("sink", self.sink_stage, self.sink_queue),
+        ])
+    
+    def create_source(self, spec: dict):
+        """Create frame source for a camera spec"""
+        return CameraManager.from_spec(spec)
     
     def initialize_cameras(self):
         """Initialize cameras from database (only active RTSP cameras)"""
-        from app.config import USE_LAPTOP_CAMERA, LAPTOP_CAMERA_INDEX
-        
-        db = SessionLocal()
-        try:
-            # Get active RTSP cameras from database
-            cameras = db.query(Camera).filter(
-                Camera.is_active == True,
-                Camera.camera_type == "rtsp"
-            ).all()
-            
-            # Create camera managers for RTSP cameras
-            for camera in cameras:
-                if not camera.rtsp_url:
-                    logger.warning(f"Camera {camera.id}: RTSP URL not set, skipping")
-                    continue
-                    
-                manager = CameraManager(
-                    camera_id=camera.id,
-                    camera_type=camera.camera_type,
-                    rtsp_url=camera.rtsp_url,
-                    camera_index=camera.camera_index
-                )
-                self.camera_managers.append(manager)
-                self.trackers[camera.id] = Tracker()
-                self.frame_counters[camera.id] = 0
-                logger.info(f"Added RTSP camera {camera.id}: {camera.rtsp_url}")
-            
-            # Add laptop camera only if enabled in env
-            if USE_LAPTOP_CAMERA and LAPTOP_CAMERA_INDEX is not None:
-                # Check if laptop camera already exists in database
-                laptop_camera = db.query(Camera).filter(
-                    Camera.camera_type == "laptop",
-                    Camera.is_active == True
-                ).first()
-                
-                if laptop_camera:
-                    # Use database laptop camera
-                    manager = CameraManager(
-                        camera_id=laptop_camera.id,
-                        camera_type=laptop_camera.camera_type,
-                        rtsp_url=laptop_camera.rtsp_url,
-                        camera_index=laptop_camera.camera_index or LAPTOP_CAMERA_INDEX
-                    )
-                    logger.info(f"Added laptop camera from database: {laptop_camera.id}")
-                else:
-                    # Create laptop camera in database if it doesn't exist
-                    logger.info(f"Laptop camera database'da topilmadi, yaratilmoqda...")
-                    laptop_camera = Camera(
-                        name="Laptop Camera",
-                        camera_type="laptop",
-                        camera_index=LAPTOP_CAMERA_INDEX,
-                        is_active=True,
-                        location="Local"
-                    )
-                    db.add(laptop_camera)
-                    db.commit()
-                    db.refresh(laptop_camera)
-                    logger.info(f"Laptop camera database'ga qo'shildi: ID {laptop_camera.id}")
-                    
-                    # Use the newly created camera
-                    manager = CameraManager(
-                        camera_id=laptop_camera.id,
-                        camera_type=laptop_camera.camera_type,
-                        rtsp_url=laptop_camera.rtsp_url,
-                        camera_index=laptop_camera.camera_index or LAPTOP_CAMERA_INDEX
-                    )
-                    logger.info(f"Added laptop camera from database: {laptop_camera.id} (index: {LAPTOP_CAMERA_INDEX})")
-                
-                self.camera_managers.append(manager)
-                self.trackers[manager.camera_id] = Tracker()
-                self.frame_counters[manager.camera_id] = 0
-            
-            logger.info(f"Initialized {len(self.camera_managers)} cameras ({len(cameras)} RTSP, {'1 laptop' if USE_LAPTOP_CAMERA else '0 laptop'})")
+        specs = self.camera_specs if self.camera_specs is not None else load_camera_specs()
+        
+        for spec in specs:
+            self.add_camera(spec)
+    
+    def add_camera(self, spec: dict):
+        """Create the frame source and per-camera processing state for a spec"""
+        camera_id = spec["camera_id"]
+        manager = self.create_source(spec)
+        self.camera_sources[camera_id] = manager
+        self.trackers[camera_id] = Tracker()
+        self.tracker_locks[camera_id] = threading.Lock()
+        self.last_tracked_at[camera_id] = 0.0
+        self.frame_counters[camera_id] = 0
+        self.rate_limiters[camera_id] = FrameRateLimiter(spec.get("target_fps"), spec.get("priority"))
+        self.rate_controller.register(camera_id, self.rate_limiters[camera_id])
+        self.apply_camera_settings(spec)
+        # Replaced, not mutated: other threads iterate over it
+        self.camera_managers = self.camera_managers + [manager]
+        logger.info(f"Added {spec['camera_type']} camera {camera_id}")
+        return manager
+    
+    def apply_camera_settings(self, spec: dict):
+        """Apply processing settings of a camera spec (safe while running)"""
+        camera_id = spec["camera_id"]
+        self.camera_specs_by_id[camera_id] = spec
+        
+        limiter = self.rate_limiters[camera_id]
+        limiter.configure(spec.get("target_fps"), spec.get("priority"), spec.get("det_size"))
+        
+        self.camera_settings[camera_id] = {
+            "detection_threshold": spec.get("detection_threshold"),
+            "recognition_threshold": spec.get("recognition_threshold")
+        }
+        
+        roi = RegionOfInterest.from_spec(spec.get("roi"))
+        if roi is not None:
+            self.rois[camera_id] = roi
+            logger.info(f"Camera {camera_id}: detecting in ROI ({roi.area_fraction():.0%} of frame)")
+        else:
+            self.rois.pop(camera_id, None)
+        
+        if spec.get("tiled_detection"):
+            if camera_id not in self.tile_schedulers:
+                self.tile_schedulers[camera_id] = TileScheduler()
+                logger.info(f"Camera {camera_id}: tiled detection enabled")
+        else:
+            self.tile_schedulers.pop(camera_id, None)
+    
+    def start_capture(self, manager):
+        """Start the capture thread of one camera"""
+        stop_event = threading.Event()
+        self.capture_stop_events[manager.camera_id] = stop_event
+        thread = threading.Thread(
+            target=self.capture_loop,
+            args=(manager, stop_event),
+            name=f"capture-{manager.camera_id}",
+            daemon=True
+        )
+        thread.start()
+        self.capture_threads[manager.camera_id] = thread
+    
+    def remove_camera(self, camera_id: int):
+        """Stop one camera's capture thread and drop its processing state"""
+        stop_event = self.capture_stop_events.pop(camera_id, None)
+        if stop_event is not None:
+            stop_event.set()
+        thread = self.capture_threads.pop(camera_id, None)
+        if thread is not None:
+            thread.join(timeout=5)
+        
+        manager = self.camera_sources.pop(camera_id, None)
+        self.camera_managers = [m for m in self.camera_managers if m.camera_id != camera_id]
+        if manager is not None:
+            manager.disconnect()
+        frame_bus.close_export(camera_id)
+        result_store.remove_camera(camera_id)
+        
+        self.rate_controller.unregister(camera_id)
+        for state in (
+            self.trackers, self.tracker_locks, self.last_tracked_at, self.frame_counters, self.rate_limiters,
+            self.rois, self.tile_schedulers, self.camera_settings, self.camera_specs_by_id
+        ):
+            state.pop(camera_id, None)
+        if self.static_faces is not None:
+            self.static_faces.clear(camera_id)
+        logger.info(f"Removed camera {camera_id}")
+    
+    def request_camera_reload(self):
+        """Ask the worker to reconcile its cameras with the database (API push)"""
+        self._reload_requested.set()
+    
+    def request_stop(self):
+        """Stop the worker (also while run() is still connecting cameras)"""
+        self._stop_requested.set()
+        self.running = False
+        self._reload_requested.set()  # Wake the run loop
+    
+    def reload_cameras(self):
+        """
+        Reconcile running cameras with the database
+        
+        New cameras are started, deleted/disabled ones stopped, cameras whose
+        stream changed are restarted, and everything else gets its settings
+        applied live. Models and the other cameras keep running.
+        """
+        specs = {spec["camera_id"]: spec for spec in load_camera_specs()}
+        current = dict(self.camera_specs_by_id)
+        
+        for camera_id in current.keys() - specs.keys():
+            self.remove_camera(camera_id)
+        
+        for camera_id, spec in specs.items():
+            old = current.get(camera_id)
+            if old is not None and all(old.get(key) == spec.get(key) for key in SOURCE_KEYS):
+                if old != spec:
+                    self.apply_camera_settings(spec)
+                    logger.info(f"Camera {camera_id}: settings updated")
+                continue
             
-        finally:
-            db.close()
+            if old is not None:
+                logger.info(f"Camera {camera_id}: stream changed, restarting")
+                self.remove_camera(camera_id)
+            manager = self.add_camera(spec)
+            if self.running:
+                self.start_capture(manager)
+        
+        lookup_cache.invalidate_camera()
+    
+    def _camera_reload_due(self) -> bool:
+        """True when an API push arrived or the DB camera version changed"""
+        if self._reload_requested.is_set():
+            self._reload_requested.clear()
+            self.camera_version = get_camera_version()
+            return True
+        
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return False
+        self._next_version_check = now + CAMERA_RELOAD_INTERVAL
+        
+        version = get_camera_version()
+        if version == self.camera_version:
+            return False
+        self.camera_version = version
+        return True
     
     def connect_cameras(self):
         """Connect to all cameras"""
@@ -128,155 +368,314 @@ class VideoWorker:
             if not manager.connect():
                 logger.warning(f"Failed to connect camera {manager.camera_id}, will retry...")
     
-    def process_frame(self, camera_id: int, frame):
-        """Process a single frame"""
-        # Skip frames for performance
-        self.frame_counters[camera_id] += 1
-        if self.frame_counters[camera_id] % FRAME_SKIP != 0:
-            return
+    def capture_loop(self, manager, stop_event: Optional[threading.Event] = None):
+        """Capture stage: read frames from one camera into the detect queue"""
+        camera_id = manager.camera_id
+        limiter = self.rate_limiters.get(camera_id)
+        if limiter is None:
+            return  # camera was removed before the thread started
+        stop_event = stop_event or threading.Event()
         
-        try:
-            # Detect faces
-            detections = self.face_detector.detect_faces(frame)
+        while self.running and not stop_event.is_set():
+            try:
+                if not manager.is_connected:
+                    # Try to reconnect (only blocks this camera's thread)
+                    logger.warning(f"Camera {camera_id} ulanmagan, qayta ulanmoqda...")
+                    if not manager.reconnect():
+                        time.sleep(1)
+                        continue
+                    logger.info(f"Camera {camera_id} qayta ulandi")
+                
+                result = manager.read_frame()
+                
+                if result is None:
+                    # Frame read failed (or no new frame yet), will retry
+                    time.sleep(0.01)
+                    continue
+                
+                success, frame = result
+                if not success or frame is None:
+                    logger.debug(f"Camera {camera_id}: Frame None yoki success=False")
+                    continue
+                
+                frames = self.frame_counters.get(camera_id)
+                if frames is None:
+                    break  # camera was removed while its join timed out
+                self.frame_counters[camera_id] = frames + 1
+                
+                # Shared-memory sources carry the decode time of the frame
+                captured_at = getattr(manager, "last_timestamp", None) or time.time()
+                
+                # Previews read this capture instead of opening the camera again
+                frame_bus.publish(camera_id, frame, captured_at)
+                
+                # Per-camera target fps (time-based, lowered under load by priority)
+                if not limiter.should_process(captured_at):
+                    continue
+                
+                self.detect_queue.put({
+                    "camera_id": camera_id,
+                    "frame": frame,
+                    "captured_at": captured_at,
+                    "priority": limiter.priority
+                })
             
-            if detections:
-                logger.info(f"📸 {len(detections)} ta yuz aniqlandi (camera: {camera_id})")
+            except Exception as e:
+                logger.error(f"Camera {camera_id}: error in capture loop: {e}")
+                time.sleep(1)
+    
+    def run_detector(self, camera_id: int, image, det_size: Optional[int]) -> list:
+        """Plain or tiled (per camera setting) face detection on an image"""
+        threshold = self.camera_settings.get(camera_id, {}).get("detection_threshold")
+        scheduler = self.tile_schedulers.get(camera_id)
+        if scheduler is None:
+            return self.face_detector.detect_faces(image, det_size, threshold)
+        
+        detections = self.face_detector.detect_faces_tiled(image, scheduler.select(image), det_size, threshold)
+        scheduler.update(detections)
+        return detections
+    
+    def detect_stage(self, task: dict) -> Optional[List[dict]]:
+        """Detect/track stage: find faces in a frame and assign track ids"""
+        camera_id = task["camera_id"]
+        frame = task["frame"]
+        
+        limiter = self.rate_limiters.get(camera_id)
+        if limiter is None:
+            return None  # camera was removed while the frame was queued
+        
+        roi = self.rois.get(camera_id)
+        if roi is not None:
+            # Detect on the ROI bounding box only, then map back to frame coordinates
+            region, (offset_x, offset_y) = roi.crop(frame)
+            detections = [
+                (x + offset_x, y + offset_y, w, h, conf)
+                for x, y, w, h, conf in self.run_detector(camera_id, region, limiter.det_size)
+            ]
+            detections = roi.filter(detections, frame.shape)
+        else:
+            detections = self.run_detector(camera_id, frame, limiter.det_size)
+        limiter.mark_processed()
+        
+        # Track faces (trackers are stateful, serialize per camera). With
+        # several detect workers a camera's frames can finish out of order:
+        # one older than the last tracked frame is dropped, so the tracker
+        # and the overlays only ever move forward in time.
+        tracker = self.trackers.get(camera_id)
+        tracker_lock = self.tracker_locks.get(camera_id)
+        if tracker is None or tracker_lock is None:
+            return None  # camera was removed while the frame was in detection
+        with tracker_lock:
+            if task["captured_at"] < self.last_tracked_at.get(camera_id, 0.0):
+                logger.debug(f"Camera {camera_id}: out-of-order frame dropped")
+                return None
+            self.last_tracked_at[camera_id] = task["captured_at"]
             
             if not detections:
-                return
+                self.rate_controller.record_latency((time.time() - task["captured_at"]) * 1000)
+                result_store.update_tracks(camera_id, task["captured_at"], frame.shape, [])
+                return None
             
-            # Track faces
-            tracker = self.trackers.get(camera_id)
-            if tracker:
-                tracked = tracker.update(detections, frame)
-            else:
-                tracked = [(x, y, w, h, idx, conf) for idx, (x, y, w, h, conf) in enumerate(detections)]
+            tracked = tracker.update(detections, frame)
+            # Preview overlays read the latest tracks from here
+            result_store.update_tracks(camera_id, task["captured_at"], frame.shape, tracked)
+        
+        logger.info(f"📸 {len(detections)} ta yuz aniqlandi (camera: {camera_id})")
+        
+        # Cameras with a substream: crop faces from the high-res main stream
+        main_stream = getattr(self.camera_sources.get(camera_id), "main_stream", None)
+        
+        faces = []
+        for x, y, w, h, track_id, conf in tracked:
+            # Detection-frame crop: static check input and fallback face image
+            frame_crop = self.face_detector.extract_face(frame, (x, y, w, h))
             
-            # Recognize and log attendance
-            for x, y, w, h, track_id, conf in tracked:
-                # Extract face
-                face_image = self.face_detector.extract_face(frame, (x, y, w, h))
-                
-                if face_image is None:
-                    continue
-                
-                # Recognize face
-                recognition_result = self.face_recognizer.recognize_face(face_image)
-                
-                if recognition_result:
-                    student_id, similarity = recognition_result
-                    
-                    # Log recognition
-                    logger.info(f"🎓 Talaba aniqlandi: Student ID {student_id} (confidence: {similarity:.3f}, track: {track_id}, camera: {camera_id})")
-                    
-                    # Log attendance
-                    success = self.attendance_manager.log_attendance(
-                        student_id=student_id,
-                        camera_id=camera_id,
-                        confidence=similarity,
-                        track_id=track_id,
-                        face_image=face_image
-                    )
-                    
-                    if success:
-                        # Get student name from database
-                        student_name = None
-                        try:
-                            db = SessionLocal()
-                            student = db.query(Student).filter(Student.id == student_id).first()
-                            if student:
-                                student_name = student.full_name
-                            db.close()
-                        except Exception as e:
-                            logger.debug(f"Could not fetch student name: {e}")
-                        
-                        # Console log for successful attendance logging
-                        student_info = f"{student_name} (ID: {student_id})" if student_name else f"Student ID {student_id}"
-                        log_message = f"✅ BU TALABA DAVOMOTI SAQLANDI: {student_info} (camera: {camera_id}, confidence: {similarity:.3f})"
-                        logger.info(log_message)
-                        print(log_message)
-                    else:
-                        logger.info(f"⚠️  Duplicate prevention: Student {student_id} on camera {camera_id} - attendance not logged")
-                else:
-                    # Log when face detected but not recognized
-                    logger.info(f"❓ Yuz aniqlandi, lekin talaba tanilmadi (track: {track_id}, camera: {camera_id}) - embedding topilmadi yoki confidence past")
-        
-        except Exception as e:
-            logger.error(f"Error processing frame from camera {camera_id}: {e}")
+            # Posters/photos/screens: never moving, never changing, never recognized
+            if self.static_faces is not None and self.static_faces.check(camera_id, (x, y, w, h), frame_crop):
+                continue
+            
+            face_image = None
+            if main_stream is not None:
+                face_image = main_stream.crop((x, y, w, h), frame.shape, task["captured_at"])
+            if face_image is None:
+                face_image = frame_crop
+            if face_image is None:
+                continue
+            
+            faces.append({
+                "camera_id": camera_id,
+                "track_id": track_id,
+                "bbox": (x, y, w, h),
+                "face_image": face_image.copy(),  # don't keep the full frame alive
+                "captured_at": task["captured_at"],
+                "priority": task["priority"]
+            })
+        
+        return faces
+    
+    def recognize_stage(self, face: dict) -> Optional[List[dict]]:
+        """Recognize stage: embed the face and match it against students"""
+        camera_id = face["camera_id"]
+        track_id = face["track_id"]
+        
+        threshold = self.camera_settings.get(camera_id, {}).get("recognition_threshold")
+        recognition_result = self.face_recognizer.recognize_face(face["face_image"], threshold)
+        self.rate_controller.record_latency((time.time() - face["captured_at"]) * 1000)
+        
+        if not recognition_result:
+            # Log when face detected but not recognized
+            logger.info(f"❓ Yuz aniqlandi, lekin talaba tanilmadi (track: {track_id}, camera: {camera_id}) - embedding topilmadi yoki confidence past")
+            return None
+        
+        student_id, similarity = recognition_result
+        logger.info(f"🎓 Talaba aniqlandi: Student ID {student_id} (confidence: {similarity:.3f}, track: {track_id}, camera: {camera_id})")
+        
+        student = lookup_cache.get_student(student_id)
+        result_store.set_identity(camera_id, track_id, student_id, student["full_name"] if student else None, similarity)
+        
+        return [{
+            "student_id": student_id,
+            "camera_id": camera_id,
+            "confidence": similarity,
+            "track_id": track_id,
+            "face_image": face["face_image"],
+            "captured_at": face["captured_at"]
+        }]
+    
+    def sink_stage(self, event: dict) -> None:
+        """Attendance sink stage: log attendance (with duplicate prevention)"""
+        student_id = event["student_id"]
+        camera_id = event["camera_id"]
+        similarity = event["confidence"]
+        
+        success = self.attendance_manager.log_attendance(
+            student_id=student_id,
+            camera_id=camera_id,
+            confidence=similarity,
+            track_id=event["track_id"],
+            face_image=event["face_image"]
+        )
+        
+        if success:
+            # Queued only; the attendance manager logs once the batch is saved
+            logger.debug(f"Attendance queued: Student {student_id} on camera {camera_id} (confidence: {similarity:.3f})")
+        else:
+            logger.info(f"⚠️  Duplicate prevention: Student {student_id} on camera {camera_id} - attendance not logged")
+    
+    @staticmethod
+    def _stats_of(component) -> Optional[dict]:
+        # Per-camera state can be removed between the lookup and the call
+        return component.get_stats() if component is not None else None
+    
+    def get_stats(self) -> dict:
+        """Per-stage queue depth/latency and per-camera capture counters"""
+        return {
+            "running": self.running,
+            "camera_version": self.camera_version,
+            "cameras": {
+                manager.camera_id: {
+                    "connected": manager.is_connected,
+                    "frames_captured": self.frame_counters.get(manager.camera_id, 0),
+                    "rate": self._stats_of(self.rate_limiters.get(manager.camera_id)),
+                    "tiling": self._stats_of(self.tile_schedulers.get(manager.camera_id)),
+                    "main_stream": manager.main_stream.get_stats() if getattr(manager, "main_stream", None) else None
+                }
+                for manager in self.camera_managers
+            },
+            "stages": self.pipeline.get_stats(),
+            "rate_control": self.rate_controller.get_stats(),
+            "static_faces": self.static_faces.get_stats() if self.static_faces else None,
+            "attendance_sink": self.attendance_manager.get_stats()
+        }
     
     def run(self):
-        """Main processing loop"""
+        """Start the pipeline and wait until stopped"""
         logger.info("Starting video worker...")
         
         self.initialize_cameras()
         logger.info(f"Initialized {len(self.camera_managers)} cameras")
         
+        # Student/camera display info for the hot path
+        lookup_cache.warm()
+        
         self.connect_cameras()
         connected_count = sum(1 for m in self.camera_managers if m.is_connected)
         logger.info(f"Connected {connected_count}/{len(self.camera_managers)} cameras")
         
+        # Set before checking: a later request_stop() resets it, an earlier
+        # one (while cameras were connecting) is caught here
         self.running = True
-        
-        # Check if there are any cameras
-        if not self.camera_managers:
-            logger.warning("Hech qanday kamera topilmadi, video worker to'xtatilmoqda")
+        if self._stop_requested.is_set():
+            logger.info("Stop requested during startup")
+            self.shutdown()
             return
         
-        # Check if any cameras are connected
-        if connected_count == 0:
-            logger.warning("Hech qanday kamera ulanmadi, video worker to'xtatilmoqda")
-            return
+        # Without hot reload there is nothing to wait for
+        if not self.watch_cameras:
+            # Check if there are any cameras
+            if not self.camera_managers:
+                logger.warning("Hech qanday kamera topilmadi, video worker to'xtatilmoqda")
+                return
+            
+            # Check if any cameras are connected
+            if connected_count == 0:
+                logger.warning("Hech qanday kamera ulanmadi, video worker to'xtatilmoqda")
+                return
+        
+        self.pipeline.start()
+        for manager in self.camera_managers:
+            self.start_capture(manager)
         
         logger.info("Video worker ishga tushdi va frame'larni qayta ishlayapti...")
         
+        next_rate_update = time.monotonic() + RATE_CONTROL_INTERVAL
         while self.running:
             try:
-                # Process each camera
-                for manager in self.camera_managers:
-                    if not manager.is_connected:
-                        # Try to reconnect
-                        logger.warning(f"Camera {manager.camera_id} ulanmagan, qayta ulanmoqda...")
-                        if not manager.reconnect():
-                            continue
-                        logger.info(f"Camera {manager.camera_id} qayta ulandi")
-                    
-                    # Read frame
-                    result = manager.read_frame()
-                    
-                    if result is None:
-                        # Frame read failed, will retry on next iteration
-                        logger.debug(f"Camera {manager.camera_id}: Frame o'qib bo'lmadi")
-                        continue
-                    
-                    success, frame = result
-                    
-                    if success and frame is not None:
-                        self.process_frame(manager.camera_id, frame)
-                    else:
-                        logger.debug(f"Camera {manager.camera_id}: Frame None yoki success=False")
-                
                 # Cleanup old attendance records periodically
                 self.attendance_manager.cleanup_old_records()
+                if self.static_faces is not None:
+                    self.static_faces.expire()
+                
+                # Shed or restore load based on recent pipeline latency
+                if time.monotonic() >= next_rate_update:
+                    self.rate_controller.update()
+                    next_rate_update = time.monotonic() + RATE_CONTROL_INTERVAL
                 
-                # Small delay to prevent CPU overload
-                time.sleep(0.01)
+                # Camera added/removed/edited through the API
+                if self.watch_cameras:
+                    try:
+                        if self._camera_reload_due():
+                            logger.info(f"Camera configuration changed (version {self.camera_version}), reloading...")
+                            self.reload_cameras()
+                    except Exception as e:
+                        logger.error(f"Camera reload failed: {e}")
                 
+                # Returns early on an API push
+                self._reload_requested.wait(1)
             except KeyboardInterrupt:
                 logger.info("Received interrupt signal, shutting down...")
                 self.running = False
                 break
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                time.sleep(1)
         
         self.shutdown()
     
     def shutdown(self):
         """Cleanup and shutdown"""
         logger.info("Shutting down video worker...")
+        self.running = False
+        
+        for stop_event in self.capture_stop_events.values():
+            stop_event.set()
+        for thread in self.capture_threads.values():
+            thread.join(timeout=5)
+        self.capture_threads.clear()
+        
+        self.pipeline.stop()
+        self.attendance_manager.close()
         
         for manager in self.camera_managers:
             manager.disconnect()
+        frame_bus.close_exports()
         
         self.face_recognizer.close()
         
@@ -285,8 +684,18 @@ class VideoWorker:
 
 def main():
     """Entry point"""
-    worker = VideoWorker()
+    from .supervisor import WorkerSupervisor, resolve_process_count
+    
     try:
+        camera_specs = load_camera_specs()
+        if resolve_process_count(len(camera_specs)) > 1:
+            # Several cores available: shard cameras across processes
+            WorkerSupervisor(camera_specs=camera_specs).run()
+            return
+        
+        # Let API previews read this worker's frames (see frame_bus)
+        frame_bus.enable_export()
+        worker = VideoWorker(camera_specs=camera_specs, watch_cameras=True)
         worker.run()
     except Exception as e:
         logger.error(f"Fatal error: {e}")
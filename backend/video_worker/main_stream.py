@@ -0,0 +1,192 @@
+"""
+High-resolution main stream grabber for cameras that detect on a substream
+"""
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import MAIN_STREAM_IDLE_TIMEOUT, MAIN_STREAM_MAX_SKEW, RECONNECT_DELAY
+
+logger = logging.getLogger(__name__)
+
+
+def map_bbox(
+    bbox: Tuple[int, int, int, int],
+    src_shape: tuple,
+    dst_shape: tuple
+) -> Tuple[int, int, int, int]:
+    """
+    Map an (x, y, w, h) box from one frame resolution to another
+    
+    Args:
+        bbox: Box in source frame coordinates
+        src_shape: Source frame shape (height, width, ...)
+        dst_shape: Destination frame shape (height, width, ...)
+    """
+    scale_x = dst_shape[1] / src_shape[1]
+    scale_y = dst_shape[0] / src_shape[0]
+    x, y, w, h = bbox
+    return (
+        int(round(x * scale_x)),
+        int(round(y * scale_y)),
+        int(round(w * scale_x)),
+        int(round(h * scale_y))
+    )
+
+
+class MainStreamGrabber:
+    """
+    On-demand reader for a camera's high-resolution main stream.
+    
+    Detection runs on the substream; the main stream is only opened once a
+    face crop is requested, kept decoding while requests keep coming, and
+    released after MAIN_STREAM_IDLE_TIMEOUT seconds without one.
+    """
+    
+    def __init__(
+        self,
+        camera_id: int,
+        url: str,
+        idle_timeout: float = MAIN_STREAM_IDLE_TIMEOUT,
+        max_skew: float = MAIN_STREAM_MAX_SKEW
+    ):
+        self.camera_id = camera_id
+        self.url = url
+        self.idle_timeout = idle_timeout
+        self.max_skew = max_skew
+        
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._latest: Optional[Tuple[float, np.ndarray]] = None
+        self._last_request = 0.0
+        
+        self.crops_served = 0
+        self.crops_missed = 0
+        self.opens = 0
+    
+    @property
+    def is_active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _ensure_running(self):
+        with self._lock:
+            self._last_request = time.monotonic()
+            if self.is_active or self._stop.is_set():
+                return
+            self._latest = None
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"main-stream-{self.camera_id}",
+                daemon=True
+            )
+            self._thread.start()
+    
+    def _run(self):
+        """Decode the main stream until it has been idle for idle_timeout"""
+        cap = None
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._last_request > self.idle_timeout:
+                    logger.info(f"Camera {self.camera_id}: main stream idle, closing")
+                    break
+                
+                if cap is None:
+                    logger.info(f"Camera {self.camera_id}: opening main stream for crops")
+                    cap = cv2.VideoCapture(self.url)
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                    self.opens += 1
+                    if not cap.isOpened():
+                        cap.release()
+                        cap = None
+                        self._stop.wait(RECONNECT_DELAY)
+                        continue
+                
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    logger.warning(f"Camera {self.camera_id}: main stream read failed, reopening...")
+                    cap.release()
+                    cap = None
+                    self._stop.wait(RECONNECT_DELAY)
+                    continue
+                
+                self._latest = (time.time(), frame)
+        finally:
+            if cap is not None:
+                cap.release()
+            self._latest = None
+    
+    def get_frame(self, captured_at: float) -> Optional[np.ndarray]:
+        """
+        Latest main stream frame close in time to a substream frame
+        
+        Args:
+            captured_at: Wall-clock time the substream frame was captured
+        
+        Returns:
+            Frame, or None while the stream is still opening or too far off in time
+        """
+        self._ensure_running()
+        latest = self._latest
+        if latest is None:
+            return None
+        
+        timestamp, frame = latest
+        if abs(timestamp - captured_at) > self.max_skew:
+            return None
+        return frame
+    
+    def crop(
+        self,
+        bbox: Tuple[int, int, int, int],
+        src_shape: tuple,
+        captured_at: float
+    ) -> Optional[np.ndarray]:
+        """
+        Crop a substream box out of the main stream
+        
+        Args:
+            bbox: (x, y, w, h) box in substream coordinates
+            src_shape: Substream frame shape
+            captured_at: Wall-clock time the substream frame was captured
+        
+        Returns:
+            High-resolution crop, or None (caller falls back to the substream crop)
+        """
+        frame = self.get_frame(captured_at)
+        if frame is None:
+            self.crops_missed += 1
+            return None
+        
+        x, y, w, h = map_bbox(bbox, src_shape, frame.shape)
+        h_img, w_img = frame.shape[:2]
+        x, y = max(0, x), max(0, y)
+        w, h = min(w, w_img - x), min(h, h_img - y)
+        if w <= 0 or h <= 0:
+            self.crops_missed += 1
+            return None
+        
+        self.crops_served += 1
+        return frame[y:y+h, x:x+w].copy()
+    
+    def close(self, timeout: float = 5.0):
+        """Stop decoding; a later crop request opens the stream again"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._stop.clear()
+    
+    def get_stats(self) -> dict:
+        latest = self._latest
+        return {
+            "active": self.is_active,
+            "frame_size": [latest[1].shape[1], latest[1].shape[0]] if latest else None,
+            "opens": self.opens,
+            "crops_served": self.crops_served,
+            "crops_missed": self.crops_missed
+        }
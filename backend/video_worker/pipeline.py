@@ -0,0 +1,245 @@
+"""
+Staged processing pipeline with bounded drop-oldest queues
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DropOldestQueue:
+    """
+    Bounded FIFO queue that evicts the oldest item when full.
+    
+    Producers never block: a slow consumer loses stale work instead of
+    stalling the stage in front of it.
+    
+    With a priority function, consumers take the oldest item of the highest
+    priority first and a full queue evicts the oldest item of the lowest
+    priority, so under saturation low-priority work is what gets dropped.
+    """
+    
+    def __init__(self, name: str, maxsize: int, priority: Optional[Callable[[Any], int]] = None):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.priority = priority
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self.put_count = 0
+        self.dropped_count = 0
+        self._taken = 0  # items handed out by get() and not yet marked task_done()
+    
+    def put(self, item: Any) -> bool:
+        """
+        Add item to the queue
+        
+        Returns:
+            True if an older item had to be dropped to make room
+        """
+        with self._cond:
+            dropped = False
+            if len(self._items) >= self.maxsize:
+                if self.priority is None:
+                    self._items.popleft()
+                else:
+                    del self._items[self._select(lowest=True)]
+                self.dropped_count += 1
+                dropped = True
+            self._items.append((time.monotonic(), item))
+            self.put_count += 1
+            self._cond.notify()
+            return dropped
+    
+    def get(self, timeout: float = 0.5) -> Optional[tuple]:
+        """
+        Take the oldest item
+        
+        Returns:
+            (enqueued_at, item) tuple or None on timeout
+        """
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            self._taken += 1
+            if self.priority is None:
+                return self._items.popleft()
+            index = self._select(lowest=False)
+            entry = self._items[index]
+            del self._items[index]
+            return entry
+    
+    def _select(self, lowest: bool) -> int:
+        """Index of the oldest item with the lowest/highest priority"""
+        best_index, best_priority = 0, None
+        for index, (_, item) in enumerate(self._items):
+            priority = self.priority(item)
+            if best_priority is None or (priority < best_priority if lowest else priority > best_priority):
+                best_index, best_priority = index, priority
+        return best_index
+    
+    def task_done(self):
+        """Mark an item taken with get() as handled"""
+        with self._cond:
+            self._taken -= 1
+    
+    def unfinished(self) -> int:
+        """Items queued or taken and still being handled"""
+        with self._cond:
+            return len(self._items) + self._taken
+    
+    def wake_all(self):
+        """Wake blocked consumers (used on shutdown)"""
+        with self._cond:
+            self._cond.notify_all()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def get_stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "put": self.put_count,
+            "dropped": self.dropped_count
+        }
+
+
+class Stage:
+    """
+    Pipeline stage: N worker threads pulling from an input queue.
+    
+    The handler receives one item and returns an iterable of items for the
+    output queue (or None). Exceptions are logged and counted; they never
+    kill the worker thread.
+    """
+    
+    # Smoothing factor for the latency moving averages
+    EMA_ALPHA = 0.1
+    
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Optional[Iterable[Any]]],
+        input_queue: DropOldestQueue,
+        output_queue: Optional[DropOldestQueue] = None,
+        workers: int = 1
+    ):
+        self.name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.workers = max(1, workers)
+        self.threads: List[threading.Thread] = []
+        self.running = False
+        
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.avg_wait_ms = 0.0
+    
+    def start(self):
+        self.running = True
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{idx}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def drain(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until the input queue is empty and no item is being handled
+        
+        Returns:
+            True if the stage drained within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self.input_queue.unfinished():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers; items still queued are dropped (see drain)"""
+        self.running = False
+        self.input_queue.wake_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+    
+    def _record(self, wait_ms: float, latency_ms: float, error: bool):
+        with self._lock:
+            self.processed += 1
+            if error:
+                self.errors += 1
+            self.avg_wait_ms += self.EMA_ALPHA * (wait_ms - self.avg_wait_ms)
+            self.avg_latency_ms += self.EMA_ALPHA * (latency_ms - self.avg_latency_ms)
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+    
+    def _run(self):
+        while self.running:
+            entry = self.input_queue.get()
+            if entry is None:
+                continue
+            
+            enqueued_at, item = entry
+            started = time.monotonic()
+            error = False
+            try:
+                outputs = self.handler(item)
+                if outputs and self.output_queue is not None:
+                    for output in outputs:
+                        self.output_queue.put(output)
+            except Exception as e:
+                error = True
+                logger.error(f"Stage {self.name}: error processing item: {e}")
+            
+            self.input_queue.task_done()
+            finished = time.monotonic()
+            self._record((started - enqueued_at) * 1000, (finished - started) * 1000, error)
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "avg_latency_ms": round(self.avg_latency_ms, 2),
+                "max_latency_ms": round(self.max_latency_ms, 2),
+                "avg_queue_wait_ms": round(self.avg_wait_ms, 2),
+                "queue": self.input_queue.get_stats()
+            }
+
+
+class Pipeline:
+    """Ordered collection of stages started and stopped together"""
+    
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+    
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """
+        Drain and stop the stages, upstream first
+        
+        Each stage finishes its queued items before it stops, so its outputs
+        reach the next stage, which then drains in turn. Call after the
+        producers feeding the first stage have stopped. A stage that does not
+        drain within the timeout drops what is left.
+        """
+        for stage in self.stages:
+            if not stage.drain(timeout):
+                logger.warning(f"Stage {stage.name}: {len(stage.input_queue)} queued items dropped on shutdown")
+            stage.stop(timeout)
+    
+    def get_stats(self) -> dict:
+        return {stage.name: stage.get_stats() for stage in self.stages}
@@ -0,0 +1,229 @@
+"""
+Per-camera processing rate limiting and priority-based load shedding
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from .config import (
+    FRAME_SKIP,
+    DEFAULT_TARGET_FPS,
+    LATENCY_BUDGET_MS,
+    RATE_MIN_SCALE,
+    RATE_STEP_DOWN,
+    RATE_STEP_UP,
+    DET_SIZE,
+    DEGRADED_DET_SIZE,
+    DET_SIZE_DEGRADE_SCALE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRateLimiter:
+    """
+    Decides which captured frames of one camera enter the pipeline.
+    
+    Time-based: a frame is accepted when at least 1 / effective_fps seconds
+    have passed since the last accepted one, regardless of the camera's own
+    frame rate. With target_fps <= 0 it falls back to the legacy FRAME_SKIP
+    frame-count modulus.
+    """
+    
+    # Accept frames slightly early so a source running at exactly the
+    # target rate is not cut in half by timestamp jitter
+    TOLERANCE = 0.9
+    
+    def __init__(self, target_fps: Optional[float] = None, priority: Optional[int] = None, det_size: Optional[int] = None):
+        self.configure(target_fps, priority, det_size)
+        # Set by AdaptiveRateController
+        self.scale = 1.0
+        self.degraded = False
+        
+        self.frame_count = 0
+        self.accepted_count = 0
+        self.processed_count = 0
+        self.last_accepted: Optional[float] = None
+        self.last_processed: Optional[float] = None
+        self.admitted_fps = 0.0
+        self.achieved_fps = 0.0
+    
+    def configure(self, target_fps: Optional[float] = None, priority: Optional[int] = None, det_size: Optional[int] = None):
+        """Apply camera settings (called again on hot reload)"""
+        self.target_fps = DEFAULT_TARGET_FPS if target_fps is None else target_fps
+        self.priority = priority or 0
+        self.base_det_size = det_size  # None = detector default
+    
+    @property
+    def det_size(self) -> Optional[int]:
+        """Detector input size for this camera, smaller while degraded"""
+        if self.degraded:
+            return min(DEGRADED_DET_SIZE, self.base_det_size or DET_SIZE)
+        return self.base_det_size
+    
+    @property
+    def effective_fps(self) -> float:
+        return self.target_fps * self.scale
+    
+    def should_process(self, timestamp: float) -> bool:
+        """
+        Args:
+            timestamp: Capture time of the frame (seconds)
+        
+        Returns:
+            True if the frame should be processed
+        """
+        self.frame_count += 1
+        
+        if self.target_fps <= 0:
+            # Legacy mode: every FRAME_SKIP-th frame, scaled down under load
+            skip = max(1, round(FRAME_SKIP / self.scale))
+            if self.frame_count % skip != 0:
+                return False
+        elif self.last_accepted is not None:
+            if timestamp - self.last_accepted < self.TOLERANCE / self.effective_fps:
+                return False
+        
+        if self.last_accepted is not None and timestamp > self.last_accepted:
+            rate = 1.0 / (timestamp - self.last_accepted)
+            self.admitted_fps += 0.1 * (rate - self.admitted_fps)
+        self.last_accepted = timestamp
+        self.accepted_count += 1
+        return True
+    
+    def mark_processed(self):
+        """Record that an admitted frame made it through detection"""
+        now = time.monotonic()
+        if self.last_processed is not None and now > self.last_processed:
+            rate = 1.0 / (now - self.last_processed)
+            self.achieved_fps += 0.1 * (rate - self.achieved_fps)
+        self.last_processed = now
+        self.processed_count += 1
+    
+    def get_stats(self) -> dict:
+        # Rates decay to 0 for a camera that stopped producing frames
+        idle = self.last_processed is None or time.monotonic() - self.last_processed > 5
+        return {
+            "priority": self.priority,
+            "target_fps": self.target_fps if self.target_fps > 0 else None,
+            "frame_skip": FRAME_SKIP if self.target_fps <= 0 else None,
+            "effective_fps": round(self.effective_fps, 2) if self.target_fps > 0 else None,
+            "admitted_fps": round(self.admitted_fps, 2),
+            "achieved_fps": 0.0 if idle else round(self.achieved_fps, 2),
+            "scale": round(self.scale, 3),
+            "det_size": self.det_size,
+            "frames_seen": self.frame_count,
+            "frames_admitted": self.accepted_count,
+            "frames_processed": self.processed_count
+        }
+
+
+class AdaptiveRateController:
+    """
+    Sheds load by camera priority when the pipeline falls behind.
+    
+    The pipeline reports the capture-to-result latency of every frame it
+    finishes; update() is called periodically with the window average.
+    While it is above LATENCY_BUDGET_MS, the lowest-priority cameras that
+    are not yet at RATE_MIN_SCALE are slowed down (and switched to a smaller
+    detection size); higher priorities are only touched once every lower
+    one is at the floor. Once latency is comfortably under budget, rates
+    are restored highest priority first.
+    """
+    
+    def __init__(self, latency_budget_ms: float = LATENCY_BUDGET_MS):
+        self.latency_budget_ms = latency_budget_ms
+        self.limiters: Dict[int, FrameRateLimiter] = {}
+        self.last_latency_ms = 0.0
+        self.adjustments = 0
+        self._window_total = 0.0
+        self._window_count = 0
+        self._lock = threading.Lock()
+    
+    def register(self, camera_id: int, limiter: FrameRateLimiter):
+        with self._lock:
+            self.limiters[camera_id] = limiter
+    
+    def unregister(self, camera_id: int):
+        with self._lock:
+            self.limiters.pop(camera_id, None)
+    
+    def record_latency(self, latency_ms: float):
+        """Report the capture-to-result latency of a finished frame"""
+        with self._lock:
+            self._window_total += latency_ms
+            self._window_count += 1
+    
+    def _tiers(self, highest_first: bool) -> list:
+        tiers: Dict[int, list] = {}
+        for limiter in self.limiters.values():
+            tiers.setdefault(limiter.priority, []).append(limiter)
+        return [tiers[p] for p in sorted(tiers, reverse=highest_first)]
+    
+    @staticmethod
+    def _set_scale(limiter: FrameRateLimiter, scale: float):
+        limiter.scale = scale
+        limiter.degraded = scale <= DET_SIZE_DEGRADE_SCALE
+    
+    def _degrade(self) -> Optional[int]:
+        """Slow down the lowest priority tier that still has headroom"""
+        for tier in self._tiers(highest_first=False):
+            if any(limiter.scale > RATE_MIN_SCALE for limiter in tier):
+                for limiter in tier:
+                    self._set_scale(limiter, max(RATE_MIN_SCALE, limiter.scale * RATE_STEP_DOWN))
+                return tier[0].priority
+        return None
+    
+    def _restore(self) -> Optional[int]:
+        """Speed up the highest priority tier that is below its target"""
+        for tier in self._tiers(highest_first=True):
+            if any(limiter.scale < 1.0 for limiter in tier):
+                for limiter in tier:
+                    self._set_scale(limiter, min(1.0, limiter.scale * RATE_STEP_UP))
+                return tier[0].priority
+        return None
+    
+    def update(self, latency_ms: Optional[float] = None):
+        """
+        Adjust camera rates for the latest latency measurement
+        
+        Args:
+            latency_ms: Pipeline latency; defaults to the average of the
+                latencies recorded since the last update (0 if idle)
+        """
+        with self._lock:
+            if latency_ms is None:
+                latency_ms = self._window_total / self._window_count if self._window_count else 0.0
+            self._window_total = 0.0
+            self._window_count = 0
+            self.last_latency_ms = latency_ms
+            
+            if latency_ms > self.latency_budget_ms:
+                priority, direction = self._degrade(), "lowering"
+            elif latency_ms < self.latency_budget_ms * 0.5:
+                priority, direction = self._restore(), "restoring"
+            else:
+                return
+            
+            if priority is None:
+                return
+            
+            self.adjustments += 1
+            logger.info(
+                f"Pipeline latency {latency_ms:.0f}ms (budget {self.latency_budget_ms:.0f}ms), "
+                f"{direction} rates of priority {priority} cameras"
+            )
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            tiers = {
+                str(tier[0].priority): round(min(limiter.scale for limiter in tier), 3)
+                for tier in self._tiers(highest_first=True)
+            }
+        return {
+            "latency_budget_ms": self.latency_budget_ms,
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "tier_scales": tiers,
+            "adjustments": self.adjustments
+        }
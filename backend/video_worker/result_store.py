@@ -0,0 +1,110 @@
+"""
+Latest tracking results per camera, for preview overlays
+
+The detect stage records the tracked boxes of every processed frame and the
+recognize stage attaches student identities to tracks. Readers (annotated
+preview, overlay WebSocket) get a compact snapshot without running any
+inference of their own.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .config import TRACK_IDENTITY_TTL
+
+
+class TrackingResultStore:
+    """Thread-safe latest-snapshot store (module singleton: result_store)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: Dict[int, dict] = {}
+        # (camera_id, track_id) -> identity dict with "seen_at"
+        self._identities: Dict[Tuple[int, int], dict] = {}
+        self._seq = 0
+    
+    def update_tracks(self, camera_id: int, captured_at: float, frame_shape: tuple, tracked: List[tuple]):
+        """
+        Record the faces tracked in one processed frame
+        
+        Args:
+            camera_id: Camera ID
+            captured_at: Capture time of the frame
+            frame_shape: Shape of the frame the boxes refer to
+            tracked: (x, y, w, h, track_id, confidence) tuples (empty = no faces)
+        """
+        now = time.time()
+        with self._lock:
+            self._seq += 1
+            self._snapshots[camera_id] = {
+                "seq": self._seq,
+                "captured_at": captured_at,
+                "frame_size": (int(frame_shape[1]), int(frame_shape[0])),
+                "tracks": [
+                    (int(x), int(y), int(w), int(h), int(track_id), round(float(conf), 3))
+                    for x, y, w, h, track_id, conf in tracked
+                ]
+            }
+            for *_, track_id, _ in tracked:
+                identity = self._identities.get((camera_id, int(track_id)))
+                if identity is not None:
+                    identity["seen_at"] = now
+            
+            # Forget identities of tracks that disappeared
+            expired = [key for key, identity in self._identities.items() if now - identity["seen_at"] > TRACK_IDENTITY_TTL]
+            for key in expired:
+                del self._identities[key]
+    
+    def set_identity(self, camera_id: int, track_id: int, student_id: int, name: Optional[str], confidence: float):
+        """Attach a recognized student to a track"""
+        with self._lock:
+            self._seq += 1
+            self._identities[(camera_id, int(track_id))] = {
+                "student_id": student_id,
+                "name": name,
+                "similarity": round(float(confidence), 3),
+                "seen_at": time.time()
+            }
+            snapshot = self._snapshots.get(camera_id)
+            if snapshot is not None:
+                snapshot["seq"] = self._seq
+    
+    def get(self, camera_id: int, since_seq: int = 0) -> Optional[dict]:
+        """
+        Latest snapshot of a camera
+        
+        Returns:
+            {"seq", "captured_at", "frame_size", "faces": [...]} or None when
+            there is nothing newer than since_seq
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(camera_id)
+            if snapshot is None or snapshot["seq"] <= since_seq:
+                return None
+            
+            faces = []
+            for x, y, w, h, track_id, conf in snapshot["tracks"]:
+                identity = self._identities.get((camera_id, track_id), {})
+                faces.append({
+                    "bbox": (x, y, w, h),
+                    "track_id": track_id,
+                    "confidence": conf,
+                    "student_id": identity.get("student_id"),
+                    "name": identity.get("name"),
+                    "similarity": identity.get("similarity")
+                })
+            return {
+                "seq": snapshot["seq"],
+                "captured_at": snapshot["captured_at"],
+                "frame_size": snapshot["frame_size"],
+                "faces": faces
+            }
+    
+    def remove_camera(self, camera_id: int):
+        with self._lock:
+            self._snapshots.pop(camera_id, None)
+            for key in [key for key in self._identities if key[0] == camera_id]:
+                del self._identities[key]
+
+
+result_store = TrackingResultStore()
@@ -0,0 +1,91 @@
+"""
+Per-camera region of interest (ROI) for face detection
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RegionOfInterest:
+    """
+    Polygon in normalized (0-1) frame coordinates.
+    
+    Normalized so the same ROI works for a camera's substream and main
+    stream. Detection runs on the polygon's bounding box only; detections
+    whose centre falls outside the polygon itself are discarded.
+    """
+    
+    def __init__(self, points: List[List[float]]):
+        self.points = np.array(points, dtype=np.float32)
+        self._shape: Optional[tuple] = None
+        self._polygon: Optional[np.ndarray] = None
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+        self.is_rectangle = False
+    
+    @classmethod
+    def from_spec(cls, value) -> Optional["RegionOfInterest"]:
+        """Build from Camera.roi ([[x, y], ...]); None for a missing or invalid ROI"""
+        if not value:
+            return None
+        try:
+            roi = cls(value)
+            if roi.points.ndim != 2 or roi.points.shape[0] < 3 or roi.points.shape[1] != 2:
+                raise ValueError("expected at least 3 [x, y] points")
+            return roi
+        except Exception as e:
+            logger.warning(f"Ignoring invalid ROI {value}: {e}")
+            return None
+    
+    def _prepare(self, shape: tuple):
+        """Pixel polygon and bounding box for a frame size (cached)"""
+        if self._shape == shape[:2]:
+            return
+        
+        height, width = shape[:2]
+        polygon = np.round(self.points * (width, height)).astype(np.int32)
+        x0, y0 = np.clip(polygon.min(axis=0), 0, (width, height))
+        x1, y1 = np.clip(polygon.max(axis=0), 0, (width, height))
+        
+        self._polygon = polygon
+        self._bounds = (int(x0), int(y0), int(x1), int(y1))
+        # Axis-aligned rectangle: the bbox crop is already exact
+        self.is_rectangle = len(polygon) == 4 and cv2.contourArea(polygon) == (x1 - x0) * (y1 - y0)
+        self._shape = shape[:2]
+    
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Crop a frame to the ROI bounding box
+        
+        Returns:
+            (view of the frame, (offset_x, offset_y))
+        """
+        self._prepare(frame.shape)
+        x0, y0, x1, y1 = self._bounds
+        return frame[y0:y1, x0:x1], (x0, y0)
+    
+    def filter(self, detections: list, shape: tuple) -> list:
+        """
+        Keep detections whose centre lies inside the polygon
+        
+        Args:
+            detections: (x, y, w, h, confidence) tuples in full-frame coordinates
+            shape: Full frame shape
+        """
+        self._prepare(shape)
+        if self.is_rectangle:
+            return detections
+        
+        return [
+            det for det in detections
+            if cv2.pointPolygonTest(self._polygon, (float(det[0] + det[2] / 2), float(det[1] + det[3] / 2)), False) >= 0
+        ]
+    
+    def area_fraction(self) -> float:
+        """Share of the frame covered by the bounding box (detector work saved ~ 1 - this)"""
+        x0, y0 = self.points.min(axis=0)
+        x1, y1 = self.points.max(axis=0)
+        return float(max(0.0, min(x1, 1) - max(x0, 0)) * max(0.0, min(y1, 1) - max(y0, 0)))
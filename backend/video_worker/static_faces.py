@@ -0,0 +1,175 @@
+"""
+Static face suppression (posters, photos, screens)
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import (
+    STATIC_FACE_SECONDS,
+    STATIC_FACE_IOU,
+    STATIC_FACE_MAX_DIFF,
+    STATIC_FACE_RECHECK_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Faces are compared as small normalized grayscale thumbnails
+_SIGNATURE_SIZE = (24, 24)
+# Upper bound on tracked regions per camera (crowds create many short-lived candidates)
+_MAX_REGIONS = 200
+
+
+def face_signature(face_image: np.ndarray) -> np.ndarray:
+    """Brightness-normalized grayscale thumbnail used to compare appearance"""
+    gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY) if face_image.ndim == 3 else face_image
+    small = cv2.resize(gray, _SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+    return small - small.mean()
+
+
+def bbox_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """IoU of two (x, y, w, h) boxes"""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+class _Region:
+    """A detection location that has (so far) not moved or changed"""
+    
+    def __init__(self, bbox: Tuple[int, int, int, int], signature: np.ndarray, now: float):
+        self.bbox = bbox
+        self.signature = signature
+        self.first_seen = now
+        self.last_seen = now
+        self.static_since: Optional[float] = None
+        self.confirmed_at = now
+        self.suppressed = 0
+    
+    def matches(self, bbox: Tuple[int, int, int, int], signature: np.ndarray) -> bool:
+        if bbox_iou(self.bbox, bbox) < STATIC_FACE_IOU:
+            return False
+        return float(np.abs(signature - self.signature).mean()) <= STATIC_FACE_MAX_DIFF
+    
+    def to_dict(self) -> dict:
+        x, y, w, h = self.bbox
+        return {
+            "bbox": [int(x), int(y), int(w), int(h)],
+            "static_since": self.static_since,
+            "last_seen": self.last_seen,
+            "suppressed": self.suppressed
+        }
+
+
+class StaticFaceFilter:
+    """
+    Per-camera exclusion list of faces that never move.
+    
+    A detection whose box and appearance stay the same for
+    STATIC_FACE_SECONDS becomes a static region; later detections matching
+    it skip recognition. Real people are never pixel-identical for that
+    long, so only printed or on-screen faces qualify. Static regions are
+    re-checked every STATIC_FACE_RECHECK_SECONDS: a region that was not
+    seen unchanged since the last check is dropped (poster removed or
+    moved), and its reference appearance is refreshed otherwise.
+    """
+    
+    def __init__(self):
+        self.regions: Dict[int, List[_Region]] = {}  # camera_id -> regions
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+    
+    def check(self, camera_id: int, bbox: Tuple[int, int, int, int], face_image: np.ndarray) -> bool:
+        """
+        Record a detection
+        
+        Args:
+            camera_id: Camera ID
+            bbox: (x, y, w, h) in frame coordinates
+            face_image: Face crop from the same frame
+        
+        Returns:
+            True if the face is static and should not be recognized
+        """
+        if face_image is None or face_image.size == 0:
+            return False
+        
+        now = time.time()
+        signature = face_signature(face_image)
+        
+        with self._lock:
+            regions = self.regions.setdefault(camera_id, [])
+            for region in regions:
+                if not region.matches(bbox, signature):
+                    continue
+                
+                region.last_seen = now
+                if region.static_since is None and now - region.first_seen >= STATIC_FACE_SECONDS:
+                    region.static_since = now
+                    logger.info(f"Camera {camera_id}: static face at {list(bbox)} excluded from recognition")
+                
+                if region.static_since is None:
+                    return False
+                
+                if now - region.confirmed_at >= STATIC_FACE_RECHECK_SECONDS:
+                    # Still there and unchanged: follow slow lighting drift
+                    region.signature = signature
+                    region.confirmed_at = now
+                region.suppressed += 1
+                self.suppressed_total += 1
+                return True
+            
+            if len(regions) < _MAX_REGIONS:
+                regions.append(_Region(bbox, signature, now))
+            return False
+    
+    def expire(self):
+        """
+        Periodic re-check: drop candidates that moved and static regions not
+        confirmed within the last re-check interval
+        """
+        now = time.time()
+        with self._lock:
+            for camera_id, regions in self.regions.items():
+                kept = []
+                for region in regions:
+                    if region.static_since is None:
+                        # Candidate that stopped matching (a person moved on)
+                        if now - region.last_seen <= 2.0:
+                            kept.append(region)
+                    elif now - region.last_seen <= STATIC_FACE_RECHECK_SECONDS:
+                        kept.append(region)
+                    else:
+                        logger.info(f"Camera {camera_id}: static face at {list(region.bbox)} no longer seen, re-enabled")
+                self.regions[camera_id] = kept
+    
+    def clear(self, camera_id: Optional[int] = None):
+        """Forget static regions for one camera (or all)"""
+        with self._lock:
+            if camera_id is None:
+                self.regions.clear()
+            else:
+                self.regions.pop(camera_id, None)
+    
+    def get_static_regions(self) -> Dict[int, List[dict]]:
+        """Currently suppressed regions per camera"""
+        with self._lock:
+            return {
+                camera_id: [region.to_dict() for region in regions if region.static_since is not None]
+                for camera_id, regions in self.regions.items()
+                if any(region.static_since is not None for region in regions)
+            }
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "static_regions": sum(1 for regions in self.regions.values() for r in regions if r.static_since is not None),
+                "candidates": sum(1 for regions in self.regions.values() for r in regions if r.static_since is None),
+                "suppressed": self.suppressed_total
+            }
@@ -0,0 +1,289 @@
+"""
+Multi-process video worker supervisor
+
+Each camera gets its own capture process that decodes frames into a shared
+memory ring (a bad stream or a native crash in cv2 only takes that process
+down). Cameras are sharded across N detection processes which read frames
+from the rings and run detection/recognition. Dead processes are restarted
+with exponential backoff without touching the others.
+"""
+import logging
+import multiprocessing as mp
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from .config import (
+    VIDEO_WORKER_PROCESSES,
+    FRAME_RING_SLOTS,
+    FRAME_RING_MAX_WIDTH,
+    FRAME_RING_MAX_HEIGHT,
+    PROCESS_RESTART_DELAY,
+    PROCESS_RESTART_MAX_DELAY,
+    MAX_RECONNECT_ATTEMPTS,
+)
+from .frame_ring import SharedFrameRing, SharedFrameSource
+
+logger = logging.getLogger(__name__)
+
+# spawn instead of fork: cv2/onnxruntime do not survive fork() with live threads
+_mp = mp.get_context("spawn")
+
+
+def resolve_process_count(camera_count: int, requested: Optional[int] = None) -> int:
+    """Number of detection processes to run for the given camera count"""
+    requested = VIDEO_WORKER_PROCESSES if requested is None else requested
+    if requested <= 0:
+        requested = os.cpu_count() or 1
+    return max(1, min(requested, camera_count)) if camera_count else 0
+
+
+def shard_cameras(specs: List[dict], num_shards: int) -> List[List[dict]]:
+    """Round-robin cameras across shards (stable order by camera id)"""
+    shards: List[List[dict]] = [[] for _ in range(num_shards)]
+    for idx, spec in enumerate(sorted(specs, key=lambda s: s["camera_id"])):
+        shards[idx % num_shards].append(spec)
+    return shards
+
+
+def run_capture_process(spec: dict, ring_name: str, stop_event):
+    """Capture process entry point: decode one camera into its frame ring"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    from .camera_manager import CameraManager
+    
+    camera_id = spec["camera_id"]
+    ring = SharedFrameRing.attach(ring_name)
+    manager = CameraManager.from_spec(spec)
+    
+    try:
+        if not manager.connect():
+            logger.warning(f"Camera {camera_id}: initial connect failed, will retry...")
+        
+        while not stop_event.is_set():
+            if not manager.is_connected:
+                if not manager.reconnect():
+                    if manager.reconnect_attempts >= MAX_RECONNECT_ATTEMPTS:
+                        # Let the supervisor restart us with backoff
+                        sys.exit(2)
+                    continue
+            
+            result = manager.read_frame()
+            if result is None:
+                continue
+            
+            _, frame = result
+            ring.write(frame, time.time())
+    finally:
+        manager.disconnect()
+        ring.close()
+
+
+def run_shard_process(shard_index: int, specs: List[dict], ring_names: Dict[int, str], stop_event):
+    """Detection process entry point: run a VideoWorker over shared frame rings"""
+    from .main import VideoWorker
+    
+    class ShardVideoWorker(VideoWorker):
+        """VideoWorker that reads frames from capture processes"""
+        
+        def create_source(self, spec: dict):
+            return SharedFrameSource(
+                spec["camera_id"],
+                ring_names[spec["camera_id"]],
+                camera_type=spec["camera_type"],
+                main_stream_url=spec["rtsp_url"] if spec.get("substream_url") else None
+            )
+    
+    worker = ShardVideoWorker(camera_specs=specs)
+    
+    def watch_stop():
+        stop_event.wait()
+        worker.running = False
+    
+    threading.Thread(target=watch_stop, daemon=True).start()
+    logger.info(f"Shard {shard_index}: processing cameras {[s['camera_id'] for s in specs]}")
+    worker.run()
+
+
+class ManagedProcess:
+    """Child process restarted with exponential backoff when it dies"""
+    
+    def __init__(self, name: str, target, args: tuple):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.process: Optional[mp.process.BaseProcess] = None
+        self.restarts = 0
+        self.last_exitcode: Optional[int] = None
+        self.next_start_at = 0.0
+        self.backoff = PROCESS_RESTART_DELAY
+        self.started_at = 0.0
+    
+    def start(self):
+        self.process = _mp.Process(target=self.target, args=self.args, name=self.name, daemon=True)
+        self.process.start()
+        self.started_at = time.time()
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+    
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+    
+    def check(self, stopping: bool):
+        """Restart the process if it died; called periodically by the supervisor"""
+        if stopping or self.is_alive():
+            return
+        
+        now = time.time()
+        if self.process is not None:
+            self.last_exitcode = self.process.exitcode
+            self.process = None
+            # A process that ran for a while before dying gets a fresh backoff
+            if now - self.started_at > PROCESS_RESTART_MAX_DELAY:
+                self.backoff = PROCESS_RESTART_DELAY
+            self.next_start_at = now + self.backoff
+            logger.warning(
+                f"{self.name} exited with code {self.last_exitcode}, "
+                f"restarting in {self.backoff:.0f}s"
+            )
+            self.backoff = min(self.backoff * 2, PROCESS_RESTART_MAX_DELAY)
+            return
+        
+        if now >= self.next_start_at:
+            self.restarts += 1
+            self.start()
+    
+    def stop(self, timeout: float):
+        if self.process is None:
+            return
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"{self.name} did not exit in {timeout:.0f}s, terminating")
+            self.process.terminate()
+            self.process.join(2)
+            if self.process.is_alive():
+                self.process.kill()
+    
+    def get_info(self) -> dict:
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.process is not None else None,
+            "alive": self.is_alive(),
+            "restarts": self.restarts,
+            "last_exitcode": self.last_exitcode
+        }
+
+
+class WorkerSupervisor:
+    """Shards cameras across capture and detection processes"""
+    
+    def __init__(self, camera_specs: Optional[List[dict]] = None, num_processes: Optional[int] = None):
+        self.camera_specs = camera_specs
+        self.num_processes = num_processes
+        self.stop_event = _mp.Event()
+        self.rings: Dict[int, SharedFrameRing] = {}
+        self.capture_processes: List[ManagedProcess] = []
+        self.shard_processes: List[ManagedProcess] = []
+        self.running = False
+    
+    def start(self) -> bool:
+        """Create rings and start all child processes"""
+        if self.camera_specs is None:
+            from .main import load_camera_specs
+            self.camera_specs = load_camera_specs()
+        
+        if not self.camera_specs:
+            logger.warning("Hech qanday kamera topilmadi, supervisor ishga tushmaydi")
+            return False
+        
+        num_shards = resolve_process_count(len(self.camera_specs), self.num_processes)
+        ring_names: Dict[int, str] = {}
+        
+        for spec in self.camera_specs:
+            camera_id = spec["camera_id"]
+            ring_name = f"facezz_{os.getpid()}_cam{camera_id}"
+            self.rings[camera_id] = SharedFrameRing.create(
+                ring_name, FRAME_RING_SLOTS, FRAME_RING_MAX_WIDTH, FRAME_RING_MAX_HEIGHT
+            )
+            ring_names[camera_id] = ring_name
+            self.capture_processes.append(ManagedProcess(
+                f"capture-cam{camera_id}",
+                run_capture_process,
+                (spec, ring_name, self.stop_event)
+            ))
+        
+        for idx, shard in enumerate(shard_cameras(self.camera_specs, num_shards)):
+            shard_rings = {spec["camera_id"]: ring_names[spec["camera_id"]] for spec in shard}
+            self.shard_processes.append(ManagedProcess(
+                f"detect-shard{idx}",
+                run_shard_process,
+                (idx, shard, shard_rings, self.stop_event)
+            ))
+        
+        for proc in self.capture_processes + self.shard_processes:
+            proc.start()
+        
+        self.running = True
+        logger.info(
+            f"Supervisor started: {len(self.capture_processes)} capture processes, "
+            f"{len(self.shard_processes)} detection processes"
+        )
+        return True
+    
+    def run(self):
+        """Start children and keep them alive until stopped"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: setattr(self, "running", False))
+        
+        if not self.start():
+            return
+        
+        try:
+            while self.running:
+                for proc in self.capture_processes + self.shard_processes:
+                    proc.check(stopping=not self.running)
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logger.info("Received interrupt signal, shutting down...")
+        finally:
+            self.shutdown()
+    
+    def shutdown(self, timeout: float = 10.0):
+        """Signal children to stop, wait for them and release the rings"""
+        self.running = False
+        self.stop_event.set()
+        
+        for proc in self.shard_processes + self.capture_processes:
+            proc.stop(timeout)
+        
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
+        logger.info("Supervisor stopped")
+    
+    def get_status(self) -> dict:
+        return {
+            "running": self.running,
+            "capture_processes": [p.get_info() for p in self.capture_processes],
+            "shard_processes": [p.get_info() for p in self.shard_processes]
+        }
+
+
+def main():
+    """Entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    WorkerSupervisor().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Tiled face detection helpers: tile grid, cross-tile NMS and tile skipping
+"""
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import (
+    TILE_SIZE,
+    TILE_OVERLAP,
+    TILE_NMS_IOU,
+    TILE_MOTION_THRESHOLD,
+    TILE_FULL_SCAN_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# (x0, y0, x1, y1) in pixels
+Tile = Tuple[int, int, int, int]
+
+
+def _positions(length: int, tile: int, step: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    positions = list(range(0, length - tile, step))
+    positions.append(length - tile)  # last tile flush with the edge
+    return positions
+
+
+def make_tiles(shape: tuple, tile_size: int = TILE_SIZE, overlap: int = TILE_OVERLAP) -> List[Tile]:
+    """
+    Overlapping tile grid covering a frame
+    
+    Faces up to `overlap` pixels wide are guaranteed to lie fully inside at
+    least one tile.
+    """
+    height, width = shape[:2]
+    step = max(1, tile_size - overlap)
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in _positions(height, tile_size, step)
+        for x in _positions(width, tile_size, step)
+    ]
+
+
+def touches_inner_edge(box: Tuple[float, float, float, float], tile: Tile, shape: tuple, margin: int = 2) -> bool:
+    """True if a box is cut by a tile border that is not also the frame border"""
+    x1, y1, x2, y2 = box
+    tx0, ty0, tx1, ty1 = tile
+    height, width = shape[:2]
+    return (
+        (tx0 > 0 and x1 <= tx0 + margin) or
+        (ty0 > 0 and y1 <= ty0 + margin) or
+        (tx1 < width and x2 >= tx1 - margin) or
+        (ty1 < height and y2 >= ty1 - margin)
+    )
+
+
+def merge_detections(boxes: List[Tuple[float, float, float, float, float]], iou: float = TILE_NMS_IOU) -> List[Tuple[float, float, float, float, float]]:
+    """
+    Cross-tile non-maximum suppression
+    
+    Args:
+        boxes: (x1, y1, x2, y2, score) in frame coordinates, from all tiles
+    """
+    if len(boxes) <= 1:
+        return boxes
+    
+    rects = [[float(x1), float(y1), float(x2 - x1), float(y2 - y1)] for x1, y1, x2, y2, _ in boxes]
+    scores = [float(box[4]) for box in boxes]
+    keep = cv2.dnn.NMSBoxes(rects, scores, 0.0, iou)
+    return [boxes[int(i)] for i in np.array(keep).reshape(-1)]
+
+
+class TileScheduler:
+    """
+    Chooses which tiles of a camera to run the detector on.
+    
+    A tile is scanned when it changed since the previous frame (cheap
+    downsampled frame difference) or had a face in the previous frame;
+    every TILE_FULL_SCAN_INTERVAL frames all tiles are scanned so static
+    faces are not missed for long. Cost stays proportional to the occupied
+    part of the frame.
+    """
+    
+    # Motion is measured on a frame downscaled by this factor
+    MOTION_DOWNSCALE = 16
+    # Fraction of changed pixels for a tile to count as moving
+    MOTION_MIN_FRACTION = 0.005
+    
+    def __init__(self, full_scan_interval: int = TILE_FULL_SCAN_INTERVAL):
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.tiles: List[Tile] = []
+        self._shape: Optional[tuple] = None
+        self._previous: Optional[np.ndarray] = None
+        self._occupied: set = set()
+        self._frame_count = 0
+        self._lock = threading.Lock()
+        
+        self.tiles_scanned = 0
+        self.tiles_total = 0
+    
+    def _motion_tiles(self, image: np.ndarray) -> Optional[set]:
+        small = cv2.resize(
+            image,
+            (max(1, image.shape[1] // self.MOTION_DOWNSCALE), max(1, image.shape[0] // self.MOTION_DOWNSCALE)),
+            interpolation=cv2.INTER_AREA
+        )
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        previous, self._previous = self._previous, small
+        if previous is None or previous.shape != small.shape:
+            return None
+        
+        changed = cv2.absdiff(small, previous) > TILE_MOTION_THRESHOLD
+        moving = set()
+        for index, (x0, y0, x1, y1) in enumerate(self.tiles):
+            cell = changed[
+                y0 // self.MOTION_DOWNSCALE:max(y0 // self.MOTION_DOWNSCALE + 1, y1 // self.MOTION_DOWNSCALE),
+                x0 // self.MOTION_DOWNSCALE:max(x0 // self.MOTION_DOWNSCALE + 1, x1 // self.MOTION_DOWNSCALE)
+            ]
+            if cell.size and cell.mean() >= self.MOTION_MIN_FRACTION:
+                moving.add(index)
+        return moving
+    
+    def select(self, image: np.ndarray) -> List[Tile]:
+        """Tiles to scan in this frame"""
+        with self._lock:
+            if self._shape != image.shape[:2]:
+                self.tiles = make_tiles(image.shape)
+                self._shape = image.shape[:2]
+                self._previous = None
+                self._occupied = set()
+            
+            self._frame_count += 1
+            moving = self._motion_tiles(image)
+            if moving is None or self._frame_count % self.full_scan_interval == 0:
+                selected = list(range(len(self.tiles)))
+            else:
+                selected = sorted(moving | self._occupied)
+            
+            self.tiles_scanned += len(selected)
+            self.tiles_total += len(self.tiles)
+            return [self.tiles[index] for index in selected]
+    
+    def update(self, detections: List[Tuple[int, int, int, int, float]]):
+        """Remember which tiles contain faces, so they are scanned next frame"""
+        with self._lock:
+            occupied = set()
+            for x, y, w, h, _ in detections:
+                cx, cy = x + w / 2, y + h / 2
+                for index, (x0, y0, x1, y1) in enumerate(self.tiles):
+                    if x0 <= cx < x1 and y0 <= cy < y1:
+                        occupied.add(index)
+            self._occupied = occupied
+    
+    def get_stats(self) -> dict:
+        return {
+            "tiles": len(self.tiles),
+            "scanned_fraction": round(self.tiles_scanned / self.tiles_total, 3) if self.tiles_total else None
+        }
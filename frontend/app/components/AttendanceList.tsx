@@ -29,44 +29,52 @@ export default function AttendanceList() {
       setWsConnected(ws.isConnected())
     }, 1000)
     
-    // Listen for attendance events
-    const unsubscribe = ws.onMessage((event: AttendanceEvent) => {
+    const toAttendance = (data: AttendanceEvent['data']): Attendance => ({
+      id: data.id,
+      student_id: data.student_id || 0,
+      detected_at: data.detected_at,
+      location: data.camera?.location,
+      confidence: data.confidence || undefined,
+      image_path: data.image_path || undefined,
+      track_id: data.track_id || undefined,
+      student: data.student ? {
+        id: data.student.id,
+        student_id: data.student.student_id,
+        full_name: data.student.full_name,
+        is_active: true,
+        created_at: new Date().toISOString()
+      } : {
+        id: 0,
+        student_id: 'Unknown',
+        full_name: 'Unknown',
+        is_active: true,
+        created_at: new Date().toISOString()
+      }
+    })
+    
+    // Listen for attendance events (single or coalesced batch from the worker)
+    const unsubscribe = ws.onMessage((event: AttendanceEvent | { type: 'attendance_batch', data: AttendanceEvent['data'][] }) => {
+      let incoming: Attendance[] = []
       if (event.type === 'attendance' && event.data) {
-        const newAttendance: Attendance = {
-          id: event.data.id,
-          student_id: event.data.student_id || 0,
-          detected_at: event.data.detected_at,
-          location: event.data.camera?.location,
-          confidence: event.data.confidence || undefined,
-          image_path: event.data.image_path || undefined,
-          track_id: event.data.track_id || undefined,
-          student: event.data.student ? {
-            id: event.data.student.id,
-            student_id: event.data.student.student_id,
-            full_name: event.data.student.full_name,
-            is_active: true,
-            created_at: new Date().toISOString()
-          } : {
-            id: 0,
-            student_id: 'Unknown',
-            full_name: 'Unknown',
-            is_active: true,
-            created_at: new Date().toISOString()
-          }
-        }
-        
-        // Add new attendance to the top
+        incoming = [toAttendance(event.data as AttendanceEvent['data'])]
+      } else if (event.type === 'attendance_batch' && Array.isArray(event.data)) {
+        incoming = event.data.map(toAttendance).reverse()  // newest first
+      }
+      
+      if (incoming.length > 0) {
+        // Add new attendances to the top
         setAttendances(prev => {
           // Filter out duplicates
           const existingIds = new Set(prev.map(a => a.id))
-          if (existingIds.has(newAttendance.id)) {
+          const fresh = incoming.filter(a => !existingIds.has(a.id))
+          if (fresh.length === 0) {
             return prev
           }
           
-          setNewCount(1)
+          setNewCount(fresh.length)
           setTimeout(() => setNewCount(0), 3000)
           
-          return [newAttendance, ...prev].slice(0, 100) // Keep max 100
+          return [...fresh, ...prev].slice(0, 100) // Keep max 100
         })
         
         setLastUpdate(new Date())